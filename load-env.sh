@@ -35,9 +35,10 @@ function cleanup()
     local ret_val=$ret
     [ -f /tmp/$USER/.load_matching_env_loc ] && rm -f /tmp/$USER/.load_matching_env_loc 2>/dev/null
     [ -f /tmp/$USER/.ci_mode ] && rm -f /tmp/$USER/.ci_mode 2>/dev/null
-    [ ! -z ${env_file} ] && rm -f ${env_file} 2>/dev/null; rm -f ${env_file::-2}rc 2>/dev/null
+    [ ! -z ${env_file} ] && rm -f ${env_file} 2>/dev/null
 
-    unset python_too_old script_dir ci_mode cleanup env_file ret
+    unset python_too_old script_dir ci_mode cleanup env_file ret run_gen_config_helper_cmd
+    unset -f load_env_rc
     trap -  SIGHUP SIGINT SIGTERM
     return $ret_val
 }
@@ -49,21 +50,14 @@ trap "cleanup; return 1" SIGHUP SIGINT SIGTERM
 
 #### BEGIN environment setup ####
 
-# Ensure python3 is in PATH and that the version is high enough.
-if [[ ! -z $(which python3 2>/dev/null) ]]; then
-    python_too_old=$(python3 -c 'import sys; print(sys.version_info < (3, 6))')
-else
+# Ensure python3 is in PATH.  Its version is only checked if load_env.py fails,
+# so that a successful load does not start an extra interpreter.
+if ! command -v python3 &>/dev/null; then
     echo "This script requires Python 3.6+."
     echo "Please load Python 3.6+ into your path."
     cleanup; return 1
 fi
 
-if [[ "${python_too_old}" == "True" ]]; then
-    echo "This script requires Python 3.6+."
-    echo "Your current python3 is only $(python3 --version)."
-    cleanup; return 1
-fi
-
 # Get the location to the Python script in a subshell. cd does not change the previous
 # working directory of the caller since this is run in a subshell.
 script_dir="$(cd "$(dirname "${BASH_SOURCE[0]}")" &> /dev/null && pwd)"
@@ -75,11 +69,31 @@ if [ $# -eq 0 ]; then
 fi
 
 # Pass the input on to LoadEnv.py to do the real work, which is outputting
-# a correct load_matching_env.sh to be sourced. The path to this file is
-# output to .load_matching_env_loc
-load_matching_env_loc=.load_matching_env_loc.$RANDOM
-python3 -E -s ${script_dir}/load_env.py --load-matching-env-location $load_matching_env_loc $@; ret=$?
+# a correct load_matching_env.sh to be sourced, in $XDG_RUNTIME_DIR or
+# /tmp/$USER. The path to this file is written to file descriptor 3, which is
+# captured here, while its stdout still goes to the terminal via descriptor 4,
+# so nothing is written to the working directory.
+#
+# If a LoadEnv server is running (see `python3 -m loadenv serve`), the thin
+# client asks it to do the work; it exits with 75 if there is no server, the
+# socket or server belongs to another user, or for anything but a plain load,
+# in which case load_env.py is run directly.
+ret=75
+{
+    if [ -S "${LOADENV_SOCKET:-${XDG_RUNTIME_DIR:-/tmp/$USER}/loadenv.sock}" ] \
+            && [ -O "${LOADENV_SOCKET:-${XDG_RUNTIME_DIR:-/tmp/$USER}/loadenv.sock}" ]; then
+        env_file=$(python3 -E -s ${script_dir}/loadenv/LoadEnvClient.py --load-matching-env-fd 3 $@ 3>&1 1>&4 4>&-); ret=$?
+    fi
+    if [[ $ret -eq 75 ]]; then
+        env_file=$(python3 -E -s ${script_dir}/load_env.py --load-matching-env-fd 3 $@ 3>&1 1>&4 4>&-); ret=$?
+    fi
+} 4>&1
 if [[ $ret -ne 0 ]]; then
+    python_too_old=$(python3 -c 'import sys; print(sys.version_info < (3, 6))' 2>/dev/null)
+    if [[ "${python_too_old}" != "False" ]]; then
+        echo "This script requires Python 3.6+."
+        echo "Your current python3 is only $(python3 --version 2>&1)."
+    fi
     cleanup; return $?
 fi
 
@@ -94,35 +108,39 @@ if [[ "$@" == *"--ci-mode"* ]]; then
 fi
 
 # Source the generated script to pull the environment into the current shell.
-if [ -f ${load_matching_env_loc} ]; then
-    env_file=$(cat ${load_matching_env_loc})
-    env_file_rc=${env_file::-2}rc  # Remove .sh ending and replace with .rc
-
+if [ ! -z ${env_file} ]; then
     # If load-env.sh is being called via gen-config.sh (from the GenConfig repository), then
     # the function 'gen_config_helper' should be declared. If it is, run it automatically.
     run_gen_config_helper_cmd="declare -f -F gen_config_helper >/dev/null && [ \$? -eq 0 ] && gen_config_helper || true"
 
-    if [ -f ${env_file} ]; then
-        echo "source ${env_file}"                                                                          > ${env_file_rc}
-        echo "echo; echo; echo"                                                                           >> ${env_file_rc}
-        echo "echo \"********************************************************************************\""  >> ${env_file_rc}
-        echo "echo \"           E N V I R O N M E N T  L O A D E D  S U C E S S F U L L Y\""              >> ${env_file_rc}
-        echo "echo \"********************************************************************************\""  >> ${env_file_rc}
+    # Print the commands that load the environment, which are read via process
+    # substitution rather than from another file.
+    function load_env_rc()
+    {
+        echo "source ${env_file}"
+        echo "echo; echo; echo"
+        echo "echo \"********************************************************************************\""
+        echo "echo \"           E N V I R O N M E N T  L O A D E D  S U C E S S F U L L Y\""
+        echo "echo \"********************************************************************************\""
 
+        if [[ $ci_mode -eq 0 ]]; then
+            echo "echo; echo; echo"
+            echo "echo \"********************************************************************************\""
+            echo "echo \"          T Y P E  \"exit\"  T O  L E A V E  T H E  E N V I R O N M E N T\""
+            echo "echo \"********************************************************************************\""
+            echo "export PS1=\"(\$LOADED_ENV_NAME) $ \""
+            echo "export LOAD_ENV_INTERACTIVE_MODE=\"True\""
+        fi
+        echo $run_gen_config_helper_cmd
+    }
+
+    if [ -f ${env_file} ]; then
         # Enter subshell and set prompt by default
         if [[ $ci_mode -eq 0 ]]; then
-            echo "echo; echo; echo"                                                                           >> ${env_file_rc}
-            echo "echo \"********************************************************************************\""  >> ${env_file_rc}
-            echo "echo \"          T Y P E  \"exit\"  T O  L E A V E  T H E  E N V I R O N M E N T\""         >> ${env_file_rc}
-            echo "echo \"********************************************************************************\""  >> ${env_file_rc}
-            echo "export PS1=\"(\$LOADED_ENV_NAME) $ \""                                                      >> ${env_file_rc}
-            echo "export LOAD_ENV_INTERACTIVE_MODE=\"True\""                                                  >> ${env_file_rc}
-            echo $run_gen_config_helper_cmd                                                                   >> ${env_file_rc}
-            /bin/bash --init-file ${env_file_rc} -i
+            /bin/bash --init-file <(load_env_rc) -i
         else
             # Intentionally do no invoke cleanup() if this exits such that artifacts in /tmp/$USER are preserved.
-            echo $run_gen_config_helper_cmd >> ${env_file_rc}
-            source ${env_file_rc}
+            source <(load_env_rc)
         fi
 
     else
@@ -1,48 +1,69 @@
 #!/usr/bin/env python3
 
-import argparse
-import getpass
+import importlib
 import os
 from pathlib import Path
 import socket
 import sys
-import textwrap
-import uuid
-
-# Packages are snapshotted via install_reqs.sh or these are in Python's site-packages
-try:                                                                                # pragma: no cover
-    from .configparserenhanced import ConfigParserEnhanced
-    from .determinesystem import DetermineSystem
-    from .keywordparser import FormattedMsg
-    from .setenvironment import SetEnvironment
-
-except ImportError:                                                                 # pragma: no cover
-    try:  # Perhaps this file is being imported from another directory
-        p = Path(__file__).parents[0]
-        sys.path.insert(0, str(p))
-
-        from configparserenhanced import ConfigParserEnhanced
-        from determinesystem import DetermineSystem
-        from keywordparser import FormattedMsg
-        from setenvironment import SetEnvironment
-
-    except ImportError:  # Perhaps LoadEnv was snapshotted and these packages lie up one dir.
-        p = Path(__file__).parents[1]  # One dir up from the path to this file
-        sys.path.insert(0, str(p))
-
-        from configparserenhanced import ConfigParserEnhanced
-        from determinesystem import DetermineSystem
-        from keywordparser import FormattedMsg
-        from setenvironment import SetEnvironment
-
-# CWD is LoadEnv repository root
-try:                                                                                # pragma: no cover
-    from loadenv.EnvKeywordParser import EnvKeywordParser
-except ImportError:                                                                 # pragma: no cover
-    try:  # e.g. LoadEnv repository is snapshotted into the CWD
-        from LoadEnv.loadenv.EnvKeywordParser import EnvKeywordParser
-    except ImportError:  # CWD is LoadEnv/loadenv
-        from EnvKeywordParser import EnvKeywordParser
+
+# Dependencies are snapshotted next to this file by get_dependencies.sh, or one
+# directory up if LoadEnv itself was snapshotted into another repository;
+# otherwise they must be installed, e.g., in Python's site-packages.  Decide
+# once where they are, rather than attempting several imports.
+_this_dir = Path(os.path.abspath(__file__)).parent
+for _dir in [_this_dir, _this_dir.parent]:
+    if (_dir / "setenvironment").is_dir():
+        if str(_dir) not in sys.path:
+            sys.path.insert(0, str(_dir))
+        break
+if str(_this_dir) not in sys.path:
+    sys.path.insert(0, str(_this_dir))
+
+from keywordparser import FormattedMsg
+from loadenv.ConfigCache import ConfigCache, ConfigData
+from loadenv.EnvSpecGraph import EnvSpecGraph
+from loadenv.EnvKeywordParser import DuplicateAliasError, EnvKeywordParser
+from loadenv.LoadEnvClient import default_runtime_dir
+from loadenv.PhaseTimer import PhaseTimer
+
+# Dependencies that are not needed on every run, e.g., when parsed
+# configuration files and rendered scripts come from the ConfigCache, are only
+# imported when first used.  See _import_dependency().
+_LAZY_DEPENDENCIES = {
+    "ConfigParserEnhanced": "configparserenhanced",
+    "DetermineSystem": "determinesystem",
+    "SetEnvironment": "setenvironment",
+    }
+
+
+
+def _import_dependency(name):
+    """
+    Get one of the :data:`_LAZY_DEPENDENCIES`, importing it on first use.  It
+    is stored as a global of this module, so it can still be replaced, e.g.,
+    via ``unittest.mock.patch("load_env.SetEnvironment")``.
+
+    Parameters:
+        name (str):  The name of the class.
+
+    Returns:
+        type:  The class.
+    """
+    if name not in globals():
+        globals()[name] = getattr(importlib.import_module(_LAZY_DEPENDENCIES[name]), name)
+    return globals()[name]
+
+
+
+def __getattr__(name):
+    """
+    Make the :data:`_LAZY_DEPENDENCIES` available as attributes of this module
+    (PEP 562).
+    """
+    if name in _LAZY_DEPENDENCIES:
+        return _import_dependency(name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
 
 
 class LoadEnv(FormattedMsg):
@@ -57,13 +78,12 @@ class LoadEnv(FormattedMsg):
         """
         Parse the ``load-env.ini`` file and store the corresponding
         ``configparserenhanceddata`` object as :attr:`load_env_config_data`.
+        The parsed data is loaded from the :attr:`config_cache` when possible.
 
         Raises:
             ValueError: TODO - explain when ValueError can be raised.
         """
-        self.load_env_config_data = ConfigParserEnhanced(
-            self.load_env_ini_file
-            ).configparserenhanceddata
+        self.load_env_config_data = self.load_config_data(self.load_env_ini_file)
 
         if not self.load_env_config_data.has_section("load-env"):
             msg = f"'{self.load_env_ini_file}' must contain a 'load-env' section."
@@ -100,10 +120,213 @@ class LoadEnv(FormattedMsg):
         """
         Parse the ``supported-systems.ini`` file and store the corresponding
         ``configparserenhanceddata`` object as :attr:`supported_systems_data`.
+        The data is loaded from the :attr:`catalog` or the :attr:`config_cache`
+        when possible.
+        """
+        if self.catalog is not None:
+            self.supported_systems_data = self.catalog.data("supported-systems")
+            return
+        self.supported_systems_data = self.load_config_data(self.args.supported_systems_file)
+
+
+    def parse_supported_envs_file(self):
+        """
+        Parse the ``supported-envs.ini`` file and store the corresponding
+        ``configparserenhanceddata`` object as :attr:`supported_envs_data`.
+        The data is loaded from the :attr:`catalog` or the :attr:`config_cache`
+        when possible.
+        """
+        if self.catalog is not None:
+            self.supported_envs_data = self.catalog.data("supported-envs")
+            return
+        self.supported_envs_data = self.load_config_data(self.args.supported_envs_file)
+
+
+    @property
+    def environment_specs_data(self):
+        """
+        The raw contents of ``environment-specs.ini``, i.e., with ``use``
+        statements not yet expanded.  The data is loaded from the
+        :attr:`catalog` or the :attr:`config_cache` when possible.
+        """
+        if not hasattr(self, "_environment_specs_data") and self.catalog is not None:
+            self._environment_specs_data = self.catalog.data("environment-specs")
+        if not hasattr(self, "_environment_specs_data"):
+            filename = self.args.environment_specs_file
+            with self.timer.phase(
+                f"parse {filename.name} (raw)",
+                lambda: self.config_data_sizes(filename, self._environment_specs_data)
+                ):
+                self._environment_specs_data = self.config_cache.load(
+                    filename,
+                    lambda: ConfigData.from_configparser(
+                        _import_dependency("ConfigParserEnhanced")(filename).configparser_object
+                        ),
+                    kind="raw",
+                    )
+        return self._environment_specs_data
+
+
+    @property
+    def env_spec_graph(self):
+        """
+        The :class:`EnvSpecGraph` of ``use`` statements in
+        ``environment-specs.ini``.
+        """
+        if not hasattr(self, "_env_spec_graph"):
+            if self.catalog is not None:
+                from loadenv.Catalog import CatalogSpecGraph
+
+                self._env_spec_graph = CatalogSpecGraph(self.catalog)
+            else:
+                self._env_spec_graph = EnvSpecGraph(self.environment_specs_data)
+        return self._env_spec_graph
+
+
+    @property
+    def catalog_file(self):
+        """
+        The compiled :class:`Catalog` of the configuration files, given by
+        ``LOADENV_CATALOG``, or the ``catalog`` in ``load-env.ini``, or else
+        ``load-env.catalog`` next to ``load-env.ini``.
+        """
+        catalog_file = os.environ.get("LOADENV_CATALOG", "")
+        if catalog_file != "":
+            return Path(catalog_file).resolve()
+        catalog_file = "load-env.catalog"
+        if self.load_env_config_data.has_option("load-env", "catalog"):
+            catalog_file = self.load_env_config_data["load-env"]["catalog"]
+        return (self.load_env_ini_file.parent / catalog_file).resolve()
+
+
+    @property
+    def catalog(self):
+        """
+        The :class:`Catalog` at :attr:`catalog_file`, or ``None`` if there is
+        none, or it is not a valid catalog, or it is stale for the
+        configuration files in use, in which case they are parsed as usual.
+        """
+        if not hasattr(self, "_catalog"):
+            with self.timer.phase("load catalog", lambda: {"hit": self._catalog is not None}):
+                self._catalog = None
+                catalog_file = self.catalog_file
+                if catalog_file.is_file():
+                    from loadenv.Catalog import Catalog
+
+                    try:
+                        catalog = Catalog(catalog_file)
+                    except (OSError, ValueError):
+                        catalog = None
+                    if catalog is not None and not catalog.stale(self.catalog_sources):
+                        self._catalog = catalog
+        return self._catalog
+
+
+    @property
+    def catalog_sources(self):
+        """
+        The configuration file in use for each of :attr:`Catalog.KINDS`.
+        """
+        from loadenv.Catalog import Catalog
+
+        return dict(zip(Catalog.KINDS, self.config_files_for(self.args)))
+
+
+    def compile_catalog(self, filename=None):
+        """
+        Parse the configuration files in use and compile them into a
+        :class:`Catalog`.
+
+        Parameters:
+            filename (str, Path):  The catalog file to write.  Defaults to
+                :attr:`catalog_file`.
+
+        Returns:
+            Path:  The catalog file written.
+        """
+        filename = Path(self.catalog_file if filename is None else filename)
+        self._catalog = None
+        for attr in ["_environment_specs_data", "_env_spec_graph"]:
+            if hasattr(self, attr):
+                delattr(self, attr)
+
+        files = self.catalog_sources
+        data = {
+            "supported-systems": self.load_config_data(files["supported-systems"]),
+            "supported-envs": self.load_config_data(files["supported-envs"]),
+            "environment-specs": self.environment_specs_data,
+            }
+        from loadenv.Catalog import Catalog
+
+        with self.timer.phase("compile catalog"):
+            Catalog.compile(filename, files, data, self.env_spec_graph)
+        return filename
+
+
+    @property
+    def action_optimizer(self):
+        """
+        The :class:`ActionOptimizer` for the expanded actions of the selected
+        environment.
+        """
+        from loadenv.ActionOptimizer import ActionOptimizer
+
+        return ActionOptimizer(self.env_spec_graph.expanded_actions(self.parsed_env_name))
+
+
+    @property
+    def artifact_store(self):
+        """
+        The :class:`ArtifactStore` managing the ``load_matching_env`` scripts
+        in the :func:`default_runtime_dir`.
         """
-        self.supported_systems_data = ConfigParserEnhanced(
-            self.args.supported_systems_file
-            ).configparserenhanceddata
+        if not hasattr(self, "_artifact_store"):
+            from loadenv.ArtifactStore import ArtifactStore
+
+            self._artifact_store = ArtifactStore(default_runtime_dir())
+        return self._artifact_store
+
+
+    def load_config_data(self, filename):
+        """
+        Load the ``use``-expanded data for the given configuration file,
+        either from the :attr:`config_cache`, or by parsing it with
+        ``ConfigParserEnhanced`` if there is no valid cache entry.
+
+        Parameters:
+            filename (str, Path):  The configuration file to load.
+
+        Returns:
+            ConfigData:  The parsed data.
+        """
+        with self.timer.phase(
+            f"parse {Path(filename).name}", lambda: self.config_data_sizes(filename, data)
+            ):
+            data = self.config_cache.load(
+                filename,
+                lambda: ConfigData.from_configparserenhanceddata(
+                    _import_dependency("ConfigParserEnhanced")(filename).configparserenhanceddata
+                    ),
+                )
+        return data
+
+
+    @staticmethod
+    def config_data_sizes(filename, data):
+        """
+        Parameters:
+            filename (str, Path):  A configuration file.
+            data (ConfigData):  The data loaded from it.
+
+        Returns:
+            dict:  The sizes recorded in the :attr:`timer` for the file.
+        """
+        return {
+            "file": str(filename),
+            "bytes": os.path.getsize(filename),
+            "sections": len(data.sections()),
+            "options": sum(len(data.options(_)) for _ in data.sections()),
+            }
 
 
     def __init__(
@@ -120,15 +343,64 @@ class LoadEnv(FormattedMsg):
 
         self.argv = argv
         self.load_env_ini_file = Path(load_env_ini_file)
+        self.config_cache = ConfigCache()
+        self.reset_timer()
         self.load_env_config_data = None
         self.parse_top_level_config_file()
         self.supported_systems_data = None
         self.parse_supported_systems_file()
+        self.supported_envs_data = None
         self.env_keyword_parser = None
+        self.env_keyword_parsers = {}
+        self.system_names = {}
         self.set_environment = None
+        self.module_command = None
         self.silent = False
 
 
+    @staticmethod
+    def timings_requested(argv):
+        """
+        Parameters:
+            argv (list):  The command line arguments.
+
+        Returns:
+            bool:  ``True`` if phase timings were requested via ``--timings``
+            or ``LOADENV_TIMINGS``.  This is checked before the arguments are
+            parsed, so the parsing of ``load-env.ini`` can be timed too.
+        """
+        if os.environ.get("LOADENV_TIMINGS", "") != "":
+            return True
+        return any(_ == "--timings" or _.startswith("--timings=") for _ in argv)
+
+
+    def reset_timer(self):
+        """
+        Start a new :class:`PhaseTimer` as :attr:`timer`, enabled if
+        :func:`timings_requested` for :attr:`argv`.
+        """
+        self.timer = PhaseTimer(
+            enabled=self.timings_requested(self.argv),
+            cache=self.config_cache,
+            info={"argv": self.argv},
+            )
+
+
+    def write_timings(self):
+        """
+        Write the phase timings recorded by :attr:`timer`, if enabled, to the
+        file given by ``--timings`` or ``LOADENV_TIMINGS``, or to ``stderr``
+        if that is ``-``.
+        """
+        if not self.timer.enabled:
+            return
+
+        output = os.environ.get("LOADENV_TIMINGS", "")
+        if hasattr(self, "_args") and self.args.timings is not None:
+            output = self.args.timings
+        self.timer.write(sys.stderr if output in ["", "-"] else output)
+
+
     @property
     def build_name(self):
         return self.args.build_name
@@ -153,44 +425,557 @@ class LoadEnv(FormattedMsg):
     def system_name(self):
         """
         The name of the system from which the tool will select an environment.
+        The system is determined once per build name and shared by everything
+        that needs it.  If ``LOADENV_SYSTEM_MEMO=1`` is set, the result of
+        matching the hostname is also remembered across runs; see
+        :func:`get_memoized_system_name`.
         """
-        if not hasattr(self, "_system_name"):
-            ds = DetermineSystem(
-                self.args.build_name,
-                self.args.supported_systems_file,
-                force_build_name=self.args.force,
-                silent=self.silent
-                )
-            self._system_name = ds.system_name
+        if getattr(self, "_system_name", None) is not None:
+            return self._system_name
+
+        with self.timer.phase(
+            "determine system",
+            lambda: {"system_name": self._system_name, "systems": len(self.supported_sys_names)}
+            ):
+            if not hasattr(self, "_system_name"):
+                self._system_name = self.system_names.get(self._system_names_key())
+                if self._system_name is None:
+                    self._system_name = self.get_memoized_system_name()
+                if self._system_name is None:
+                    self._system_name = self.get_catalog_system_name()
+
+            if self._system_name is None:
+                ds = _import_dependency("DetermineSystem")(
+                    self.args.build_name,
+                    self.args.supported_systems_file,
+                    force_build_name=self.args.force,
+                    silent=self.silent
+                    )
+                self._system_name = ds.system_name
+                self.system_names[self._system_names_key()] = self._system_name
+                self.memoize_system_name()
 
         return self._system_name
 
 
+    def _system_names_key(self):
+        """
+        Returns:
+            tuple:  The key into :attr:`system_names`, the in-process memo of
+            determined systems.  The system only depends on the hostname, the
+            ``--force`` flag, and which system names appear in the
+            :attr:`build_name`, so many build names share one entry.
+        """
+        sys_names_in_build_name = set(self.args.build_name.split("_")) & set(
+            self.supported_sys_names
+            )
+        return (socket.gethostname(), self.args.force, frozenset(sys_names_in_build_name))
+
+
+    @property
+    def supported_sys_names(self):
+        """
+        The names of the systems listed in ``supported-systems.ini``.
+        """
+        return self.supported_systems_data.sections()
+
+
+    @property
+    def system_memo_enabled(self):
+        """
+        Whether the per-host memo of the system name is enabled, via
+        ``LOADENV_SYSTEM_MEMO=1``.
+        """
+        return os.environ.get("LOADENV_SYSTEM_MEMO", "0") not in ["", "0"]
+
+
+    def _system_memo_key(self):
+        """
+        Returns:
+            str:  The key for the per-host system memo, derived from the
+            hostname and the fingerprint of ``supported-systems.ini``, or
+            ``None`` if the memo cannot be used for the current
+            :attr:`build_name`.
+        """
+        if not self.system_memo_enabled or self.args.force:
+            return None
+
+        fingerprint = self.config_cache.fingerprint(self.args.supported_systems_file)
+        if fingerprint is None:
+            return None
+
+        return self.config_cache.hash_key(
+            socket.gethostname(), self.args.supported_systems_file, fingerprint["sha256"]
+            )
+
+
+    def get_memoized_system_name(self):
+        """
+        Look up the system name previously determined from this host's
+        hostname.  The memo is not used when ``--force`` is given or when the
+        :attr:`build_name` names a different system, so any messages or errors
+        :class:`DetermineSystem` would produce in those cases are preserved.
+
+        Returns:
+            str:  The memoized system name, or ``None`` if there is none.
+        """
+        key = self._system_memo_key()
+        if key is None:
+            return None
+
+        system_name = self.config_cache.read_record("systems", key)
+        if system_name is None:
+            return None
+
+        sys_names_in_build_name = set(self.args.build_name.split("_")) & set(
+            self.supported_sys_names
+            )
+        if sys_names_in_build_name - {system_name}:
+            return None
+
+        if not self.silent:
+            print(
+                f"Using system '{system_name}' based on matching hostname "
+                f"'{socket.gethostname()}' (memoized)."
+                )
+        return system_name
+
+
+    def get_catalog_system_name(self):
+        """
+        Match the hostname against the host regex table in the :attr:`catalog`.
+        As with :func:`get_memoized_system_name`, this is only done when
+        ``--force`` is not given and the :attr:`build_name` names no system,
+        and only an unambiguous match is used, so ``DetermineSystem`` still
+        handles, and reports, everything else.
+
+        Returns:
+            str:  The system matching the hostname, or ``None``.
+        """
+        if self.catalog is None or self.args.force:
+            return None
+        if set(self.args.build_name.split("_")) & set(self.supported_sys_names):
+            return None
+
+        matches = self.catalog.match_hostname(socket.gethostname())
+        if len(matches) != 1:
+            return None
+
+        if not self.silent:
+            print(
+                f"Using system '{matches[0]}' based on matching hostname "
+                f"'{socket.gethostname()}'."
+                )
+        return matches[0]
+
+
+    def memoize_system_name(self):
+        """
+        Remember the :attr:`system_name` for this host if it was determined
+        from the hostname, i.e., without ``--force`` and without the system
+        name appearing in the :attr:`build_name`.
+        """
+        key = self._system_memo_key()
+        if key is None or self._system_name in self.args.build_name.split("_"):
+            return
+
+        self.config_cache.write_record("systems", key, self._system_name)
+
+
     def load_env_keyword_parser(self):
         """
         Instantiate an :class:`EnvKeywordParser` object with this object's
         :attr:`build_name`, :attr:`system_name`, and ``supported-envs.ini``.
         Save the resulting object as :attr:`env_keyword_parser`.
+
+        One :class:`EnvKeywordParser` is kept per system in
+        :attr:`env_keyword_parsers` and reused when the :attr:`build_name`
+        changes.
         """
-        self.env_keyword_parser = EnvKeywordParser(
-            self.args.build_name, self.system_name, self.args.supported_envs_file
-            )
+        if self.supported_envs_data is None:
+            self.parse_supported_envs_file()
+
+        system_name = self.system_name
+        if system_name in self.env_keyword_parsers:
+            self.env_keyword_parser = self.env_keyword_parsers[system_name]
+            self.env_keyword_parser.build_name = self.args.build_name
+            self.env_keyword_parser.silent = self.silent
+        else:
+            self.env_keyword_parser = EnvKeywordParser(
+                self.args.build_name,
+                system_name,
+                self.args.supported_envs_file,
+                config_data=self.supported_envs_data,
+                silent=self.silent
+                )
+            self.env_keyword_parsers[system_name] = self.env_keyword_parser
 
 
-    def list_envs(self):
+    def list_envs(self, output_format="text", pattern=None, all_systems=False, output=None):
         """
-        List the environments available on the current machine.
+        List the environments available on the current machine, or on every
+        system, from the :attr:`env_index`.
+
+        Parameters:
+            output_format (str):  ``"text"`` for the usual listing per system,
+                or ``"json"`` for one JSON record per environment, as given
+                by :func:`EnvIndex.entries`, written as soon as it is found.
+                Messages that would normally be printed while determining the
+                system are sent to ``stderr`` so that ``output`` only contains
+                JSON.
+            pattern (str):  Only list environments with a name or alias
+                matching this substring or glob.  See :func:`EnvIndex.matches`.
+            all_systems (bool):  List the environments of every system in
+                ``supported-envs.ini`` rather than those of the
+                :attr:`system_name`.
+            output (file):  Where to write the listing.  Defaults to
+                ``sys.stdout``.
+
+        Returns:
+            int:  The number of environments listed.
 
         Raises:
-            SystemExit:  With the message displaying the available environments
-            from which to choose.
+            DuplicateAliasError:  If the aliases of the :attr:`system_name`
+            are not unique.  With ``all_systems``, such systems are reported
+            on ``stderr`` and skipped instead.
         """
-        if self.env_keyword_parser is None:
-            self.load_env_keyword_parser()
+        import contextlib
+        import json
+
+        output = sys.stdout if output is None else output
+        if all_systems:
+            system_names = None
+        elif output_format == "json":
+            self.silent = True
+            with contextlib.redirect_stdout(sys.stderr):
+                system_names = [self.system_name]
+        else:
+            system_names = [self.system_name]
+
+        index = self.env_index
+        num_envs = 0
+        for system_name in sorted(index.systems) if system_names is None else system_names:
+            error = index.systems[system_name]["error"]
+            if error is not None:
+                if system_names is not None:
+                    raise DuplicateAliasError(error)
+                print(error, file=sys.stderr)
+                continue
+
+            if output_format == "json":
+                for entry in index.entries([system_name], pattern):
+                    num_envs += 1
+                    output.write(json.dumps(entry) + "\n")
+                    output.flush()
+                continue
+
+            env_aliases = {_["name"]: _["aliases"] for _ in index.entries([system_name], pattern)}
+            num_envs += len(env_aliases)
+            if len(env_aliases) > 0 or pattern is None:
+                extras = EnvKeywordParser.format_supported_environments(
+                    system_name, env_aliases, self.args.supported_envs_file
+                    )
+                output.write(
+                    self.get_formatted_msg(
+                        "Please select one of the following.", kind="INFO", extras=extras
+                        ) + "\n"
+                    )
+                output.flush()
 
-        print(self.env_keyword_parser.get_msg_showing_supported_environments(
-                "Please select one of the following.", kind="INFO"))
-        sys.exit()
+        return num_envs
+
+
+    @property
+    def env_index(self):
+        """
+        The :class:`EnvIndex` of ``supported-envs.ini``, stored in the
+        :attr:`config_cache`, keyed by the file's contents, or by its
+        ``mtime_ns`` and ``size`` in the :attr:`catalog`, if there is one.
+        """
+        if not hasattr(self, "_env_index"):
+            from loadenv.EnvIndex import EnvIndex
+
+            with self.timer.phase("load env index", lambda: {"hit": record is not None}):
+                if self.catalog is not None:
+                    source = self.catalog.sources["supported-envs"]
+                else:
+                    source = self.config_cache.fingerprint(self.args.supported_envs_file)
+                key = self.config_cache.hash_key(self.args.supported_envs_file, source)
+                record = self.config_cache.read_record("indexes", key)
+                if record is None:
+                    if self.supported_envs_data is None:
+                        self.parse_supported_envs_file()
+                    self._env_index = EnvIndex.build(
+                        self.supported_envs_data, self.args.supported_envs_file
+                        )
+                    self.config_cache.write_record("indexes", key, self._env_index.to_dict())
+                else:
+                    self._env_index = EnvIndex(record)
+        return self._env_index
+
+
+    def resolve(self, build_name):
+        """
+        Resolve a single build name without raising, for use when resolving
+        many build names in one process.  Parsed configuration files, the
+        determined systems, and the per-system :class:`EnvKeywordParser`
+        objects are reused between calls.
+
+        Parameters:
+            build_name (str):  The build name to resolve.
+
+        Returns:
+            dict:  The ``build_name``, ``system_name``, ``parsed_env_name``,
+            and ``env_stripped_build_name``, along with an ``error`` message
+            that is ``None`` on success.
+        """
+        record = {
+            "build_name": build_name,
+            "system_name": None,
+            "parsed_env_name": None,
+            "env_stripped_build_name": None,
+            "error": None,
+            }
+        try:
+            self.build_name = build_name
+            record["system_name"] = self.system_name
+            record["parsed_env_name"] = self.parsed_env_name
+            record["env_stripped_build_name"] = self.env_stripped_build_name
+        except SystemExit as e:
+            record["error"] = str(e.code)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        return record
+
+
+    def resolve_batch(self, lines, output=None):
+        """
+        Resolve each build name in ``lines`` with :func:`resolve` and write one
+        JSON record per build name to ``output`` as soon as it is resolved.
+        Blank lines and lines starting with ``#`` are skipped.  Messages that
+        would normally be printed while resolving are sent to ``stderr`` so
+        that ``output`` only contains JSON.
+
+        Parameters:
+            lines (iterable):  The build names, one per line.
+            output (file):  Where to write the records.  Defaults to
+                ``sys.stdout``.
+
+        Returns:
+            int:  The number of build names that failed to resolve.
+        """
+        import contextlib
+        import json
+
+        output = sys.stdout if output is None else output
+        self.silent = True
+        num_build_names, num_errors = 0, 0
+        with self.timer.phase(
+            "resolve batch", lambda: {"build_names": num_build_names, "errors": num_errors}
+            ):
+            for line in lines:
+                build_name = line.strip()
+                if build_name == "" or build_name.startswith("#"):
+                    continue
+
+                with contextlib.redirect_stdout(sys.stderr):
+                    record = self.resolve(build_name)
+                num_build_names += 1
+                num_errors += 0 if record["error"] is None else 1
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+
+        return num_errors
+
+
+    def validate_all(self, system_name=None, jobs=None, timeout=None, revalidate=False):
+        """
+        Validate every environment on a system by applying each one with
+        ``SetEnvironment.apply`` in its own child process, ``jobs`` at a time.
+        Each child starts from a copy of this process's environment, so the
+        environments cannot affect each other.  A line is printed for each
+        environment as soon as it finishes.
+
+        Each environment that passes is recorded by its child, keyed by its
+        :func:`environment_state_key`, and not applied again until the
+        environment's expanded actions or the module system change, so after
+        an edit to ``environment-specs.ini`` only the environments it affects
+        and those that failed are applied again.  Failures and timeouts are
+        not stored, as they may be transient, e.g., due to an unavailable
+        file system.
+
+        Parameters:
+            system_name (str):  The system whose environments to validate.
+                Defaults to the :attr:`system_name` matched via the hostname.
+            jobs (int):  The number of environments to validate at once.
+                Defaults to the number of CPUs.
+            timeout (float):  The number of seconds after which an
+                environment that is still being applied fails.  Defaults to
+                no limit.
+            revalidate (bool):  Apply every environment, ignoring stored
+                passes.
+
+        Returns:
+            list:  One ``dict`` per environment, sorted by environment name,
+            with its ``env_name``, ``status`` (``"pass"``, ``"fail"``, or
+            ``"timeout"``), ``wall_s``, the child's ``output``, and whether
+            the outcome was ``cached``.
+        """
+        import concurrent.futures
+
+        if system_name is None:
+            system_name = self.system_name
+        elif system_name not in self.supported_sys_names:
+            raise ValueError(
+                self.get_formatted_msg(
+                    f"Unknown system '{system_name}'.  Systems in "
+                    f"'{self.args.supported_systems_file}':",
+                    extras="\n".join(f"  - {_}" for _ in self.supported_sys_names),
+                    )
+                )
+
+        if self.supported_envs_data is None:
+            self.parse_supported_envs_file()
+        env_names = sorted(
+            EnvKeywordParser(
+                "", system_name, self.args.supported_envs_file, config_data=self.supported_envs_data
+                ).env_names
+            )
+
+        environ = dict(os.environ)
+        environ.pop("LOADENV_TIMINGS", None)
+        jobs = jobs if jobs is not None else (os.cpu_count() or 1)
+        results = []
+
+        def report(result):
+            print(
+                f"{result['status'].upper():<8}{result['wall_s']:>9.2f}s  {result['env_name']}"
+                + ("  (cached)" if result["cached"] else ""),
+                flush=True
+                )
+            results.append(result)
+
+        with self.timer.phase(
+            "validate all",
+            lambda: {
+                "system_name": system_name,
+                "env_names": len(env_names),
+                "cached": sum(_["cached"] for _ in results),
+                "jobs": jobs,
+                }
+            ), concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {}
+            for env_name in env_names:
+                qualified_env_name = f"{system_name}_{env_name}"
+                record = None
+                if not revalidate:
+                    record = self.load_environment_state_record("validations", qualified_env_name)
+                if record is not None and record["outcome"] == "pass":
+                    report({
+                        "env_name": qualified_env_name,
+                        "status": "pass",
+                        "wall_s": 0.0,
+                        "output": "",
+                        "cached": True,
+                        })
+                    continue
+                future = pool.submit(
+                    self.validate_in_child,
+                    self.validate_all_command(system_name, env_name),
+                    environ,
+                    timeout
+                    )
+                futures[future] = qualified_env_name
+
+            for future in concurrent.futures.as_completed(futures):
+                report(dict(env_name=futures[future], cached=False, **future.result()))
+        return sorted(results, key=lambda _: _["env_name"])
+
+
+    def validate_all_command(self, system_name, env_name):
+        """
+        Parameters:
+            system_name (str):  The system of the environment.
+            env_name (str):  The environment to validate.
+
+        Returns:
+            list:  The command that validates the environment in a child
+            process, with the same configuration files as this object.
+        """
+        return [
+            sys.executable, "-E", "-s", str(Path(os.path.realpath(__file__))),
+            "--supported-systems", str(self.args.supported_systems_file),
+            "--supported-envs", str(self.args.supported_envs_file),
+            "--environment-specs", str(self.args.environment_specs_file),
+            "--apply-only",
+            "--force",
+            f"{system_name}_{env_name}",
+            ]
+
+
+    @staticmethod
+    def validate_in_child(command, environ, timeout=None):
+        """
+        Run ``command`` in a new session, killing the whole session if it
+        takes longer than ``timeout`` seconds.
+
+        Returns:
+            dict:  The ``status`` (``"pass"``, ``"fail"``, or ``"timeout"``),
+            ``wall_s``, and the combined ``output`` of the child.
+        """
+        import signal
+        import subprocess
+        import time
+
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            command,
+            env=environ,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            start_new_session=True,
+            )
+        try:
+            output, _ = process.communicate(timeout=timeout)
+            status = "pass" if process.returncode == 0 else "fail"
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            output, _ = process.communicate()
+            status = "timeout"
+        return {"status": status, "wall_s": round(time.perf_counter() - start, 3), "output": output}
+
+
+    @staticmethod
+    def format_validate_all_report(results, tail=20):
+        """
+        Parameters:
+            results (list):  The results of :func:`validate_all`.
+            tail (int):  The number of lines of output to show for each
+                environment that did not pass.
+
+        Returns:
+            str:  The output of each environment that did not pass, followed
+            by a summary.
+        """
+        lines = []
+        for result in results:
+            if result["status"] == "pass":
+                continue
+            lines.append("")
+            lines.append(f"{result['status'].upper()}:  {result['env_name']}")
+            lines += [f"    {_}" for _ in result["output"].splitlines()[-tail :]]
+
+        counts = {status: 0 for status in ["pass", "fail", "timeout"]}
+        for result in results:
+            counts[result["status"]] += 1
+        lines.append("")
+        lines.append(
+            f"{counts['pass']} passed, {counts['fail']} failed, {counts['timeout']} timed out "
+            f"of {len(results)} environments."
+            )
+        return "\n".join(lines)
 
 
     @property
@@ -203,7 +988,15 @@ class LoadEnv(FormattedMsg):
             if self.env_keyword_parser is None:
                 self.load_env_keyword_parser()
 
-            self._parsed_env_name = self.env_keyword_parser.qualified_env_name
+            with self.timer.phase(
+                "match keywords",
+                lambda: {
+                    "env_name": self._parsed_env_name,
+                    "env_names": len(self.env_keyword_parser.env_names),
+                    "aliases": len(self.env_keyword_parser.aliases),
+                    }
+                ):
+                self._parsed_env_name = self.env_keyword_parser.qualified_env_name
         return self._parsed_env_name
 
 
@@ -212,71 +1005,433 @@ class LoadEnv(FormattedMsg):
         Instantiate a :class:`SetEnvironment` object with this object's
         ``environment-specs.ini``.  Save the resulting object as
         :attr:`set_environment`.
+
+        Only the sections reachable from :attr:`parsed_env_name` via ``use``
+        statements are validated.  See :func:`lint_environment_specs` to
+        validate the whole file.
         """
         if self.set_environment is None:
-            self.set_environment = SetEnvironment(filename=self.args.environment_specs_file)
+            with self.timer.phase("load SetEnvironment"):
+                self.set_environment = _import_dependency("SetEnvironment")(
+                    filename=self.args.environment_specs_file
+                    )
 
-        # Make sure all operations specified in environment-specs.ini are valid
+        # Make sure all operations the selected environment depends on are valid
         # Note: If `set_environment.exception_control_level` is
         #       2 or less then `ValueError` will not be raised but
         #       rather `set_environment` will return a nonzero value.
         self.set_environment.exception_control_level = 5
-        self.set_environment.assert_file_all_sections_handled()
+        use_closure = self.env_spec_graph.use_closure(self.parsed_env_name)
+        with self.timer.phase("validate sections", lambda: {"sections": len(use_closure)}):
+            for section in use_closure:
+                self.set_environment.assert_section_all_options_handled(section)
+
+
+    def lint_environment_specs(self):
+        """
+        Validate every section in ``environment-specs.ini``, regardless of
+        whether it is reachable from :attr:`parsed_env_name`.
+
+        Raises:
+            ValueError:  If any section contains an operation that is not
+            handled by :class:`SetEnvironment`.
+        """
+        with self.timer.phase("lint sections"):
+            set_environment = _import_dependency("SetEnvironment")(
+                filename=self.args.environment_specs_file
+                )
+            set_environment.exception_control_level = 5
+            set_environment.assert_file_all_sections_handled()
 
 
     def apply_env(self):
         """
         Apply the selected environment to ensure it works on the given machine.
 
+        With ``--batch-modules``, the environment is applied by a
+        :class:`ModuleBatcher`, which runs consecutive module loads and
+        unloads as one ``module`` command, using :attr:`module_command` if
+        set, rather than by ``SetEnvironment``.  Environments using operations
+        it does not support are applied by ``SetEnvironment`` as usual.
+
         Raises:
             RuntimeError: TODO - explain how this exception gets raised.
         """
-        if self.set_environment is None:
+        batcher = None
+        if self.args.batch_modules:
+            from loadenv.ModuleBatcher import ModuleBatcher
+
+            batcher = ModuleBatcher(
+                self.env_spec_graph.expanded_actions(self.parsed_env_name),
+                module=self.module_command,
+                )
+            if not batcher.supported:
+                batcher = None
+        if batcher is None and self.set_environment is None:
             self.load_set_environment()
 
-        rval = self.set_environment.apply(self.parsed_env_name)
+        before = dict(os.environ)
+        with self.timer.phase(
+            "apply environment",
+            lambda: {"variables_changed": sum(
+                1 for _ in set(before) | set(os.environ) if before.get(_) != os.environ.get(_)
+                )}
+            ):
+            if batcher is None:
+                rval = self.set_environment.apply(self.parsed_env_name)
+            else:
+                rval = batcher.apply()
         if rval != 0:
+            extras = ""
+            if batcher is not None:
+                op, param, value = batcher.failed_action
+                extras = f"  Failed action:  {op}{'' if param is None else ' ' + param} : {value}"
             raise RuntimeError(
                 self.get_formatted_msg(
                     "Something unexpected went wrong in applying the "
                     f"environment.  Ensure that the '{self.parsed_env_name}' "
                     "environment is fully supported on the "
-                    f"'{socket.gethostname()}' host."
+                    f"'{socket.gethostname()}' host.",
+                    extras=extras,
                     )
                 )
+
+        after = dict(os.environ)
+        self.save_validation(before, after)
+        if self.args.snapshot:
+            self.save_snapshot(before, after)
         return
 
 
-    def write_load_matching_env(self):
+    def environment_state_key(self, environ, env_name=None):
+        """
+        Parameters:
+            environ (dict):  The environment the environment is applied to.
+            env_name (str):  The qualified environment name.  Defaults to
+                :attr:`parsed_env_name`.
+
+        Returns:
+            str:  The key under which results of applying the environment are
+            stored in the :class:`ConfigCache`.  It depends on the
+            environment's name, its :func:`EnvSpecGraph.actions_fingerprint`,
+            and the module system state in ``environ``, so editing
+            ``environment-specs.ini`` in ways that do not change what the
+            environment does keeps its results.
+        """
+        from loadenv.EnvSnapshot import EnvSnapshot
+
+        env_name = self.parsed_env_name if env_name is None else env_name
+        return self.config_cache.hash_key(
+            env_name,
+            self.env_spec_graph.actions_fingerprint(env_name),
+            *[environ.get(_, "") for _ in EnvSnapshot.MODULE_STATE_VARIABLES]
+            )
+
+
+    @staticmethod
+    def module_tree_record(before, after):
+        """
+        Parameters:
+            before (dict):  The environment before the selected environment
+                was applied.
+            after (dict):  The environment after it was applied.
+
+        Returns:
+            dict:  Every directory on ``MODULEPATH`` before or after, the
+            module files loaded after, i.e., those in ``_LMFILES_``, and their
+            :func:`EnvSnapshot.module_tree_fingerprint`.
+        """
+        from loadenv.EnvSnapshot import EnvSnapshot
+
+        modulepath = []
+        for environ in [before, after]:
+            for directory in environ.get("MODULEPATH", "").split(":"):
+                if directory != "" and directory not in modulepath:
+                    modulepath.append(directory)
+        modulefiles = [_ for _ in after.get("_LMFILES_", "").split(":") if _ != ""]
+        return {
+            "modulepath": modulepath,
+            "modulefiles": modulefiles,
+            "module_tree": EnvSnapshot.module_tree_fingerprint(modulepath, modulefiles),
+            }
+
+
+    def load_environment_state_record(self, namespace, env_name=None):
+        """
+        Parameters:
+            namespace (str):  The kind of record, e.g., ``"validations"``.
+            env_name (str):  The qualified environment name.  Defaults to
+                :attr:`parsed_env_name`.
+
+        Returns:
+            dict:  The record for the environment and the current
+            environment's module system state, or ``None`` if there is none or
+            the module files it depends on have changed.
+        """
+        record = self.config_cache.read_record(
+            namespace, self.environment_state_key(os.environ, env_name)
+            )
+        if record is None:
+            return None
+        from loadenv.EnvSnapshot import EnvSnapshot
+
+        module_tree = EnvSnapshot.module_tree_fingerprint(
+            record["modulepath"], record.get("modulefiles", [])
+            )
+        if module_tree != record["module_tree"]:
+            return None
+        return record
+
+
+    def save_validation(self, before, after, env_name=None):
+        """
+        Record that an environment was applied successfully, so that it is
+        not applied again until what it does changes; see
+        :func:`is_validated` and :func:`validate_all`.
+
+        Parameters:
+            before (dict):  The environment before it was applied.
+            after (dict):  The environment after it was applied.
+            env_name (str):  The qualified environment name.  Defaults to
+                :attr:`parsed_env_name`.
+        """
+        record = self.module_tree_record(before, after)
+        record["outcome"] = "pass"
+        self.config_cache.write_record(
+            "validations", self.environment_state_key(before, env_name), record
+            )
+
+
+    def is_validated(self):
+        """
+        Returns:
+            bool:  ``True`` if the selected environment was successfully
+            applied before on this system, from the same module system state,
+            and neither its expanded actions nor the module files on
+            ``MODULEPATH`` have changed since.
+        """
+        with self.timer.phase("check validation cache", lambda: {"hit": validated}):
+            record = self.load_environment_state_record("validations")
+            validated = record is not None and record["outcome"] == "pass"
+        return validated
+
+
+    def save_snapshot(self, before, after):
+        """
+        Store the :class:`EnvSnapshot` of applying the selected environment,
+        so it can be replayed by :func:`load_snapshot`.
+
+        Parameters:
+            before (dict):  The environment before it was applied.
+            after (dict):  The environment after it was applied.
+        """
+        from loadenv.EnvSnapshot import EnvSnapshot
+
+        record = self.module_tree_record(before, after)
+        record["actions"] = EnvSnapshot.capture(before, after).actions
+        self.config_cache.write_record("snapshots", self.environment_state_key(before), record)
+
+
+    def load_snapshot(self):
+        """
+        Returns:
+            EnvSnapshot:  The snapshot of the selected environment saved by
+            :func:`save_snapshot`, or ``None`` if there is none or the module
+            files it was captured with have changed.
+        """
+        with self.timer.phase("load snapshot", lambda: {"hit": record is not None}):
+            record = self.load_environment_state_record("snapshots")
+        if record is None:
+            return None
+        from loadenv.EnvSnapshot import EnvSnapshot
+
+        return EnvSnapshot(record["actions"])
+
+
+    def write_load_matching_env(self, snapshot=None):
         """
         Write a bash script that when sourced will give you the same
-        environment loaded by this tool.
+        environment loaded by this tool.  The script is rendered once into the
+        :class:`ConfigCache` and reused until the environment's sections in
+        ``environment-specs.ini`` change; the files written here are a hard
+        link to, or copies of, that render.
+
+        Parameters:
+            snapshot (EnvSnapshot):  If given, the script replays this
+                snapshot rather than running the environment's commands.
 
         Returns:
             Path:  The path to the script that was written, either the default
             (which always gets written to), or whatever the user requested with
             ``--output``.
         """
-        if self.set_environment is None:
-            self.load_set_environment()
-
         files = [self.tmp_load_matching_env_file]
         if self.args.output:
             files += [self.args.output]
 
-        for f in files:
+        with self.timer.phase(
+            "write script", lambda: {"files": len(files), "bytes": files[0].stat().st_size}
+            ):
+            self._write_load_matching_env(files, snapshot)
+        return files[-1]
+
+
+    def _write_load_matching_env(self, files, snapshot):
+        """
+        Write the ``load_matching_env`` script to each of ``files``.  See
+        :func:`write_load_matching_env`.
+        """
+        import shutil
+
+        for f in files[1 :]:
             if f.exists():
                 f.unlink()
-
             f.parent.mkdir(parents=True, exist_ok=True)
+
+        rendered = None
+        if snapshot is None:
+            rendered = self.config_cache.load_file(
+                "renders", self.load_matching_env_key, self.render_load_matching_env
+                )
+
+        def link_or_copy(tmp_name):
+            try:
+                os.link(rendered, tmp_name)
+            except OSError:
+                shutil.copyfile(rendered, tmp_name)
+
+        if rendered is not None:
+            try:
+                self.artifact_store.publish(files[0], link_or_copy)
+            except OSError:
+                # E.g., the cached script cannot be read; render it instead.
+                rendered = None
+
+        if rendered is None:
+            self.artifact_store.publish(
+                files[0], lambda tmp_name: self.render_load_matching_env(tmp_name, snapshot)
+                )
+            rendered = files[0]
+
+        # Copies, rather than links, so editing the output cannot affect the
+        # cache.
+        for f in files[1 :]:
+            shutil.copyfile(rendered, f)
+        self.artifact_store.evict()
+
+
+    @property
+    def load_matching_env_key(self):
+        """
+        The key under which the ``load_matching_env`` script for the selected
+        environment is stored in the :class:`ConfigCache`.  It is derived from
+        the environment name and the contents of every section in its ``use``
+        closure, so the script is re-rendered exactly when something it
+        depends on changes.
+
+        Returns:
+            str:  The cache key.
+        """
+        interpreter = "bash-optimized" if self.args.optimize else "bash"
+        return self.config_cache.hash_key(
+            interpreter,
+            self.renderer_fingerprint,
+            self.parsed_env_name,
+            self.env_spec_graph.fingerprint(self.parsed_env_name),
+            ) + ".sh"
+
+
+    @property
+    def renderer_fingerprint(self):
+        """
+        Identifies the code that renders ``load_matching_env`` scripts, i.e.,
+        LoadEnv itself, ``SetEnvironment``, and ``ConfigParserEnhanced``, by
+        their version strings, so scripts rendered by another version of any
+        of them are not reused.  Edits to a checkout that keep the version
+        are caught by the modification time of this file and of each package
+        directory, which changes when a file in it is replaced, as ``git`` and
+        most editors do.  Nothing is imported, and no source file is read
+        other than the dependencies' ``version.py``.
+
+        Returns:
+            list:  The ``[path, version, mtime_ns]`` of this file and each
+            package, with ``None`` for whatever could not be found.
+        """
+        if not hasattr(self, "_renderer_fingerprint"):
+            from loadenv.version import __version__
+
+            def mtime_ns(directory):
+                try:
+                    return os.stat(directory).st_mtime_ns
+                except OSError:
+                    return None
+
+            self._renderer_fingerprint = [
+                [str(_), __version__, mtime_ns(_)]
+                for _ in [Path(os.path.abspath(__file__)), _this_dir / "loadenv"]
+                ]
+            for module_name in ["configparserenhanced", "setenvironment"]:
+                directory = next(
+                    (
+                        Path(_) / module_name for _ in sys.path
+                        if (Path(_) / module_name / "__init__.py").is_file()
+                        ),
+                    None
+                    )
+                if directory is None:
+                    self._renderer_fingerprint.append([module_name, None, None])
+                    continue
+
+                version = None
+                try:
+                    with open(directory / "version.py") as F:
+                        for line in F:
+                            if line.startswith("__version__"):
+                                version = line.split("=", 1)[1].strip().strip("\"'")
+                except OSError:
+                    pass
+                self._renderer_fingerprint.append([str(directory), version, mtime_ns(directory)])
+        return self._renderer_fingerprint
+
+
+    def render_load_matching_env(self, filename, snapshot=None):
+        """
+        Render the ``load_matching_env`` script for the selected environment
+        to ``filename``.
+
+        Parameters:
+            filename (Path):  The file to write.
+            snapshot (EnvSnapshot):  If given, replay this snapshot rather than
+                running the environment's commands.
+        """
+        filename = Path(filename)
+        if filename.exists():
+            filename.unlink()
+
+        if snapshot is not None:
+            with open(filename, "w") as F:
+                F.write(
+                    f"# Snapshot of the '{self.parsed_env_name}' environment, "
+                    "replayed by LoadEnv.\n"
+                    )
+                F.write(snapshot.to_bash())
+        elif self.args.optimize and self.action_optimizer.supported:
+            with self.timer.phase("optimize"):
+                script = self.action_optimizer.to_bash(optimize=True)
+            with open(filename, "w") as F:
+                F.write(f"# The '{self.parsed_env_name}' environment, optimized by LoadEnv.\n")
+                F.write(script)
+        else:
+            if self.set_environment is None:
+                self.load_set_environment()
             self.set_environment.write_actions_to_file(
-                f, self.parsed_env_name, include_header=True, interpreter="bash"
+                filename, self.parsed_env_name, include_header=True, interpreter="bash"
                 )
 
-            with open(f, "a") as F:
-                F.write(f"export LOADED_ENV_NAME={self.parsed_env_name}")
+        with open(filename, "a") as F:
+            F.write(f"export LOADED_ENV_NAME={self.parsed_env_name}")
+
 
-        return files[-1]
 
     @property
     def env_stripped_build_name(self):
@@ -297,18 +1452,14 @@ class LoadEnv(FormattedMsg):
         delim = self.env_keyword_parser.delim
         build_name_list = self.args.build_name.split(delim)
 
-        env_names = self.env_keyword_parser.env_names
+        env_names = set(self.env_keyword_parser.env_names)
         l = [_ for _ in build_name_list if _ not in env_names]
 
-        env_name_aliases = self.env_keyword_parser.aliases
+        env_name_aliases = set(self.env_keyword_parser.aliases)
         l = [_ for _ in l if _ not in env_name_aliases]
 
-        ds = DetermineSystem(
-            self.args.build_name,
-            self.args.supported_systems_file,
-            force_build_name=self.args.force
-            )
-        l = [_ for _ in l if _ not in ds.supported_sys_names]
+        supported_sys_names = set(self.supported_sys_names)
+        l = [_ for _ in l if _ not in supported_sys_names]
 
         self._env_stripped_build_name = delim.join(l)
         return self._env_stripped_build_name
@@ -319,14 +1470,12 @@ class LoadEnv(FormattedMsg):
         """
         Returns:
             Path:  The path to the temporary `load_matching_env.sh` file that
-            gets written in the `/tmp` directory.
+            gets written in the :func:`default_runtime_dir`, i.e.,
+            ``$XDG_RUNTIME_DIR`` or ``/tmp/$USER``, and is cleaned up by the
+            :attr:`artifact_store`.
         """
         if not hasattr(self, "_tmp_load_matching_env_file"):
-            unique_str = uuid.uuid4().hex[: 8]
-            user = getpass.getuser()
-            self._tmp_load_matching_env_file = Path(
-                f"/tmp/{user}/load_matching_env_{unique_str}.sh"
-                ).resolve()
+            self._tmp_load_matching_env_file = self.artifact_store.new_path()
 
         return self._tmp_load_matching_env_file
 
@@ -340,25 +1489,81 @@ class LoadEnv(FormattedMsg):
             argparse.Namespace:  The parsed arguments.
         """
         if not hasattr(self, "_args"):
-            args = self.__parser().parse_args(self.argv)
+            self._args = self.parse_args(self.argv)
+        return self._args
 
-            if args.supported_systems_file is None:
-                args.supported_systems_file = Path(
-                    self.load_env_config_data["load-env"]["supported-systems"]
-                    ).resolve()
 
-            if args.supported_envs_file is None:
-                args.supported_envs_file = Path(
-                    self.load_env_config_data["load-env"]["supported-envs"]
-                    ).resolve()
+    def parse_args(self, argv):
+        """
+        Parse command line arguments, filling in the configuration files not
+        given on the command line from ``load-env.ini``.
 
-            if args.environment_specs_file is None:
-                args.environment_specs_file = Path(
-                    self.load_env_config_data["load-env"]["environment-specs"]
-                    ).resolve()
+        Parameters:
+            argv (list):  The command line arguments.
 
-            self._args = args
-        return self._args
+        Returns:
+            argparse.Namespace:  The parsed arguments.
+        """
+        args = self.__parser().parse_args(argv)
+
+        if args.supported_systems_file is None:
+            args.supported_systems_file = Path(
+                self.load_env_config_data["load-env"]["supported-systems"]
+                ).resolve()
+
+        if args.supported_envs_file is None:
+            args.supported_envs_file = Path(
+                self.load_env_config_data["load-env"]["supported-envs"]
+                ).resolve()
+
+        if args.environment_specs_file is None:
+            args.environment_specs_file = Path(
+                self.load_env_config_data["load-env"]["environment-specs"]
+                ).resolve()
+
+        return args
+
+
+    def update_argv(self, argv):
+        """
+        Switch this object to a new set of command line arguments that use the
+        same configuration files, keeping everything parsed from those files.
+        This is how a long-running process, e.g., :class:`LoadEnvServer`,
+        reuses one object for many requests.
+
+        Parameters:
+            argv (list):  The new command line arguments.
+
+        Raises:
+            ValueError:  If ``argv`` selects different configuration files.
+        """
+        args = self.parse_args(argv)
+        if self.config_files_for(args) != self.config_files_for(self.args):
+            raise ValueError(
+                self.get_formatted_msg(
+                    "update_argv() cannot change the configuration files in use."
+                    )
+                )
+
+        self.argv = argv
+        self._args = args
+        self.build_name = args.build_name
+        self.reset_timer()
+        if hasattr(self, "_tmp_load_matching_env_file"):
+            delattr(self, "_tmp_load_matching_env_file")
+
+
+    @staticmethod
+    def config_files_for(args):
+        """
+        Parameters:
+            args (argparse.Namespace):  Parsed command line arguments.
+
+        Returns:
+            tuple:  The ``supported-systems.ini``, ``supported-envs.ini``, and
+            ``environment-specs.ini`` files selected by ``args``.
+        """
+        return (args.supported_systems_file, args.supported_envs_file, args.environment_specs_file)
 
 
     def __parser(self):
@@ -368,6 +1573,9 @@ class LoadEnv(FormattedMsg):
             argument options.  This is to be used in conjunction with
             :attr:`args`.
         """
+        import argparse
+        import textwrap
+
         description = "[ Load Environment Utility ]".center(79, "-")
 
         description += (
@@ -440,6 +1648,36 @@ class LoadEnv(FormattedMsg):
             "available on your current machine.",
             )
 
+        parser.add_argument(
+            "--format",
+            action="store",
+            choices=["text", "json"],
+            default="text",
+            help="The format of the "
+            "--list-envs output:  'text' for a listing per system, or 'json' "
+            "for one JSON record per environment with its 'system', 'name', "
+            "'qualified_name', and 'aliases'.",
+            )
+
+        parser.add_argument(
+            "--filter",
+            action="store",
+            default=None,
+            metavar="PATTERN",
+            help="Only list environments "
+            "with a name or alias containing PATTERN, or matching it if it "
+            "is a glob, e.g., 'intel*'.",
+            )
+
+        parser.add_argument(
+            "--all-systems",
+            action="store_true",
+            default=False,
+            help="List the environments of "
+            "every system in supported-envs.ini rather than only the current "
+            "one.",
+            )
+
         parser.add_argument(
             "-o",
             "--output",
@@ -452,6 +1690,15 @@ class LoadEnv(FormattedMsg):
             "using this tool.",
             )
 
+        parser.add_argument(
+            "--lint",
+            action="store_true",
+            default=False,
+            help="Validate every section "
+            "in ``environment-specs.ini`` rather than only those "
+            "used by the selected environment, then exit.",
+            )
+
         parser.add_argument(
             "-f",
             "--force",
@@ -463,6 +1710,120 @@ class LoadEnv(FormattedMsg):
             "and the supported-systems.ini file.",
             )
 
+        parser.add_argument(
+            "--batch",
+            action="store",
+            default=None,
+            metavar="FILE",
+            help="Resolve each build name "
+            "listed in FILE (or stdin if FILE is '-'), one per line, and "
+            "print one JSON record per build name rather than loading an "
+            "environment.",
+            )
+
+        parser.add_argument(
+            "--compile-catalog",
+            action="store",
+            nargs="?",
+            const="",
+            default=None,
+            metavar="FILE",
+            help="Compile the configuration "
+            "files into one catalog file, which is used in place of them "
+            "until any of them changes.  FILE defaults to LOADENV_CATALOG, "
+            "or the 'catalog' in load-env.ini, or load-env.catalog next to "
+            "load-env.ini.  Also available as 'python3 -m loadenv compile'.",
+            )
+
+        parser.add_argument(
+            "--snapshot",
+            action="store_true",
+            default=False,
+            help="Record the changes the "
+            "environment makes once it is validated, and on later loads on "
+            "the same system replay them as plain exports rather than "
+            "running module commands.  Snapshots are discarded when the "
+            "environment's specs or the module files on MODULEPATH change.",
+            )
+
+        parser.add_argument(
+            "--revalidate",
+            action="store_true",
+            default=False,
+            help="Apply the environment to "
+            "validate it even if it was validated before on this system "
+            "and neither its specs nor the module files on MODULEPATH have "
+            "changed since.",
+            )
+
+        parser.add_argument(
+            "--timings",
+            action="store",
+            nargs="?",
+            const="-",
+            default=None,
+            metavar="FILE",
+            help="Write a JSON record of the "
+            "wall and CPU time spent in each phase, the sizes of the data "
+            "involved, and cache hits and misses to FILE, or to stderr if "
+            "FILE is omitted.  Setting LOADENV_TIMINGS=FILE does the same.",
+            )
+
+        parser.add_argument(
+            "--optimize",
+            action="store_true",
+            default=False,
+            help="Write a load_matching_env "
+            "script with redundant commands removed, e.g., variables that "
+            "are set and then overwritten, and with runs of prepends, "
+            "appends, and module loads merged.  Environments using "
+            "operations the optimizer does not support are written as "
+            "usual.",
+            )
+
+        parser.add_argument(
+            "--batch-modules",
+            action="store_true",
+            default=False,
+            help="Apply the environment "
+            "with one module command per run of consecutive module loads or "
+            "unloads, rather than one per action.  If a batch fails, its "
+            "actions are retried one at a time to find the one at fault.",
+            )
+
+        parser.add_argument(
+            "--validate-all",
+            action="store",
+            nargs="?",
+            const="",
+            default=None,
+            metavar="SYSTEM",
+            help="Apply every environment "
+            "on SYSTEM, or on the system matched via the hostname if SYSTEM "
+            "is omitted, each in its own child process, and report which "
+            "pass, fail, or time out.",
+            )
+
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            action="store",
+            type=int,
+            default=None,
+            help="The number of environments "
+            "--validate-all applies at once.  Defaults to the number of CPUs.",
+            )
+
+        parser.add_argument(
+            "--timeout",
+            action="store",
+            type=float,
+            default=None,
+            metavar="SECONDS",
+            help="With --validate-all, fail "
+            "environments that take longer than this to apply.",
+            )
+
         config_files = parser.add_argument_group("configuration file overrides")
 
         config_files.add_argument(
@@ -517,6 +1878,17 @@ class LoadEnv(FormattedMsg):
                             help=argparse.SUPPRESS)
                             # help="Path to load-matching-env file in /tmp/$USER/")
 
+        # Used by load-env.sh to receive the path to the load_matching_env file
+        # without a temporary file.
+        parser.add_argument(
+            "--load-matching-env-fd", action="store", type=int, default=None, help=argparse.SUPPRESS
+            )
+
+        # Used by --validate-all to apply each environment in a child process.
+        parser.add_argument(
+            "--apply-only", action="store_true", default=False, help=argparse.SUPPRESS
+            )
+
         return parser
 
 
@@ -532,16 +1904,70 @@ def main(argv):
     DOCSTRING
     """
     le = LoadEnv(argv)
-    if le.args.list_envs:
-        le.list_envs()
-    le.apply_env()
-    print(f"Environment '{le.parsed_env_name}' validated.")
-    le.write_load_matching_env()
+    try:
+        if le.args.compile_catalog is not None:
+            filename = le.compile_catalog(le.args.compile_catalog or None)
+            print(f"Compiled '{filename}'.")
+            return 0
+        if le.args.batch is not None:
+            if le.args.batch == "-":
+                num_errors = le.resolve_batch(sys.stdin)
+            else:
+                with open(le.args.batch, "r") as F:
+                    num_errors = le.resolve_batch(F)
+            return 1 if num_errors > 0 else 0
+        if le.args.validate_all is not None:
+            results = le.validate_all(
+                le.args.validate_all or None, le.args.jobs, le.args.timeout, le.args.revalidate
+                )
+            print(le.format_validate_all_report(results))
+            return 0 if all(_["status"] == "pass" for _ in results) else 1
+        if le.args.apply_only:
+            le.apply_env()
+            return
+        if le.args.list_envs:
+            num_envs = le.list_envs(le.args.format, le.args.filter, le.args.all_systems)
+            sys.exit(0 if num_envs > 0 else 1)
+        if le.args.lint:
+            le.lint_environment_specs()
+            print(f"All sections in '{le.args.environment_specs_file}' validated.")
+            return
+        validate_and_write(le)
+    finally:
+        le.write_timings()
+
+
+
+def validate_and_write(le):
+    """
+    Validate the environment selected by ``le``, write the
+    ``load_matching_env`` script, and record its location if requested.  This
+    is the work :func:`main` does for a normal load, and is shared with
+    :class:`LoadEnvServer`.
+
+    Parameters:
+        le (LoadEnv):  The object whose environment should be loaded.
+    """
+    with le.timer.phase("validate", lambda: {"result": result}):
+        snapshot = le.load_snapshot() if le.args.snapshot else None
+        if snapshot is not None:
+            result = "snapshot"
+            print(f"Environment '{le.parsed_env_name}' replayed from a snapshot.")
+        elif not (le.args.snapshot or le.args.revalidate) and le.is_validated():
+            result = "cached"
+            print(f"Environment '{le.parsed_env_name}' validated (cached).")
+        else:
+            result = "applied"
+            le.apply_env()
+            print(f"Environment '{le.parsed_env_name}' validated.")
+    le.write_load_matching_env(snapshot)
 
     if le.args.load_matching_env_location is not None:
         with open(f"{le.args.load_matching_env_location}", "w") as F:
             F.write(str(le.tmp_load_matching_env_file))
+    if le.args.load_matching_env_fd is not None:
+        os.write(le.args.load_matching_env_fd, f"{le.tmp_load_matching_env_file}\n".encode())
 
 
 if __name__ == "__main__":
-    main(sys.argv[1 :])
+    sys.exit(main(sys.argv[1 :]))
@@ -0,0 +1,225 @@
+import re
+import shlex
+
+
+
+class ActionOptimizer(object):
+    """
+    Renders an environment's expanded actions, e.g., from
+    :func:`EnvSpecGraph.expanded_actions`, as a bash script, optionally after
+    removing redundant work:
+
+        * ``envvar-*`` actions whose result is overwritten by a later
+          ``envvar-set`` or ``envvar-unset`` before anything reads it are
+          dropped.
+        * Runs of ``envvar-prepend`` or ``envvar-append`` on the same variable
+          are merged into one ``export``.
+        * Repeated ``module-purge`` actions in a row are reduced to one.
+        * Runs of ``module-load`` actions are coalesced into one
+          ``module load`` command.
+
+    Sourcing the optimized script gives the same final environment as
+    sourcing the verbatim one.  Module commands may read or change any
+    variable, so no envvar action is dropped or merged across one.
+
+    Only the operations in :attr:`SUPPORTED_OPERATIONS` can be rendered; see
+    :attr:`supported`.
+
+    Usage::
+
+        optimizer = ActionOptimizer(graph.expanded_actions(env_name))
+        if optimizer.supported:
+            script = optimizer.to_bash(optimize=True)
+
+    Parameters:
+        actions (list):  ``(operation, parameter, value)`` action tuples.
+    """
+
+    SUPPORTED_OPERATIONS = [
+        "envvar-set",
+        "envvar-unset",
+        "envvar-prepend",
+        "envvar-append",
+        "envvar-find-in-path",
+        "module-load",
+        "module-unload",
+        "module-purge",
+        "module-swap",
+        "module-use",
+        "module-unuse",
+        ]
+
+    # References to other variables in values, i.e., ``${NAME}`` or
+    # ``${NAME|ENV}``, which are expanded when the action is applied.
+    REFERENCE_REGEX = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)(?:\|ENV)?\}")
+
+    def __init__(self, actions):
+        self.actions = [(op, param, "" if value is None else value) for op, param, value in actions]
+
+
+    @property
+    def supported(self):
+        """
+        Whether every action can be rendered by this class.
+        """
+        return all(_[0] in self.SUPPORTED_OPERATIONS for _ in self.actions)
+
+
+    def optimize(self):
+        """
+        Returns:
+            list:  The actions, with dead ``envvar-*`` actions dropped, runs of
+            prepends or appends merged, and repeated ``module-purge`` actions
+            reduced to one.
+        """
+        return self._merge(self._drop_dead_actions(self.actions))
+
+
+    def _drop_dead_actions(self, actions):
+        """
+        Drop each ``envvar-*`` action whose variable is set or unset again
+        before it is read.  Walking backwards, ``overwritten`` holds the
+        variables that will be overwritten before they are next read.
+        """
+        live = []
+        overwritten = set()
+        for action in reversed(actions):
+            op, name, value = action
+            if op.startswith("module-"):
+                overwritten.clear()
+                live.append(action)
+                continue
+
+            if name in overwritten:
+                continue
+            live.append(action)
+            if op in ["envvar-set", "envvar-unset", "envvar-find-in-path"]:
+                overwritten.add(name)
+            else:
+                overwritten.discard(name)
+            overwritten -= set(self.REFERENCE_REGEX.findall(value))
+            if op == "envvar-find-in-path":
+                overwritten.discard("PATH")
+
+        live.reverse()
+        return live
+
+
+    def _merge(self, actions):
+        """
+        Merge runs of prepends or appends to the same variable, and runs of
+        ``module-purge`` actions.  Empty values and values referencing any
+        variable are never merged, since ``:`` would not be inserted the same
+        way if the value is, or the reference expands to, an empty string.
+        """
+        merged = []
+        for action in actions:
+            op, name, value = action
+            if merged != []:
+                previous_op, previous_name, previous_value = merged[-1]
+                if op == "module-purge" and previous_op == "module-purge":
+                    continue
+                if (
+                    op in ["envvar-prepend", "envvar-append"]
+                    and (op, name) == (previous_op, previous_name)
+                    and self._mergeable(name, value)
+                    and self._mergeable(name, previous_value)
+                    ):
+                    if op == "envvar-prepend":
+                        merged[-1] = (op, name, f"{value}:{previous_value}")
+                    else:
+                        merged[-1] = (op, name, f"{previous_value}:{value}")
+                    continue
+            merged.append(action)
+        return merged
+
+
+    def _mergeable(self, name, value):
+        """
+        Returns:
+            bool:  ``True`` if a prepend or append of ``value`` to ``name`` can
+            be merged with its neighbors.
+        """
+        return value != "" and "${" not in value
+
+
+    def to_bash(self, optimize=False):
+        """
+        Parameters:
+            optimize (bool):  Render :func:`optimize`\\ d actions, with runs of
+                ``module-load`` coalesced into one command.
+
+        Returns:
+            str:  Bash commands that apply the actions.
+        """
+        actions = self.optimize() if optimize else self.actions
+        lines = []
+        modules = []
+        for op, name, value in actions:
+            if op == "module-load" and optimize:
+                modules.append(self._module(name, value))
+                continue
+            if modules != []:
+                lines.append("module load " + " ".join(shlex.quote(_) for _ in modules))
+                modules = []
+            lines.append(self._bash_command(op, name, value))
+        if modules != []:
+            lines.append("module load " + " ".join(shlex.quote(_) for _ in modules))
+        return "\n".join(lines) + "\n"
+
+
+    def _bash_command(self, op, name, value):
+        """
+        Returns:
+            str:  The bash command for one action.
+        """
+        if op == "envvar-set":
+            return f"export {name}={self._bash_value(value)}"
+        elif op == "envvar-unset":
+            return f"unset {name}"
+        elif op == "envvar-prepend":
+            return f'export {name}={self._bash_value(value)}"${{{name}:+:${{{name}}}}}"'
+        elif op == "envvar-append":
+            return f'export {name}="${{{name}:+${{{name}}}:}}"{self._bash_value(value)}'
+        elif op == "envvar-find-in-path":
+            return f'export {name}="$(command -v {self._bash_value(value)})"'
+        elif op == "module-load":
+            return f"module load {shlex.quote(self._module(name, value))}"
+        elif op == "module-unload":
+            return f"module unload {shlex.quote(name)}"
+        elif op == "module-purge":
+            return "module purge"
+        elif op == "module-swap":
+            return f"module swap {shlex.quote(name)} {shlex.quote(value)}"
+        elif op in ["module-use", "module-unuse"]:
+            return f"module {op[len('module-') :]} {self._bash_value(value)}"
+        raise ValueError(f"Unsupported operation '{op}'.")
+
+
+    @staticmethod
+    def _module(name, version):
+        """
+        Returns:
+            str:  The ``name/version`` of a module, or ``name`` if there is no
+            version.
+        """
+        return name if version == "" else f"{name}/{version}"
+
+
+    @classmethod
+    def _bash_value(cls, value):
+        """
+        Returns:
+            str:  ``value`` quoted for bash, with references to other
+            variables left to be expanded.
+        """
+        parts = []
+        position = 0
+        for match in cls.REFERENCE_REGEX.finditer(value):
+            if match.start() > position:
+                parts.append(shlex.quote(value[position : match.start()]))
+            parts.append(f'"${{{match.group(1)}}}"')
+            position = match.end()
+        if position < len(value) or parts == []:
+            parts.append(shlex.quote(value[position :]))
+        return "".join(parts)
@@ -0,0 +1,170 @@
+import contextlib
+import fnmatch
+import os
+from pathlib import Path
+import stat
+import time
+
+
+
+class ArtifactStore(object):
+    """
+    A managed directory of generated files, e.g., the ``load_matching_env``
+    scripts written on every load, which would otherwise pile up on
+    long-lived CI runners.
+
+    Files are published atomically:  they are written under a temporary name
+    in the same directory and renamed into place, so nobody ever sources a
+    partially written script.  Publishing a file marks it as used.
+
+    :func:`evict` removes files that have not been used for :attr:`max_age`
+    seconds, and then the least recently used files until the rest take up
+    at most :attr:`max_bytes`.  Files used in the last :attr:`min_age`
+    seconds are never removed, since another job may be about to source
+    them.  Eviction is safe when many jobs share the directory:  one process
+    evicts at a time, holding an ``flock`` on a lock file, others skip it
+    rather than wait, and it is done at most once per
+    :attr:`evict_interval` seconds.
+
+    The limits default to the ``LOADENV_ARTIFACT_MAX_AGE`` (seconds) and
+    ``LOADENV_ARTIFACT_MAX_BYTES`` environment variables, or else one week
+    and 16 MiB.
+
+    Usage::
+
+        store = ArtifactStore(default_runtime_dir())
+        path = store.new_path()
+        store.publish(path, lambda tmp: tmp.write_text("export FOO=bar\\n"))
+        store.evict()
+
+    Parameters:
+        directory (str, Path):  The directory holding the files.
+        pattern (str):  The ``fnmatch`` pattern of the file names managed;
+            anything else in ``directory`` is left alone.
+        max_age (float):  Seconds after its last use that a file is removed.
+        max_bytes (int):  The total size of the files to keep.
+        min_age (float):  Seconds after its last use that a file is kept
+            regardless.
+        evict_interval (float):  Seconds between evictions.
+    """
+
+    LOCK_FILE = ".loadenv_artifacts.lock"
+
+    def __init__(
+        self,
+        directory,
+        pattern="load_matching_env_*.sh",
+        max_age=None,
+        max_bytes=None,
+        min_age=600,
+        evict_interval=60,
+        ):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        if max_age is None:
+            max_age = float(os.environ.get("LOADENV_ARTIFACT_MAX_AGE", "") or 7 * 24 * 3600)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("LOADENV_ARTIFACT_MAX_BYTES", "") or 16 * 2**20)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.evict_interval = evict_interval
+
+
+    def new_path(self):
+        """
+        Returns:
+            Path:  A new, unique path in :attr:`directory` matching
+            :attr:`pattern`.  Nothing is created.
+        """
+        return (self.directory / self.pattern.replace("*", os.urandom(4).hex(), 1)).resolve()
+
+
+    def publish(self, path, write):
+        """
+        Atomically create or replace ``path`` and mark it as used.
+
+        Parameters:
+            path (Path):  The file to publish, in :attr:`directory`.
+            write (callable):  A function taking the temporary path to write
+                the contents to.
+        """
+        path = Path(path)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp_name = path.parent / f".{path.name}.{os.urandom(4).hex()}.tmp"
+        try:
+            write(tmp_name)
+            os.replace(tmp_name, path)
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
+        os.utime(path)
+
+
+    def evict(self, force=False):
+        """
+        Remove files that are too old or least recently used, unless another
+        process is doing so, or it was done in the last
+        :attr:`evict_interval` seconds.  Failures are ignored.
+
+        Parameters:
+            force (bool):  Ignore the :attr:`evict_interval`.
+
+        Returns:
+            list:  The paths removed.
+        """
+        import fcntl
+
+        lock_file = self.directory / self.LOCK_FILE
+        with contextlib.suppress(OSError):
+            if not force and time.time() - os.stat(lock_file).st_mtime < self.evict_interval:
+                return []
+
+        try:
+            fd = os.open(lock_file, os.O_WRONLY | os.O_CREAT, 0o600)
+        except OSError:
+            return []
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return []
+            os.utime(fd)
+            return self._evict()
+        finally:
+            os.close(fd)
+
+
+    def _evict(self):
+        """
+        Remove files, assuming the lock is held.  See :func:`evict`.
+        """
+        now = time.time()
+        tmp_pattern = f".{self.pattern}.*.tmp"
+        entries = []
+        with contextlib.suppress(OSError), os.scandir(self.directory) as scan:
+            for entry in scan:
+                is_tmp = fnmatch.fnmatchcase(entry.name, tmp_pattern)
+                if not (is_tmp or fnmatch.fnmatchcase(entry.name, self.pattern)):
+                    continue
+                try:
+                    info = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISREG(info.st_mode):
+                    entries.append((info.st_mtime, info.st_size, entry.path, is_tmp))
+
+        # Least recently used first.
+        entries.sort()
+        total = sum(_[1] for _ in entries)
+        removed = []
+        for mtime, size, path, is_tmp in entries:
+            age = now - mtime
+            if age < self.min_age:
+                break
+            if is_tmp or age > self.max_age or total > self.max_bytes:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+                    removed.append(path)
+                total -= size
+        return removed
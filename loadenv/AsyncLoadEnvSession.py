@@ -0,0 +1,220 @@
+import asyncio
+import os
+import signal
+import time
+
+try:                                                                                # pragma: no cover
+    from .LoadEnvSession import LoadEnvSession
+except ImportError:                                                                 # pragma: no cover
+    from LoadEnvSession import LoadEnvSession
+
+
+
+class AsyncLoadEnvSession(object):
+    """
+    An ``asyncio`` API over a :class:`LoadEnvSession`, for services that
+    resolve and validate environments for many builds at once.
+
+    Validating an environment means applying it, i.e., running its module
+    commands, which changes the environment of the process doing so.  As with
+    ``--validate-all``, each validation therefore applies the environment in
+    a child ``load_env.py --apply-only`` process, started with
+    ``asyncio.create_subprocess_exec`` so the event loop is never blocked and
+    no thread is needed per validation.  At most :attr:`max_concurrency`
+    children run at once, a child still running after the timeout is killed
+    along with everything it started, and so is the child of a cancelled
+    validation.  Passes are stored and reused as in ``--validate-all``.
+
+    Resolving and rendering are quick, in-process operations on the shared
+    :class:`LoadEnvSession`, and run in the event loop's default executor.
+
+    Usage::
+
+        session = AsyncLoadEnvSession(max_concurrency=16, timeout=300)
+        resolution = await session.resolve("Trilinos_rhel7_clang-openmp_opt")
+        results = await asyncio.gather(
+            *[session.validate(_) for _ in build_names], return_exceptions=True
+            )
+
+    Parameters:
+        session (LoadEnvSession):  The session to use.  If ``None``, one is
+            created from ``session_kwargs``.
+        max_concurrency (int):  The number of validations to run at once.
+            Defaults to the number of CPUs.
+        timeout (float):  The default number of seconds after which a
+            validation that is still running is killed.  Defaults to no
+            limit.
+        session_kwargs:  Passed to :class:`LoadEnvSession`.
+    """
+
+    def __init__(self, session=None, max_concurrency=None, timeout=None, **session_kwargs):
+        self.session = LoadEnvSession(**session_kwargs) if session is None else session
+        if max_concurrency is None:
+            max_concurrency = os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+        self._semaphore_loop = None
+
+
+    @property
+    def semaphore(self):
+        """
+        The ``asyncio.Semaphore`` bounding the number of validations running
+        at once in the current event loop.
+        """
+        loop = asyncio.get_event_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+
+    async def run_in_executor(self, function, *args):
+        """
+        Run a blocking call to the :attr:`session` in the default executor.
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, function, *args)
+
+
+    async def resolve(self, build_name):
+        """
+        See :func:`LoadEnvSession.resolve`.
+
+        Returns:
+            Resolution:  The environment selected by ``build_name``.
+        """
+        return await self.run_in_executor(self.session.resolve, build_name)
+
+
+    async def render(self, resolution):
+        """
+        See :func:`LoadEnvSession.render`.
+
+        Parameters:
+            resolution (Resolution, str):  A resolved environment, or a build
+                name to resolve first.
+
+        Returns:
+            Path:  The new ``load_matching_env`` script.
+        """
+        if isinstance(resolution, str):
+            resolution = await self.resolve(resolution)
+        return await self.run_in_executor(self.session.render, resolution)
+
+
+    async def validate(self, resolution, timeout=None, revalidate=False):
+        """
+        Validate an environment by applying it in a child process.
+
+        Parameters:
+            resolution (Resolution, str):  A resolved environment, or a build
+                name to resolve first.
+            timeout (float):  Seconds after which the child is killed.
+                Defaults to :attr:`timeout`.
+            revalidate (bool):  Apply the environment even if a pass is stored
+                for it.
+
+        Returns:
+            dict:  The ``env_name``, ``status`` (``"pass"``, ``"fail"``, or
+            ``"timeout"``), ``wall_s``, and ``output`` of the child, and
+            whether the outcome was ``cached``, as in
+            :func:`LoadEnv.validate_all`.
+
+        Raises:
+            LoadEnvSessionError:  If a build name cannot be resolved.
+        """
+        if isinstance(resolution, str):
+            resolution = await self.resolve(resolution)
+        timeout = self.timeout if timeout is None else timeout
+
+        record, command = await self.run_in_executor(self._plan_validation, resolution, revalidate)
+        if record is not None and record["outcome"] == "pass":
+            return {
+                "env_name": resolution.env_name,
+                "status": "pass",
+                "wall_s": 0.0,
+                "output": "",
+                "cached": True,
+                }
+
+        environ = dict(os.environ)
+        environ.pop("LOADENV_TIMINGS", None)
+        async with self.semaphore:
+            result = await self.run_command(command, environ, timeout)
+        return dict(env_name=resolution.env_name, cached=False, **result)
+
+
+    async def validate_many(self, build_names, timeout=None, revalidate=False):
+        """
+        Resolve and validate several build names at once.
+
+        Parameters:
+            build_names (iterable):  The build names.
+            timeout (float):  See :func:`validate`.
+            revalidate (bool):  See :func:`validate`.
+
+        Returns:
+            list:  For each build name, in order, the result of
+            :func:`validate`, or the :class:`LoadEnvSessionError` raised while
+            resolving it.
+        """
+        return await asyncio.gather(
+            *[self.validate(_, timeout, revalidate) for _ in build_names], return_exceptions=True
+            )
+
+
+    @staticmethod
+    async def run_command(command, environ=None, timeout=None):
+        """
+        The ``asyncio`` counterpart of :func:`LoadEnv.validate_in_child`:  run
+        ``command`` in a new session, killing the whole session if it takes
+        longer than ``timeout`` seconds, or if the calling task is cancelled.
+
+        Returns:
+            dict:  The ``status`` (``"pass"``, ``"fail"``, or ``"timeout"``),
+            ``wall_s``, and the combined ``output`` of the child.
+        """
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            env=environ,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+            )
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout)
+            status = "pass" if process.returncode == 0 else "fail"
+        except asyncio.TimeoutError:
+            os.killpg(process.pid, signal.SIGKILL)
+            output, _ = await process.communicate()
+            status = "timeout"
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                os.killpg(process.pid, signal.SIGKILL)
+                await process.wait()
+            raise
+        return {
+            "status": status,
+            "wall_s": round(time.perf_counter() - start, 3),
+            "output": output.decode(errors="replace"),
+            }
+
+
+    def _plan_validation(self, resolution, revalidate):
+        """
+        Returns:
+            tuple:  The stored validation record of ``resolution``, or
+            ``None`` if there is none or ``revalidate`` is set, and the
+            command that validates it in a child process.
+        """
+        with self.session.lock:
+            le = self.session.load_env
+            record = None
+            if not revalidate:
+                record = le.load_environment_state_record("validations", resolution.env_name)
+            env_name = resolution.env_name[len(resolution.system_name) + 1 :]
+            return record, le.validate_all_command(resolution.system_name, env_name)
+
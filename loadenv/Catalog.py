@@ -0,0 +1,311 @@
+from collections.abc import Mapping
+import json
+import mmap
+import os
+from pathlib import Path
+import re
+import struct
+
+try:                                                                                # pragma: no cover
+    from .ConfigCache import ConfigData
+    from .EnvSpecGraph import EnvSpecGraph
+    from .version import __version__
+except ImportError:                                                                 # pragma: no cover
+    from ConfigCache import ConfigData
+    from EnvSpecGraph import EnvSpecGraph
+    from version import __version__
+
+
+
+class _CatalogSections(Mapping):
+    """
+    The sections of one configuration file in a :class:`Catalog`.  Each
+    section is only decoded when it is first looked up.
+    """
+
+    def __init__(self, catalog, kind, field=None):
+        self.catalog = catalog
+        self.kind = kind
+        self.field = field
+
+
+    def __getitem__(self, section):
+        record = self.catalog.record(self.kind, section)
+        return record if self.field is None else record[self.field]
+
+
+    def __iter__(self):
+        return iter(self.catalog.index[self.kind])
+
+
+    def __len__(self):
+        return len(self.catalog.index[self.kind])
+
+
+    def __contains__(self, section):
+        return section in self.catalog.index[self.kind]
+
+
+
+class CatalogSpecGraph(EnvSpecGraph):
+    """
+    An :class:`EnvSpecGraph` whose expanded actions and fingerprints were
+    computed when the :class:`Catalog` was compiled, so only the records of
+    the environments actually used are decoded.
+    """
+
+    def __init__(self, catalog):
+        super().__init__(catalog.data("environment-specs"))
+        self.catalog = catalog
+
+
+    def fingerprint(self, section):
+        """
+        See :func:`EnvSpecGraph.fingerprint`.
+        """
+        if section not in self.sections:
+            return super().fingerprint(section)
+        return self.catalog.record("environment-specs", section)["fingerprint"]
+
+
+    def expanded_actions(self, section):
+        """
+        See :func:`EnvSpecGraph.expanded_actions`.
+        """
+        if section not in self.sections:
+            return super().expanded_actions(section)
+        return [tuple(_) for _ in self.catalog.record("environment-specs", section)["actions"]]
+
+
+    def actions_fingerprint(self, section):
+        """
+        See :func:`EnvSpecGraph.actions_fingerprint`.
+        """
+        if section not in self.sections:
+            return super().actions_fingerprint(section)
+        return self.catalog.record("environment-specs", section)["actions_fingerprint"]
+
+
+
+class Catalog(object):
+    """
+    A single-file, compiled form of ``supported-systems.ini``,
+    ``supported-envs.ini``, and ``environment-specs.ini``, so that loading an
+    environment on a shared install neither reads nor parses the ``.ini``
+    files, which are often on NFS.  It holds:
+
+        * The host regex table from ``supported-systems.ini``, with inline
+          comments already stripped from the regexes.
+        * The environments and aliases of each system, after ``use``
+          expansion, from ``supported-envs.ini``.
+        * The options of each section of ``environment-specs.ini``, along with
+          its pre-expanded actions and fingerprints.
+
+    The file starts with :attr:`MAGIC`, the format version, and the length of
+    a JSON header holding the LoadEnv version, the ``mtime_ns`` and ``size``
+    of each source file, the host regex table, and the offset and length of
+    each section's record.
+    The records follow, each encoded as JSON.  The file is memory-mapped, and
+    a record is only decoded when its section is first used.
+
+    A catalog is :func:`stale` once any source file changes, in which case
+    :class:`LoadEnv` falls back to the ``.ini`` files.
+
+    Usage::
+
+        Catalog.compile("load-env.catalog", files, data, graph)
+        catalog = Catalog("load-env.catalog")
+        if not catalog.stale(files):
+            data = catalog.data("supported-envs")
+
+    Parameters:
+        filename (str, Path):  The catalog file.
+
+    Raises:
+        ValueError:  If ``filename`` is not a catalog in the current format
+            written by the current LoadEnv version.
+    """
+
+    MAGIC = b"LOADENV-CATALOG\n"
+    FORMAT_VERSION = 2
+    KINDS = ["supported-systems", "supported-envs", "environment-specs"]
+
+    # The magic bytes, format version, and header length.
+    _PREFIX = struct.Struct(f"<{len(MAGIC)}sII")
+
+    def __init__(self, filename):
+        self.filename = Path(filename)
+        with open(self.filename, "rb") as F:
+            self._map = mmap.mmap(F.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < self._PREFIX.size:
+            raise ValueError(f"'{self.filename}' is not a LoadEnv catalog.")
+        magic, format_version, header_length = self._PREFIX.unpack_from(self._map)
+        if magic != self.MAGIC:
+            raise ValueError(f"'{self.filename}' is not a LoadEnv catalog.")
+
+        header = json.loads(self._map[self._PREFIX.size : self._PREFIX.size + header_length])
+        if format_version != self.FORMAT_VERSION or header["loadenv_version"] != __version__:
+            raise ValueError(f"'{self.filename}' was compiled by a different version of LoadEnv.")
+
+        self.sources = header["sources"]
+        self.host_regexes = header["host_regexes"]
+        self.index = header["index"]
+        self._offset = self._PREFIX.size + header_length
+        self._records = {}
+
+
+    def record(self, kind, section):
+        """
+        Decode the record of a section, once.
+
+        Parameters:
+            kind (str):  One of :attr:`KINDS`.
+            section (str):  The name of the section.
+
+        Returns:
+            dict:  The record.
+        """
+        key = (kind, section)
+        if key not in self._records:
+            offset, length = self.index[kind][section]
+            start = self._offset + offset
+            self._records[key] = json.loads(self._map[start : start + length])
+        return self._records[key]
+
+
+    def data(self, kind):
+        """
+        Parameters:
+            kind (str):  One of :attr:`KINDS`.
+
+        Returns:
+            ConfigData:  The contents of the file, decoded lazily.  For
+            ``"environment-specs"``, the raw, un-expanded contents.
+        """
+        field = "options" if kind == "environment-specs" else None
+        return ConfigData(_CatalogSections(self, kind, field))
+
+
+    def stale(self, files):
+        """
+        Parameters:
+            files (dict):  The file for each of :attr:`KINDS` in use.
+
+        Returns:
+            bool:  ``True`` if ``files`` are not the files the catalog was
+            compiled from, or if any of them has changed since.
+        """
+        return any(self.sources.get(kind) != self.source_record(files[kind]) for kind in self.KINDS)
+
+
+    def match_hostname(self, hostname):
+        """
+        Match ``hostname`` against the host regex table, in the same way as
+        ``DetermineSystem``.
+
+        Parameters:
+            hostname (str):  The hostname.
+
+        Returns:
+            list:  The names of the systems with a regex matching ``hostname``.
+        """
+        return [
+            name for name, regexes in self.host_regexes.items()
+            if any(re.match(regex, hostname) is not None for regex in regexes)
+            ]
+
+
+    @staticmethod
+    def host_regex(option):
+        """
+        Parameters:
+            option (str):  An option of ``supported-systems.ini``.
+
+        Returns:
+            str:  The hostname regex in ``option``, without any inline comment
+            or surrounding whitespace, as ``DetermineSystem`` uses it.
+        """
+        return option.split("#", 1)[0].strip()
+
+
+    @staticmethod
+    def source_record(filename):
+        """
+        Returns:
+            dict:  The resolved path, ``mtime_ns``, and ``size`` of
+            ``filename``, or ``None`` if it does not exist.
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return {
+            "path": str(Path(filename).resolve()),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            }
+
+
+    @classmethod
+    def compile(cls, filename, files, data, graph):
+        """
+        Write a catalog atomically.
+
+        Parameters:
+            filename (str, Path):  The catalog file to write.
+            files (dict):  The source file of each of :attr:`KINDS`.
+            data (dict):  The :class:`ConfigData` of each of :attr:`KINDS`;
+                for ``"environment-specs"``, the raw, un-expanded contents.
+            graph (EnvSpecGraph):  The graph of the ``"environment-specs"``
+                data.
+        """
+        import tempfile
+
+        index = {}
+        records = []
+        offset = 0
+        for kind in cls.KINDS:
+            index[kind] = {}
+            for section in data[kind].sections():
+                record = dict(data[kind][section])
+                if kind == "environment-specs":
+                    record = {
+                        "options": record,
+                        "actions": graph.expanded_actions(section),
+                        "fingerprint": graph.fingerprint(section),
+                        "actions_fingerprint": graph.actions_fingerprint(section),
+                        }
+                encoded = json.dumps(record).encode()
+                index[kind][section] = [offset, len(encoded)]
+                records.append(encoded)
+                offset += len(encoded)
+
+        systems = data["supported-systems"]
+        header = json.dumps({
+            "loadenv_version": __version__,
+            "sources": {kind: cls.source_record(files[kind]) for kind in cls.KINDS},
+            "host_regexes": {
+                name: [cls.host_regex(_) for _ in systems.options(name)]
+                for name in systems.sections()
+                },
+            "index": index,
+            }).encode()
+
+        filename = Path(filename)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=str(filename.parent), prefix=f".{filename.name}.")
+        try:
+            # Catalogs are meant to be shared, unlike mkstemp()'s files.
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_name, 0o666 & ~umask)
+            with os.fdopen(fd, "wb") as F:
+                F.write(cls._PREFIX.pack(cls.MAGIC, cls.FORMAT_VERSION, len(header)))
+                F.write(header)
+                for record in records:
+                    F.write(record)
+            os.replace(tmp_name, str(filename))
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
@@ -0,0 +1,416 @@
+import contextlib
+import hashlib
+import json
+import os
+import stat
+from pathlib import Path
+
+try:                                                                                # pragma: no cover
+    from .version import __version__
+except ImportError:                                                                 # pragma: no cover
+    from version import __version__
+
+
+
+class ConfigData(object):
+    """
+    A lightweight, ``dict``-backed stand-in for the ``configparserenhanceddata``
+    object produced by ``ConfigParserEnhanced``.  It supports the subset of the
+    interface used by LoadEnv and KeywordParser so that data loaded from the
+    :class:`ConfigCache` can be used in place of a freshly-parsed file.
+
+    Parameters:
+        sections (dict):  A mapping of section names to ``{option: value}``
+            dictionaries.
+    """
+
+    def __init__(self, sections=None):
+        self._sections = {} if sections is None else sections
+
+
+    def __getitem__(self, section):
+        return self._sections[section]
+
+
+    def __contains__(self, section):
+        return section in self._sections
+
+
+    def __iter__(self):
+        return iter(self._sections)
+
+
+    def __len__(self):
+        return len(self._sections)
+
+
+    def sections(self):
+        """
+        Returns:
+            list:  The names of the sections in the data.
+        """
+        return list(self._sections.keys())
+
+
+    def keys(self):
+        """
+        Returns:
+            list:  The names of the sections in the data.
+        """
+        return self.sections()
+
+
+    def has_section(self, section):
+        """
+        Returns:
+            bool:  ``True`` if ``section`` exists in the data.
+        """
+        return section in self._sections
+
+
+    def options(self, section):
+        """
+        Returns:
+            list:  The option names for ``section``.
+        """
+        return list(self._sections[section].keys())
+
+
+    def has_option(self, section, option):
+        """
+        Returns:
+            bool:  ``True`` if ``option`` exists in ``section``.
+        """
+        return section in self._sections and option in self._sections[section]
+
+
+    def items(self, section):
+        """
+        Returns:
+            list:  The ``(option, value)`` pairs for ``section``.
+        """
+        return list(self._sections[section].items())
+
+
+    def get(self, section, option):
+        """
+        Returns:
+            str:  The value of ``option`` in ``section``.
+        """
+        return self._sections[section][option]
+
+
+    def to_dict(self):
+        """
+        Returns:
+            dict:  The underlying ``{section: {option: value}}`` mapping.
+        """
+        return self._sections
+
+
+    @classmethod
+    def from_configparserenhanceddata(cls, data):
+        """
+        Convert a ``configparserenhanceddata`` object into a :class:`ConfigData`
+        object, which can be serialized into the :class:`ConfigCache`.
+
+        Parameters:
+            data (configparserenhanceddata):  The data to convert.
+
+        Returns:
+            ConfigData:  The converted data.
+        """
+        sections = {}
+        for section in data.sections():
+            sections[section] = {key: data[section][key] for key in data[section].keys()}
+        return cls(sections)
+
+
+    @classmethod
+    def from_configparser(cls, parser):
+        """
+        Convert a raw ``configparser.ConfigParser`` object, where ``use``
+        statements have not been expanded, into a :class:`ConfigData` object.
+
+        Parameters:
+            parser (configparser.ConfigParser):  The parser to convert.
+
+        Returns:
+            ConfigData:  The converted data.
+        """
+        sections = {}
+        for section in parser.sections():
+            sections[section] = {key: value for key, value in parser.items(section, raw=True)}
+        return cls(sections)
+
+
+
+class ConfigCache(object):
+    """
+    A persistent, on-disk cache of parsed configuration files.
+
+    Entries are stored as JSON in :attr:`cache_dir` and are keyed by the path
+    of the source file.  Each entry records the source file's modification
+    time, size, and SHA-256 content hash along with the LoadEnv version that
+    wrote it; an entry is only used if all of these still match, so a stale
+    cache is always detected and re-generated.  Entries are also only used if
+    they are owned by the current user and not writable by anyone else, as
+    some of them are scripts that get sourced; others are re-generated.
+
+    The cache location is, in order of precedence:
+
+        * The ``cache_dir`` parameter.
+        * The ``LOADENV_CACHE_DIR`` environment variable, e.g., to keep the
+          cache on a faster file system.
+        * ``${XDG_CACHE_HOME:-~/.cache}/loadenv``.
+
+    Caching can be disabled entirely by setting ``LOADENV_NO_CACHE=1``.  The
+    cache is best-effort; failures to read or write it never prevent LoadEnv
+    from working.
+
+    Usage::
+
+        cache = ConfigCache()
+        data = cache.load("supported-envs.ini", parse_function)
+
+    Parameters:
+        cache_dir (str, Path):  The directory in which to store the cache.
+        enabled (bool):  Whether or not to use the cache at all.
+    """
+
+    def __init__(self, cache_dir=None, enabled=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get("LOADENV_CACHE_DIR", "")
+        if cache_dir == "":
+            xdg_cache_home = os.environ.get("XDG_CACHE_HOME", "")
+            if xdg_cache_home == "":
+                xdg_cache_home = Path.home() / ".cache"
+            cache_dir = Path(xdg_cache_home) / "loadenv"
+        self.cache_dir = Path(cache_dir)
+
+        if enabled is None:
+            enabled = os.environ.get("LOADENV_NO_CACHE", "0") in ["", "0"]
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+
+    def fingerprint(self, filename):
+        """
+        Compute the fingerprint of a file, used to determine whether cached
+        data derived from it is still valid.  Fingerprints are memoized per
+        :class:`ConfigCache` object so each file is only read once.
+
+        Parameters:
+            filename (str, Path):  The file to fingerprint.
+
+        Returns:
+            dict:  The ``mtime_ns``, ``size``, and ``sha256`` of the file, or
+            ``None`` if the file does not exist.
+        """
+        if not hasattr(self, "_fingerprints"):
+            self._fingerprints = {}
+
+        filename = str(Path(filename).resolve())
+        if filename not in self._fingerprints:
+            try:
+                stat = os.stat(filename)
+                with open(filename, "rb") as F:
+                    sha256 = hashlib.sha256(F.read()).hexdigest()
+                self._fingerprints[filename] = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "sha256": sha256,
+                    }
+            except OSError:
+                self._fingerprints[filename] = None
+
+        return self._fingerprints[filename]
+
+
+    def load(self, filename, parse, kind="parsed"):
+        """
+        Load the data for ``filename`` from the cache if a valid entry exists,
+        otherwise call ``parse`` and store its result in the cache.
+
+        Parameters:
+            filename (str, Path):  The configuration file the data is derived
+                from.
+            parse (callable):  A function taking no arguments that parses
+                ``filename`` and returns a :class:`ConfigData` object.
+            kind (str):  Distinguishes different kinds of data derived from the
+                same file, e.g., ``"parsed"`` or ``"raw"``.
+
+        Returns:
+            ConfigData:  The cached or freshly-parsed data.
+        """
+        key = self._key_for_file(filename, kind)
+        fingerprint = self.fingerprint(filename)
+        record = self.read_record("configs", key)
+        if (
+            record is not None and fingerprint is not None
+            and record.get("fingerprint") == fingerprint
+            ):
+            self.hits += 1
+            return ConfigData(record["data"])
+
+        self.misses += 1
+        data = parse()
+        if fingerprint is not None:
+            self.write_record(
+                "configs",
+                key,
+                {
+                    "source": str(Path(filename).resolve()),
+                    "kind": kind,
+                    "fingerprint": fingerprint,
+                    "data": data.to_dict(),
+                    },
+                )
+        return data
+
+
+    def read_record(self, namespace, key):
+        """
+        Read a JSON record from the cache.
+
+        Parameters:
+            namespace (str):  The subdirectory of :attr:`cache_dir` holding the
+                record.
+            key (str):  The name of the record.
+
+        Returns:
+            object:  The data stored in the record, or ``None`` if there is no
+            valid record for the current LoadEnv version.
+        """
+        if not self.enabled:
+            return None
+        try:
+            with open(self.cache_dir / namespace / f"{key}.json", "r") as F:
+                if not self.is_trusted(os.fstat(F.fileno())):
+                    return None
+                record = json.load(F)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(record, dict) or record.get("loadenv_version") != __version__:
+            return None
+        return record.get("value")
+
+
+    def write_record(self, namespace, key, value):
+        """
+        Atomically write a JSON record to the cache.  Failures are ignored.
+
+        Parameters:
+            namespace (str):  The subdirectory of :attr:`cache_dir` to hold the
+                record.
+            key (str):  The name of the record.
+            value (object):  JSON-serializable data to store.
+        """
+        if not self.enabled:
+            return
+        import tempfile
+
+        record = {"loadenv_version": __version__, "value": value}
+        try:
+            directory = self.cache_dir / namespace
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(directory), prefix=f".{key}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as F:
+                    json.dump(record, F)
+                os.replace(tmp_name, str(directory / f"{key}.json"))
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        except (OSError, TypeError, ValueError):
+            pass
+
+
+    def load_file(self, namespace, key, write):
+        """
+        Get the path of a file stored in the cache under ``key``, creating it
+        with ``write`` first if it is not there yet.  Files are stored per
+        LoadEnv version and are never modified once written, so ``key``
+        should identify their content, e.g., via :func:`hash_key`.
+
+        Parameters:
+            namespace (str):  The subdirectory of :attr:`cache_dir` holding the
+                file.
+            key (str):  The name of the file.
+            write (callable):  A function taking the path to write to.
+
+        Returns:
+            Path:  The cached file, or ``None`` if the cache is disabled or
+            the file could not be stored.
+        """
+        if not self.enabled:
+            return None
+        path = self.cache_dir / namespace / __version__ / key
+        try:
+            if self.is_trusted(os.lstat(path)):
+                self.hits += 1
+                return path
+        except OSError:
+            pass
+
+        self.misses += 1
+        import tempfile
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{key}.", suffix=".tmp")
+            os.close(fd)
+        except OSError:
+            return None
+
+        try:
+            write(Path(tmp_name))
+            os.replace(tmp_name, str(path))
+            return path
+        except OSError:
+            return None
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
+
+
+    @staticmethod
+    def is_trusted(stat_result):
+        """
+        Parameters:
+            stat_result (os.stat_result):  The status of a cache entry.
+
+        Returns:
+            bool:  Whether the entry is a regular file owned by the current
+            user and not writable by its group or others, i.e., whether
+            no one else could have written it.
+        """
+        return (
+            stat.S_ISREG(stat_result.st_mode) and stat_result.st_uid == os.getuid()
+            and not stat_result.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+            )
+
+
+    @staticmethod
+    def hash_key(*parts):
+        """
+        Build a cache key from arbitrary string components.
+
+        Returns:
+            str:  A hex digest uniquely identifying ``parts``.
+        """
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(str(part).encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+
+    def _key_for_file(self, filename, kind):
+        """
+        Returns:
+            str:  The cache key for the data of the given ``kind`` derived from
+            ``filename``.
+        """
+        return self.hash_key(Path(filename).resolve(), kind)
@@ -0,0 +1,112 @@
+import fnmatch
+
+try:                                                                                # pragma: no cover
+    from .EnvKeywordParser import DuplicateAliasError, EnvKeywordParser
+except ImportError:                                                                 # pragma: no cover
+    from EnvKeywordParser import DuplicateAliasError, EnvKeywordParser
+
+
+
+class EnvIndex(object):
+    """
+    The environments and aliases of every system in ``supported-envs.ini``,
+    computed once so that listing environments, e.g., for ``--list-envs``,
+    shell completion, or dashboards, needs neither an
+    :class:`EnvKeywordParser` nor any formatting of banner text.  The index
+    is plain JSON-serializable data, so it can be stored in the
+    :class:`ConfigCache`.
+
+    Usage::
+
+        index = EnvIndex.build(supported_envs_data, "supported-envs.ini")
+        for entry in index.entries(["ats1"], pattern="intel*"):
+            print(entry["qualified_name"], entry["aliases"])
+
+    Parameters:
+        systems (dict):  For each system, a ``dict`` with the ``envs``, i.e.,
+            a mapping of each environment name to its aliases, and an
+            ``error`` message that is ``None`` unless the system's aliases
+            are invalid.
+    """
+
+    def __init__(self, systems):
+        self.systems = systems
+
+
+    @classmethod
+    def build(cls, data, supported_envs_filename):
+        """
+        Parameters:
+            data (ConfigData):  The parsed contents of ``supported-envs.ini``.
+            supported_envs_filename (str, Path):  The file ``data`` is from.
+
+        Returns:
+            EnvIndex:  The index of every section of ``data``.
+        """
+        systems = {}
+        for system_name in data.sections():
+            try:
+                ekp = EnvKeywordParser("", system_name, supported_envs_filename, config_data=data)
+            except DuplicateAliasError as e:
+                systems[system_name] = {"envs": {}, "error": str(e)}
+                continue
+            systems[system_name] = {
+                "envs": {_: sorted(ekp.env_aliases[_]) for _ in sorted(ekp.env_aliases)},
+                "error": None,
+                }
+        return cls(systems)
+
+
+    def entries(self, system_names=None, pattern=None):
+        """
+        Iterate over the indexed environments, sorted by system and
+        environment name.
+
+        Parameters:
+            system_names (list):  The systems to list, or ``None`` for all.
+            pattern (str):  If given, only environments whose name, qualified
+                name, or an alias contains ``pattern`` are listed, or, if it
+                contains any of ``*?[``, matches it as a glob.
+
+        Yields:
+            dict:  The ``system``, environment ``name``, ``qualified_name``,
+            and ``aliases`` of each environment.
+        """
+        if system_names is None:
+            system_names = sorted(self.systems)
+        for system_name in system_names:
+            for name, aliases in self.systems[system_name]["envs"].items():
+                qualified_name = f"{system_name}_{name}"
+                if pattern is None or any(
+                    self.matches(_, pattern) for _ in [name, qualified_name, *aliases]
+                    ):
+                    yield {
+                        "system": system_name,
+                        "name": name,
+                        "qualified_name": qualified_name,
+                        "aliases": aliases,
+                        }
+
+
+    @staticmethod
+    def matches(keyword, pattern):
+        """
+        Parameters:
+            keyword (str):  An environment name or alias.
+            pattern (str):  A substring, or a glob if it contains any of
+                ``*?[``.
+
+        Returns:
+            bool:  Whether ``keyword`` matches ``pattern``.
+        """
+        if any(_ in pattern for _ in "*?["):
+            return fnmatch.fnmatchcase(keyword, pattern)
+        return pattern in keyword
+
+
+    def to_dict(self):
+        """
+        Returns:
+            dict:  The data the index was created from.
+        """
+        return self.systems
@@ -1,7 +1,30 @@
-import re
+from collections import Counter
 from keywordparser import KeywordParser
 import os
-import sys
+
+
+
+class EnvKeywordParserError(SystemExit):
+    """
+    Base class for the errors raised by :class:`EnvKeywordParser`.  It derives
+    from ``SystemExit`` so that, if uncaught, the formatted message is printed
+    and the program exits just as with ``sys.exit(msg)``, while callers
+    resolving many build names can catch it and carry on.
+    """
+
+
+
+class UnknownEnvironmentError(EnvKeywordParserError):
+    """
+    Raised when no environment name or alias can be found in the build name.
+    """
+
+
+
+class DuplicateAliasError(EnvKeywordParserError):
+    """
+    Raised when an alias is listed for more than one environment on a system.
+    """
 
 
 
@@ -35,10 +58,19 @@ class EnvKeywordParser(KeywordParser):
             on.
         supported_envs_filename (str, Path):  The name of the file to load
             the supported environment configuration from.
+        config_data (ConfigData):  Already-parsed contents of
+            ``supported_envs_filename``, e.g., loaded from the
+            :class:`ConfigCache`.  If ``None``, the file is parsed on demand.
+        silent (bool):  Do not print which environment name or alias was
+            matched.
     """
 
-    def __init__(self, build_name, system_name, supported_envs_filename):
+    def __init__(
+        self, build_name, system_name, supported_envs_filename, config_data=None, silent=False
+        ):
         self.config_filename = supported_envs_filename
+        self.config_data = config_data
+        self.silent = silent
         self.build_name = build_name
         self.system_name = system_name
         self.delim = "_"
@@ -46,6 +78,90 @@ class EnvKeywordParser(KeywordParser):
         env_names = [_ for _ in self.config[self.system_name].keys()]
         self.env_names = sorted(env_names, key=len, reverse=True)
         self.aliases = sorted(self.get_aliases(), key=len, reverse=True)
+        self.compile_matcher()
+
+
+    @property
+    def build_name(self):
+        """
+        The keyword string to parse the environment name from.  Changing it
+        clears the :attr:`qualified_env_name`, but keeps the matcher compiled
+        for the :attr:`system_name`, so one object can be reused for many
+        build names.
+        """
+        return self._build_name
+
+
+    @build_name.setter
+    def build_name(self, new_build_name):
+        if hasattr(self, "_qualified_env_name"):
+            delattr(self, "_qualified_env_name")
+        self._build_name = new_build_name
+
+
+    def compile_matcher(self):
+        """
+        Build the lookup tables used by :func:`find_keyword` from the
+        :attr:`env_names` and :attr:`aliases` of the :attr:`system_name`.  Each
+        name maps to its position in its longest-first list, so the
+        longest-name-first semantics are preserved.  This is done once per
+        object rather than once per lookup.
+        """
+        self._env_name_ranks = {}
+        for rank, name in enumerate(self.env_names):
+            self._env_name_ranks.setdefault(name, rank)
+
+        self._alias_ranks = {}
+        for rank, alias in enumerate(self.aliases):
+            self._alias_ranks.setdefault(alias, rank)
+
+        self._max_keyword_tokens = max(
+            [_.count(self.delim) + 1 for _ in self.env_names + self.aliases], default=0
+            )
+
+
+    def find_keyword(self, keywords, ranks):
+        """
+        Find the first of the ``keywords`` that appears in the
+        :attr:`build_name`, where appearing means being equal to a run of
+        consecutive :attr:`delim`-separated components of the
+        :attr:`build_name`.  This is equivalent to checking each keyword, in
+        order, with the regular expression ``(?:^|_)<keyword>(?:$|_)``, but
+        only needs a hash lookup per run of components rather than a regular
+        expression search per keyword.
+
+        Parameters:
+            keywords (list):  The keywords in priority order, e.g.,
+                :attr:`env_names`.
+            ranks (dict):  A mapping of each of the ``keywords`` to its index
+                in ``keywords``, as built by :func:`compile_matcher`.
+
+        Returns:
+            str:  The matched keyword, or ``None`` if none of the ``keywords``
+            appear in the :attr:`build_name`.
+        """
+        components = self.build_name.split(self.delim)
+        best_rank = None
+        for start in range(len(components)):
+            stop_max = min(len(components), start + self._max_keyword_tokens)
+            for stop in range(start + 1, stop_max + 1):
+                rank = ranks.get(self.delim.join(components[start : stop]))
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank = rank
+
+        return None if best_rank is None else keywords[best_rank]
+
+
+    @property
+    def config(self):
+        """
+        The parsed contents of :attr:`config_filename`.  If the parsed data was
+        supplied via ``config_data`` it is used directly, avoiding re-parsing
+        the file.
+        """
+        if self.config_data is not None:
+            return self.config_data
+        return super().config
 
 
     @property
@@ -57,7 +173,9 @@ class EnvKeywordParser(KeywordParser):
         The way this happens is:
 
             * Gather the list of environment names, sorting them from longest
-              to shortest.
+              to shortest.  Matching is done with :func:`find_keyword`, which
+              compares whole :attr:`delim`-separated components, so characters
+              like ``.`` in names are matched literally.
 
                  * March through this list, checking if any of these appear in
                    the :attr:`build_name`.
@@ -84,46 +202,36 @@ class EnvKeywordParser(KeywordParser):
 
         Returns:
             str:  The fully qualified environment name.
+
+        Raises:
+            UnknownEnvironmentError:  If neither an environment name nor an
+            alias for the :attr:`system_name` appears in the
+            :attr:`build_name`.
         """
         if not hasattr(self, "_qualified_env_name"):
-            matched_env_name = None
-            for name in self.env_names:
-                env_name_in_build_name = (
-                    False
-                    if re.search(f"(?:^|{self.delim}){name}(?:$|{self.delim})", self.build_name) is
-                    None else True
+            matched_env_name = self.find_keyword(self.env_names, self._env_name_ranks)
+            if matched_env_name is not None and not self.silent:
+                print(
+                    f"Matched environment name '{matched_env_name}' in build name "
+                    f"'{self.build_name}'."
                     )
 
-                if env_name_in_build_name:
-                    matched_env_name = name
-                    print(f"Matched environment name '{name}' in build name '{self.build_name}'.")
-                    break
-
             if matched_env_name is None:
-                matched_alias = None
-                for alias in self.aliases:
-                    alias_in_build_name = (
-                        False if
-                        re.search(f"(?:^|{self.delim}){alias}(?:$|{self.delim})",
-                                  self.build_name) is None else True
-                        )
-
-                    if alias_in_build_name:
-                        matched_alias = alias
-                        break
+                matched_alias = self.find_keyword(self.aliases, self._alias_ranks)
 
                 if matched_alias is None:
                     msg = self.get_msg_showing_supported_environments(
                         "Unable to find alias or environment name for system "
                         f"'{self.system_name}' in\nbuild name '{self.build_name}'."
                         )
-                    sys.exit(msg)
+                    raise UnknownEnvironmentError(msg)
 
                 matched_env_name = self.get_key_for_section_value(self.system_name, matched_alias)
-                print(
-                    f"NOTICE:  Matched alias '{matched_alias}' in build "
-                    f"name '{self.build_name}' to environment name '{matched_env_name}'."
-                    )
+                if not self.silent:
+                    print(
+                        f"NOTICE:  Matched alias '{matched_alias}' in build "
+                        f"name '{self.build_name}' to environment name '{matched_env_name}'."
+                        )
 
             self._qualified_env_name = f"{self.system_name}{self.delim}{matched_env_name}"
 
@@ -137,6 +245,11 @@ class EnvKeywordParser(KeywordParser):
         :func:`assert_alias_list_values_are_unique` and
         :func:`assert_aliases_not_equal_to_env_names` on the alias list.
 
+        While gathering the aliases, this builds :attr:`alias_index`, a mapping
+        of each alias to its environment name, and :attr:`env_aliases`, a
+        mapping of each environment name to its aliases, so neither has to be
+        recomputed later.
+
         Returns:
             list:  The filtered and validated list of aliases for the current
             :attr:`system_name`.
@@ -144,14 +257,43 @@ class EnvKeywordParser(KeywordParser):
         # e.g. aliases = ['\ngnu  # GNU\ndefault-env # The default',
         #                 '\ncuda-gnu\ncuda']
         aliases = []
+        self.alias_index = {}
+        self.env_aliases = {}
+        duplicates = []
         for env_name in self.config[self.system_name].keys():
-            aliases += self.get_values_for_section_key(self.system_name, env_name)
-
-        self.assert_alias_list_values_are_unique(aliases)
+            aliases_for_env = self.get_values_for_section_key(self.system_name, env_name)
+            self.env_aliases[env_name] = aliases_for_env
+            for alias in aliases_for_env:
+                if alias in self.alias_index:
+                    duplicates.append(alias)
+                else:
+                    self.alias_index[alias] = env_name
+            aliases += aliases_for_env
+
+        if duplicates != []:
+            self.assert_alias_list_values_are_unique(aliases)
 
         return aliases
 
 
+    def get_key_for_section_value(self, section, value):
+        """
+        Get the environment name for which ``value`` is an alias.  Lookups for
+        the current :attr:`system_name` use :attr:`alias_index`; other
+        sections fall back to a scan of the section.
+
+        Parameters:
+            section (str):  The section, i.e., system name, to search.
+            value (str):  The alias to look up.
+
+        Returns:
+            str:  The environment name that ``value`` is an alias for.
+        """
+        if section == self.system_name and value in getattr(self, "alias_index", {}):
+            return self.alias_index[value]
+        return super().get_key_for_section_value(section, value)
+
+
     def assert_alias_list_values_are_unique(self, alias_list):
         """
         Ensures we don't run into a situation like::
@@ -171,16 +313,17 @@ class EnvKeywordParser(KeywordParser):
             alias_list (str): A list of aliases to check for duplicates.
 
         Raises:
-            SystemExit: TODO - explain what condition trips this.
+            DuplicateAliasError:  If any alias appears more than once.
         """
-        duplicates = [_ for _ in set(alias_list) if alias_list.count(_) > 1]
+        counts = Counter(alias_list)
+        duplicates = [_ for _ in counts if counts[_] > 1]
         try:
             assert duplicates == []
         except AssertionError:
             msg = self.get_msg_for_list(
                 f"Aliases for '{self.system_name}' contains duplicates:", duplicates
                 )
-            sys.exit(msg)
+            raise DuplicateAliasError(msg)
         return
 
 
@@ -214,20 +357,39 @@ class EnvKeywordParser(KeywordParser):
         Returns:
             str:  The formatted message.
         """
-        extras = f"\n- Supported Environments for '{self.system_name}':\n"
-        for env_name in sorted(self.env_names):
+        extras = self.format_supported_environments(
+            self.system_name, self.env_aliases, self.config_filename
+            )
+        msg = self.get_formatted_msg(msg, kind=kind, extras=extras)
+        return msg
+
+
+    @staticmethod
+    def format_supported_environments(system_name, env_aliases, config_filename):
+        """
+        Format the list of environments shown by
+        :func:`get_msg_showing_supported_environments`.
+
+        Parameters:
+            system_name (str):  The system the environments are for.
+            env_aliases (dict):  The aliases of each environment name.
+            config_filename (str, Path):  The ``supported-envs.ini`` file.
+
+        Returns:
+            str:  The extras for :func:`get_formatted_msg`.
+        """
+        extras = f"\n- Supported Environments for '{system_name}':\n"
+        for env_name in sorted(env_aliases):
             extras += f"  - {env_name}\n"
-            aliases_for_env = sorted(self.get_values_for_section_key(self.system_name, env_name))
+            aliases_for_env = sorted(env_aliases[env_name])
             extras += "    * Aliases:\n" if len(aliases_for_env) > 0 else ""
             for a in aliases_for_env:
                 extras += f"      - {a}\n"
 
-        config_filename_rel = os.path.relpath(self.config_filename, ".")
+        config_filename_rel = os.path.relpath(config_filename, ".")
 
         extras += f"\nSee `{config_filename_rel}` for details on the available environments.\n"
         extras += "\n"
         extras += "To force-load an environment see the guidance in the `--help` output.\n"
         extras += "\n"
-
-        msg = self.get_formatted_msg(msg, kind=kind, extras=extras)
-        return msg
+        return extras
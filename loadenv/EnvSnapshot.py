@@ -0,0 +1,145 @@
+import hashlib
+import os
+import shlex
+
+
+
+class EnvSnapshot(object):
+    """
+    The change an environment makes to the process environment, captured
+    after it has been successfully applied, so that later loads can replay it
+    as plain ``export`` and ``unset`` commands rather than running ``module``
+    commands again.  Because Lmod and Environment Modules keep their state in
+    environment variables (e.g., ``LOADEDMODULES``, ``_LMFILES_``, and
+    ``_ModuleTable*_``), those are captured along with everything else.
+
+    Where a variable's new value is its old value with something prepended or
+    appended, e.g., ``PATH`` after a ``module load``, the change is replayed
+    relative to the variable's value at the time, rather than overwriting it.
+
+    Usage::
+
+        before = dict(os.environ)
+        set_environment.apply(env_name)
+        snapshot = EnvSnapshot.capture(before, dict(os.environ))
+        script = snapshot.to_bash()
+
+    Parameters:
+        actions (list):  ``[op, name, value]`` lists, where ``op`` is one of
+            ``"set"``, ``"unset"``, ``"prepend"``, or ``"append"``.
+    """
+
+    # Variables that are not part of an environment.
+    IGNORED_VARIABLES = ["_", "OLDPWD", "PWD", "SHLVL", "LOADED_ENV_NAME"]
+
+    # Variables holding the module system state an environment starts from.
+    MODULE_STATE_VARIABLES = ["MODULEPATH", "LOADEDMODULES"]
+
+    # Files that select the default version of a module.
+    MODULE_DEFAULT_FILES = [".version", ".modulerc", ".modulerc.lua", "default"]
+
+    def __init__(self, actions):
+        self.actions = actions
+
+
+    @classmethod
+    def capture(cls, before, after):
+        """
+        Compute the snapshot of the change from ``before`` to ``after``.
+
+        Parameters:
+            before (dict):  The environment before the environment was applied.
+            after (dict):  The environment after it was applied.
+
+        Returns:
+            EnvSnapshot:  The snapshot.
+        """
+        actions = []
+        for name in sorted(set(before) | set(after)):
+            if name in cls.IGNORED_VARIABLES or before.get(name) == after.get(name):
+                continue
+
+            old, new = before.get(name, ""), after.get(name)
+            if new is None:
+                actions.append(["unset", name, None])
+            elif old != "" and old in new:
+                prefix, suffix = new.split(old, 1)
+                if (
+                    (prefix == "" or prefix.endswith(":"))
+                    and (suffix == "" or suffix.startswith(":"))
+                    ):
+                    if prefix != "":
+                        actions.append(["prepend", name, prefix[:-1]])
+                    if suffix != "":
+                        actions.append(["append", name, suffix[1 :]])
+                else:
+                    actions.append(["set", name, new])
+            else:
+                actions.append(["set", name, new])
+        return cls(actions)
+
+
+    def to_bash(self):
+        """
+        Returns:
+            str:  Bash commands that replay the snapshot.
+        """
+        lines = []
+        for op, name, value in self.actions:
+            if op == "unset":
+                lines.append(f"unset {name}")
+            elif op == "prepend":
+                lines.append(f'export {name}={shlex.quote(value)}"${{{name}:+:${{{name}}}}}"')
+            elif op == "append":
+                lines.append(f'export {name}="${{{name}:+${{{name}}}:}}"{shlex.quote(value)}')
+            else:
+                lines.append(f"export {name}={shlex.quote(value)}")
+        return "\n".join(lines) + "\n"
+
+
+    @staticmethod
+    def module_tree_fingerprint(directories, modulefiles=()):
+        """
+        Fingerprint the module files available in ``directories``, e.g., the
+        entries of ``MODULEPATH``, so that cached results depending on them
+        can be invalidated when module files are added, removed, or edited.
+        This is checked on every load, so no directory is listed:  only the
+        modification times of ``directories`` themselves, which change when
+        a module is added or removed, and of the ``modulefiles`` that were
+        loaded, the directories they are in, and the files setting default
+        versions there, are used.  A new version of a loaded module is
+        therefore noticed, but a new version of any other module is not.
+
+        Parameters:
+            directories (list):  The directories to fingerprint.  Those that
+                do not exist are recorded as such.
+            modulefiles (list):  The module files that were loaded, e.g.,
+                those in ``_LMFILES_``.
+
+        Returns:
+            str:  A SHA-256 hex digest.
+        """
+        h = hashlib.sha256()
+
+        def update(path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                h.update(f"{path}\0\0".encode())
+                return
+            h.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\0".encode())
+
+        for directory in directories:
+            update(directory)
+        h.update(b"\0")
+        module_directories = []
+        for modulefile in modulefiles:
+            update(modulefile)
+            directory = os.path.dirname(modulefile)
+            if directory not in module_directories:
+                module_directories.append(directory)
+        for directory in module_directories:
+            update(directory)
+            for name in EnvSnapshot.MODULE_DEFAULT_FILES:
+                update(os.path.join(directory, name))
+        return h.hexdigest()
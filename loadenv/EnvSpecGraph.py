@@ -0,0 +1,288 @@
+import hashlib
+import json
+
+
+
+class EnvSpecGraph(object):
+    """
+    The graph of ``use`` statements in an ``environment-specs.ini`` file, e.g.::
+
+        [ATS1]
+        envvar-set CC : mpicc
+
+        [ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp]
+        module-load sparc-dev : intel-19.0.4_mpich-7.7.15_hsw
+        use ATS1
+
+    has an edge from ``ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp`` to
+    ``ATS1``.  This allows operations like validation to be limited to the
+    sections that are actually reachable from a selected environment.
+
+    Usage::
+
+        graph = EnvSpecGraph(raw_sections)
+        sections = graph.use_closure("ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp")
+
+    Parameters:
+        sections (ConfigData, dict):  The raw, un-expanded contents of
+            ``environment-specs.ini``, i.e., ``use`` statements are still
+            present as ``use <section>`` options.
+    """
+
+    def __init__(self, sections):
+        self.sections = sections
+        self.cycles = set()
+        self._options = {}
+        self._expansions = {}
+        self._actions_fingerprints = {}
+
+
+    def options(self, section):
+        """
+        Parse the option names of ``section`` once.
+
+        Parameters:
+            section (str):  The name of the section.
+
+        Returns:
+            tuple:  For each option, in order, either ``("use", name)`` for a
+            ``use`` statement, or an ``(operation, parameter, value)`` action
+            tuple.  Anything after an action's first parameter in an option
+            name only makes the option name unique, so it is dropped;
+            ``parameter`` is ``None`` for operations without one, e.g.,
+            ``module-purge``.
+        """
+        if section not in self._options:
+            options = []
+            for option, value in self.sections[section].items():
+                tokens = option.split()
+                if len(tokens) == 2 and tokens[0] == "use":
+                    options.append(("use", tokens[1]))
+                else:
+                    options.append((tokens[0], tokens[1] if len(tokens) > 1 else None, value))
+            self._options[section] = tuple(options)
+        return self._options[section]
+
+
+    def uses(self, section):
+        """
+        Parameters:
+            section (str):  The name of the section.
+
+        Returns:
+            list:  The names of the sections ``use``\\ d directly by
+            ``section``, in the order they appear.
+        """
+        return [_[1] for _ in self.options(section) if len(_) == 2]
+
+
+    def use_closure(self, section):
+        """
+        Walk the ``use`` graph starting from ``section``.  Each section is only
+        visited once, so the cost is linear in the size of the closure rather
+        than in the size of the whole file.  Sections that are ``use``\\ d but
+        do not exist are skipped; they are reported when the environment is
+        applied.
+
+        Parameters:
+            section (str):  The name of the section to start from.
+
+        Returns:
+            list:  ``section`` followed by the names of every section it
+            transitively ``use``\\ s, in depth-first order.
+        """
+        closure = []
+        visited = set()
+        stack = [section]
+        while stack:
+            current = stack.pop()
+            if current in visited or current not in self.sections:
+                continue
+            visited.add(current)
+            closure.append(current)
+            stack.extend(reversed(self.uses(current)))
+        return closure
+
+
+    def fingerprint(self, section):
+        """
+        Compute a fingerprint of everything that determines what ``section``
+        does when it is applied, i.e., the options and values of every section
+        in its :func:`use_closure`.  Edits to sections outside the closure do
+        not change the fingerprint.
+
+        Parameters:
+            section (str):  The name of the section.
+
+        Returns:
+            str:  A SHA-256 hex digest.
+        """
+        closure = [
+            [name, list(self.sections[name].items())] for name in self.use_closure(section)
+            ]
+        return hashlib.sha256(json.dumps(closure).encode()).hexdigest()
+
+
+    def expanded_actions(self, section):
+        """
+        Expand ``section`` into the list of actions it performs when applied:
+        ``use`` statements are replaced by the actions of the sections they
+        name, where they appear, and then ``envvar-remove <name>`` and
+        ``module-remove <name>`` drop every earlier ``envvar-*`` or
+        ``module-*`` action on ``<name>``, respectively.
+
+        Parameters:
+            section (str):  The name of the section.
+
+        Returns:
+            list:  The ``(operation, parameter, value)`` action tuples from
+            :func:`options`, in order.  The tuples are shared, so they must
+            not be modified.
+        """
+        actions = []
+        removed = {"envvar-": set(), "module-": set()}
+        for action in reversed(self.expansion(section)):
+            op, param = action[0], action[1]
+            if op in ["envvar-remove", "module-remove"]:
+                removed[op[: 7]].add(param)
+            elif not (op[: 7] in removed and param in removed[op[: 7]]):
+                actions.append(action)
+        actions.reverse()
+        return actions
+
+
+    def expansion(self, section):
+        """
+        Expand the ``use`` statements of ``section`` recursively, without
+        applying removals.
+
+        Each section is expanded once, after the sections it ``use``\\ s, and
+        the result is memoized, so expanding every section in the file parses
+        each option once and follows each ``use`` edge once.  To that end the
+        strongly connected components of the ``use`` graph are found, and
+        expanded in reverse topological order.
+
+        A component with more than one section, or a section that ``use``\\ s
+        itself, is a cycle.  Each of its sections is expanded as if it were
+        the one selected, depth first, and within that expansion every section
+        of the cycle is expanded at most once:  a ``use`` of a section of the
+        cycle that was already expanded is ignored.  Expanding a cycle of
+        ``k`` sections therefore takes at most ``k * k`` section expansions,
+        however densely its sections ``use`` each other, and the expansion of
+        a section in a cycle is the same whichever section of the cycle is
+        expanded first.  Each cycle is recorded once in :attr:`cycles`, as the
+        ``frozenset`` of its sections.
+
+        Parameters:
+            section (str):  The name of the section.
+
+        Returns:
+            tuple:  The action tuples, in order, or an empty tuple if
+            ``section`` does not exist.
+        """
+        if section in self._expansions:
+            return self._expansions[section]
+        if section not in self.sections:
+            return ()
+
+        for component in self._components(section):
+            members = set(component)
+            for name in component:
+                self._expansions[name] = tuple(self._expand(name, members, {name}))
+        return self._expansions[section]
+
+
+    def _expand(self, section, members, expanded):
+        """
+        Expand ``section``, a member of the strongly connected component
+        ``members``, whose other components have been expanded already.
+
+        Parameters:
+            section (str):  The name of the section.
+            members (set):  The sections of the component.
+            expanded (set):  The sections of the component expanded so far
+                for the section selected, whose ``use`` is ignored.  Updated
+                in place.
+
+        Returns:
+            list:  The action tuples, in order.
+        """
+        expansion = []
+        for option in self.options(section):
+            if len(option) == 3:
+                expansion.append(option)
+            elif option[1] not in members:
+                expansion.extend(self._expansions.get(option[1], ()))
+            elif option[1] not in expanded:
+                expanded.add(option[1])
+                expansion.extend(self._expand(option[1], members, expanded))
+            else:
+                self.cycles.add(frozenset(members))
+        return expansion
+
+
+    def _components(self, section):
+        """
+        Find the strongly connected components of the ``use`` graph reachable
+        from ``section``, ignoring sections that are expanded already, with
+        Tarjan's algorithm.
+
+        Parameters:
+            section (str):  The name of the section.
+
+        Returns:
+            list:  The components, as lists of section names, in reverse
+            topological order, i.e., each after the components it ``use``\\ s.
+        """
+        index = {section: 0}
+        lowlink = {section: 0}
+        stack = [section]
+        on_stack = {section}
+        components = []
+        work = [(section, iter(self.uses(section)))]
+        while work:
+            current, used = work[-1]
+            for name in used:
+                if name in self._expansions or name not in self.sections:
+                    continue
+                if name not in index:
+                    index[name] = lowlink[name] = len(index)
+                    stack.append(name)
+                    on_stack.add(name)
+                    work.append((name, iter(self.uses(name))))
+                    break
+                if name in on_stack:
+                    lowlink[current] = min(lowlink[current], index[name])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[current])
+                if lowlink[current] == index[current]:
+                    component = []
+                    while component == [] or component[-1] != current:
+                        component.append(stack.pop())
+                        on_stack.discard(component[-1])
+                    components.append(component)
+        return components
+
+
+    def actions_fingerprint(self, section):
+        """
+        Compute a fingerprint of :func:`expanded_actions`.  Unlike
+        :func:`fingerprint`, it does not change for edits that do not change
+        what ``section`` does, e.g., renaming or splitting the sections it
+        ``use``\\ s, renaming unique suffixes, or changing options that are
+        later removed.  Fingerprints are memoized.
+
+        Parameters:
+            section (str):  The name of the section.
+
+        Returns:
+            str:  A SHA-256 hex digest.
+        """
+        if section not in self._actions_fingerprints:
+            self._actions_fingerprints[section] = hashlib.sha256(
+                json.dumps(self.expanded_actions(section)).encode()
+                ).hexdigest()
+        return self._actions_fingerprints[section]
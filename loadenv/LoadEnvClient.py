@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+A thin client for :class:`LoadEnvServer`, used by ``load-env.sh`` when a
+server is running.  It only imports modules from the Python standard library
+so that it starts quickly, forwards its command line to the server, and
+behaves like ``load_env.py`` would have.
+
+If no server is reachable, the socket or the server belongs to another user,
+or the request is anything other than a plain load (e.g., ``--help``,
+``--list-envs``, or ``--validate-all``), it exits with :data:`EXIT_FALLBACK`
+without doing anything so the caller can run ``load_env.py`` instead.
+"""
+import json
+import os
+from pathlib import Path
+import socket
+import stat
+import sys
+
+
+EXIT_FALLBACK = 75
+
+# Options whose values are paths, which must be made absolute since the server
+# does not share the client's working directory.
+PATH_OPTIONS = [
+    "--output",
+    "-o",
+    "--supported-systems",
+    "--supported-envs",
+    "--environment-specs",
+    "--load-matching-env-location",
+    ]
+
+# Options taking a value that is not a path.
+VALUE_OPTIONS = ["--load-matching-env-fd"]
+
+# The options of a plain load, the only request the server handles;
+# ``load_env.py`` is used for any other option.
+LOAD_OPTIONS = PATH_OPTIONS + VALUE_OPTIONS + [
+    "-f",
+    "--force",
+    "--ci-mode",
+    "--optimize",
+    "--batch-modules",
+    "--snapshot",
+    "--revalidate",
+    "--timings",
+    ]
+
+
+
+def default_runtime_dir():
+    """
+    Returns:
+        Path:  The directory for per-user files that only live as long as the
+        session, i.e., ``$XDG_RUNTIME_DIR``, which is normally a ``tmpfs``, if
+        set, otherwise ``/tmp/$USER``.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", "")
+    if runtime_dir == "":
+        import getpass
+        runtime_dir = f"/tmp/{getpass.getuser()}"
+    return Path(runtime_dir)
+
+
+
+def default_socket_path():
+    """
+    Returns:
+        Path:  The socket :class:`LoadEnvServer` listens on by default, i.e.,
+        ``$LOADENV_SOCKET`` if set, otherwise ``loadenv.sock`` in the
+        :func:`default_runtime_dir`.
+    """
+    if os.environ.get("LOADENV_SOCKET", "") != "":
+        return Path(os.environ["LOADENV_SOCKET"])
+    return default_runtime_dir() / "loadenv.sock"
+
+
+
+def absolutize_paths(argv, cwd):
+    """
+    Make the values of the :data:`PATH_OPTIONS` in ``argv`` absolute.
+
+    Parameters:
+        argv (list):  The command line arguments.
+        cwd (str):  The directory relative paths are relative to.
+
+    Returns:
+        list:  The updated command line arguments.
+    """
+    result = []
+    make_absolute = False
+    for arg in argv:
+        if make_absolute:
+            arg = os.path.join(cwd, arg)
+            make_absolute = False
+        elif arg in PATH_OPTIONS:
+            make_absolute = True
+        elif "=" in arg and arg.split("=", 1)[0] in PATH_OPTIONS:
+            option, value = arg.split("=", 1)
+            arg = f"{option}={os.path.join(cwd, value)}"
+        result.append(arg)
+    return result
+
+
+
+def is_plain_load(argv):
+    """
+    Parameters:
+        argv (list):  The command line arguments.
+
+    Returns:
+        bool:  Whether ``argv`` is a plain load, i.e., a build name and only
+        :data:`LOAD_OPTIONS`, which is what the server handles.
+    """
+    if argv == []:
+        return False
+    takes_value = False
+    for arg in argv:
+        if takes_value:
+            takes_value = False
+        elif arg.startswith("-"):
+            option = arg.split("=", 1)[0]
+            if option not in LOAD_OPTIONS:
+                return False
+            takes_value = "=" not in arg and option in PATH_OPTIONS + VALUE_OPTIONS
+    return True
+
+
+
+def pop_option(argv, option):
+    """
+    Remove an option and its value from ``argv``.
+
+    Parameters:
+        argv (list):  The command line arguments.
+        option (str):  The option, e.g., ``"--load-matching-env-fd"``.
+
+    Returns:
+        tuple:  The option's value, or ``None`` if it is not given, and the
+        remaining command line arguments.
+    """
+    value = None
+    result = []
+    args = iter(argv)
+    for arg in args:
+        if arg == option:
+            value = next(args, None)
+        elif arg.startswith(option + "="):
+            value = arg.split("=", 1)[1]
+        else:
+            result.append(arg)
+    return value, result
+
+
+
+def check_socket(socket_path):
+    """
+    Make sure ``socket_path`` is a socket owned by the current user, in a
+    directory owned by the current user that no one else can write to.
+    ``load-env.sh`` sources the script the server names, so a listener
+    planted by another user, e.g., in a ``/tmp/$USER`` they created first,
+    must never be connected to.
+
+    Parameters:
+        socket_path (str, Path):  The server's socket.
+
+    Raises:
+        PermissionError:  If the socket or its directory is not trusted.
+        OSError:  If either does not exist.
+    """
+    socket_path = Path(socket_path)
+    directory = os.lstat(socket_path.parent)
+    if (
+        not stat.S_ISDIR(directory.st_mode)
+        or directory.st_uid != os.getuid()
+        or directory.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+        ):
+        raise PermissionError(f"'{socket_path.parent}' is not private to the current user.")
+
+    socket_stat = os.lstat(socket_path)
+    if not stat.S_ISSOCK(socket_stat.st_mode) or socket_stat.st_uid != os.getuid():
+        raise PermissionError(f"'{socket_path}' is not a socket owned by the current user.")
+
+
+
+def check_peer(S):
+    """
+    Make sure the process at the other end of a connected socket runs as the
+    current user.  This is only possible where ``SO_PEERCRED`` is available,
+    i.e., on Linux; elsewhere :func:`check_socket` is relied upon.
+
+    Parameters:
+        S (socket.socket):  A connected Unix domain socket.
+
+    Raises:
+        PermissionError:  If the peer runs as another user.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return
+    import struct
+    credentials = S.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+    if uid != os.getuid():
+        raise PermissionError("The LoadEnv server runs as another user.")
+
+
+
+def request(message, socket_path=None, timeout=None):
+    """
+    Send a single request to a :class:`LoadEnvServer` and wait for the
+    response.
+
+    Parameters:
+        message (dict):  The JSON-serializable request.
+        socket_path (str, Path):  The server's socket.  Defaults to
+            :func:`default_socket_path`.
+        timeout (float):  Seconds to wait for a response, or ``None`` to wait
+            indefinitely.
+
+    Returns:
+        dict:  The server's response.
+
+    Raises:
+        OSError:  If the server cannot be reached.
+        PermissionError:  If the socket or the server belongs to another user.
+            See :func:`check_socket` and :func:`check_peer`.
+    """
+    socket_path = default_socket_path() if socket_path is None else socket_path
+    check_socket(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as S:
+        S.settimeout(timeout)
+        S.connect(str(socket_path))
+        check_peer(S)
+        S.sendall(json.dumps(message).encode() + b"\n")
+        S.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = S.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    if not chunks:
+        raise ConnectionError("The LoadEnv server closed the connection without responding.")
+    return json.loads(b"".join(chunks).decode())
+
+
+
+def main(argv):
+    """
+    Ask the server to render the environment for ``argv``, as ``load_env.py``
+    would, print its output, and return its exit status.
+    """
+    if not is_plain_load(argv):
+        return EXIT_FALLBACK
+
+    # The file descriptor belongs to this process, so it is written to here
+    # rather than by the server.
+    load_matching_env_fd, argv = pop_option(argv, "--load-matching-env-fd")
+
+    cwd = os.getcwd()
+    message = {
+        "op": "render",
+        "argv": absolutize_paths(argv, cwd),
+        "cwd": cwd,
+        "env": dict(os.environ),
+        }
+    try:
+        response = request(message)
+    except (OSError, ValueError):
+        return EXIT_FALLBACK
+
+    sys.stdout.write(response.get("output", ""))
+    sys.stdout.flush()
+    if response.get("error") is not None:
+        sys.stderr.write(response["error"] + "\n")
+    if load_matching_env_fd is not None and response.get("status") == 0:
+        os.write(int(load_matching_env_fd), f"{response['load_matching_env']}\n".encode())
+    return response.get("status", 1)
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1 :]))
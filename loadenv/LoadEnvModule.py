@@ -0,0 +1,45 @@
+"""
+Helpers shared by the library APIs that drive the top-level ``load_env``
+module, i.e., :class:`LoadEnvServer` and :class:`LoadEnvSession`.
+"""
+import os
+from pathlib import Path
+import sys
+
+
+
+def import_load_env():
+    """
+    Import the ``load_env`` module, which lives in the top-level directory of
+    the LoadEnv repository, i.e., one directory up from this package.
+
+    Returns:
+        module:  The ``load_env`` module.
+    """
+    try:
+        import load_env
+    except ImportError:
+        sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+        import load_env
+    return load_env
+
+
+
+def stat_files(le):
+    """
+    Parameters:
+        le (LoadEnv):  The object whose configuration files to check.
+
+    Returns:
+        list:  The ``(mtime_ns, size)`` of each configuration file used by
+        ``le``, or ``None`` for files that do not exist, so that a long-lived
+        :class:`LoadEnv` can be discarded once any of them changes.
+    """
+    stats = []
+    for filename in (le.load_env_ini_file,) + le.config_files_for(le.args):
+        try:
+            stat = os.stat(filename)
+            stats.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stats.append(None)
+    return stats
@@ -0,0 +1,421 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+from pathlib import Path
+import signal
+import socket
+import stat
+import traceback
+
+try:                                                                                # pragma: no cover
+    from .LoadEnvClient import default_socket_path
+    from .LoadEnvModule import import_load_env, stat_files
+except ImportError:                                                                 # pragma: no cover
+    from LoadEnvClient import default_socket_path
+    from LoadEnvModule import import_load_env, stat_files
+
+
+
+class LoadEnvServer(object):
+    """
+    A resident, per-user server that keeps parsed configuration files and
+    :class:`LoadEnv` / :class:`EnvKeywordParser` state in memory and answers
+    requests over a Unix domain socket, so ``load-env.sh`` does not pay for
+    interpreter start-up, imports, and configuration parsing on every call.
+
+    Requests and responses are single lines of JSON, one request per
+    connection.  The supported operations are:
+
+        * ``{"op": "resolve", "argv": [...]}``:  Resolve the build name in
+          ``argv`` as :func:`LoadEnv.resolve` does.
+        * ``{"op": "render", "argv": [...], "cwd": "...", "env": {...}}``:
+          Validate the environment and write the ``load_matching_env`` script,
+          as ``load_env.py`` would when run from ``cwd`` with environment
+          ``env``.  Validation modifies the process environment, so it runs in
+          a forked child that inherits the server's warm state.
+        * ``{"op": "ping"}`` and ``{"op": "shutdown"}``.
+
+    Before each request the configuration files in use are checked, and any
+    :class:`LoadEnv` whose files changed is discarded and re-created.
+    Requests are resolved with the client's ``env``, if given, as the process
+    environment, and a :class:`LoadEnv` is only reused for requests with the
+    same :func:`settings_key`, e.g., the same ``LOADENV_CATALOG`` or
+    ``LOADENV_NO_CACHE``.
+
+    Usage::
+
+        python3 -m loadenv serve [--socket PATH]
+
+    Parameters:
+        socket_path (str, Path):  Where to listen.  Defaults to
+            :func:`default_socket_path`.
+        load_env_ini_file (str, Path):  The ``load-env.ini`` to use, for
+            testing purposes.
+        render_timeout (float):  Seconds a render may take before it is
+            killed.
+    """
+
+    def __init__(self, socket_path=None, load_env_ini_file=None, render_timeout=600):
+        self.socket_path = Path(default_socket_path() if socket_path is None else socket_path)
+        self.load_env_ini_file = load_env_ini_file
+        self.render_timeout = render_timeout
+        self.load_env = import_load_env()
+        self.loadenvs = {}
+        self.template = None
+        self.server = None
+
+
+    def new_loadenv(self, argv):
+        """
+        Returns:
+            LoadEnv:  A new :class:`LoadEnv` object for ``argv``.
+        """
+        if self.load_env_ini_file is None:
+            return self.load_env.LoadEnv(argv)
+        return self.load_env.LoadEnv(argv, load_env_ini_file=self.load_env_ini_file)
+
+
+    @staticmethod
+    def settings_key():
+        """
+        Returns:
+            tuple:  The variables in ``os.environ`` that configure a
+            :class:`LoadEnv` when it is created, i.e., ``XDG_CACHE_HOME`` and
+            every ``LOADENV_*`` variable except ``LOADENV_TIMINGS``, which is
+            read for each request.
+        """
+        return tuple(sorted(
+            (name, value) for name, value in os.environ.items()
+            if name == "XDG_CACHE_HOME"
+            or (name.startswith("LOADENV_") and name != "LOADENV_TIMINGS")
+            ))
+
+
+    @staticmethod
+    @contextlib.contextmanager
+    def client_environment(message):
+        """
+        Replace ``os.environ`` with the request's ``env``, if it has one, and
+        restore it on exit.
+
+        Parameters:
+            message (dict):  A request.
+        """
+        if "env" not in message:
+            yield
+            return
+
+        saved = dict(os.environ)
+        try:
+            os.environ.clear()
+            os.environ.update(message["env"])
+            yield
+        finally:
+            os.environ.clear()
+            os.environ.update(saved)
+
+
+    def get_loadenv(self, argv):
+        """
+        Get a :class:`LoadEnv` object for ``argv``, reusing the one for the
+        same configuration files and :func:`settings_key` if there is one.
+
+        Parameters:
+            argv (list):  The command line arguments of the request.
+
+        Returns:
+            LoadEnv:  The object, already switched to ``argv``.
+        """
+        if self.template is None:
+            le = self.new_loadenv(argv)
+            self.template = le
+            self.loadenvs[(le.config_files_for(le.args), self.settings_key())] = (
+                le, stat_files(le)
+                )
+            return le
+
+        key = (self.template.config_files_for(self.template.parse_args(argv)), self.settings_key())
+        if key in self.loadenvs:
+            le = self.loadenvs[key][0]
+            le.update_argv(argv)
+            return le
+
+        le = self.new_loadenv(argv)
+        self.loadenvs[key] = (le, stat_files(le))
+        return le
+
+
+    def check_for_changes(self):
+        """
+        Discard every :class:`LoadEnv` whose configuration files have changed
+        since it was created, so the next request re-parses them.  If
+        ``load-env.ini`` itself changed, everything is discarded.
+        """
+        for key in list(self.loadenvs.keys()):
+            le, stats = self.loadenvs[key]
+            if stat_files(le) != stats:
+                del self.loadenvs[key]
+                if le is self.template:
+                    self.template = None
+
+        if self.template is None:
+            self.loadenvs.clear()
+
+
+    def resolve(self, message):
+        """
+        Handle a ``resolve`` request.
+
+        Returns:
+            dict:  The response.
+        """
+        output = io.StringIO()
+        with self.client_environment(message), contextlib.redirect_stdout(output):
+            le = self.get_loadenv(message["argv"])
+            record = le.resolve(le.args.build_name)
+        record["output"] = output.getvalue()
+        record["status"] = 0 if record["error"] is None else 1
+        return record
+
+
+    async def render(self, message):
+        """
+        Handle a ``render`` request.  The build name is resolved in the server
+        process, keeping its state warm, and the environment is then validated
+        and written in a forked child.
+
+        Returns:
+            dict:  The response.
+        """
+        output = io.StringIO()
+        try:
+            with self.client_environment(message), contextlib.redirect_stdout(output):
+                le = self.get_loadenv(message["argv"])
+                le.parsed_env_name
+                le.env_stripped_build_name
+        except SystemExit as e:
+            return {"status": 1, "output": output.getvalue(), "error": str(e.code)}
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:                                                                # pragma: no cover
+            os.close(read_fd)
+            self.render_in_child(le, message, write_fd)
+
+        os.close(write_fd)
+        try:
+            response = await asyncio.wait_for(self.read_child(read_fd), self.render_timeout)
+        except asyncio.TimeoutError:
+            os.kill(pid, signal.SIGKILL)
+            response = {"status": 1, "error": "Timed out while loading the environment."}
+        await self.reap_child(pid)
+
+        response["output"] = output.getvalue() + response.get("output", "")
+        return response
+
+
+    def render_in_child(self, le, message, write_fd):                               # pragma: no cover
+        """
+        Validate and write the environment in a forked child, writing the JSON
+        response to ``write_fd``.  Never returns.
+        """
+        output = io.StringIO()
+        response = {"status": 0, "error": None}
+        try:
+            os.chdir(message.get("cwd", os.getcwd()))
+            if "env" in message:
+                os.environ.clear()
+                os.environ.update(message["env"])
+            le.reset_timer()
+            with contextlib.redirect_stdout(output):
+                self.load_env.validate_and_write(le)
+            le.write_timings()
+            response["load_matching_env"] = str(le.tmp_load_matching_env_file)
+        except SystemExit as e:
+            response["status"] = e.code if isinstance(e.code, int) else 1
+            response["error"] = None if isinstance(e.code, int) else str(e.code)
+        except BaseException:
+            response["status"] = 1
+            response["error"] = traceback.format_exc()
+
+        response["output"] = output.getvalue()
+        with os.fdopen(write_fd, "wb") as F:
+            F.write(json.dumps(response).encode())
+        os._exit(0)
+
+
+    async def read_child(self, read_fd):
+        """
+        Read the JSON response written by :func:`render_in_child`.
+
+        Returns:
+            dict:  The response.
+        """
+        loop = asyncio.get_event_loop()
+        reader = asyncio.StreamReader()
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, "rb")
+            )
+        try:
+            data = await reader.read()
+        finally:
+            transport.close()
+
+        if data == b"":
+            return {"status": 1, "error": "The process loading the environment died."}
+        return json.loads(data.decode())
+
+
+    @staticmethod
+    async def reap_child(pid):
+        """
+        Wait for a forked child to exit without blocking the event loop.
+        """
+        while True:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+            if done != 0:
+                return
+            await asyncio.sleep(0.01)
+
+
+    async def handle_request(self, message):
+        """
+        Dispatch a request to the appropriate handler.
+
+        Returns:
+            dict:  The response.
+        """
+        op = message.get("op")
+        if op == "ping":
+            return {"status": 0, "pid": os.getpid()}
+        if op == "shutdown":
+            asyncio.get_event_loop().call_soon(self.stop)
+            return {"status": 0}
+
+        self.check_for_changes()
+        if op == "resolve":
+            return self.resolve(message)
+        if op == "render":
+            return await self.render(message)
+        return {"status": 1, "error": f"Unknown operation '{op}'."}
+
+
+    async def handle_client(self, reader, writer):
+        """
+        Read one request from a client connection, and write its response.
+        """
+        try:
+            line = await reader.readline()
+            try:
+                response = await self.handle_request(json.loads(line.decode()))
+            except Exception:
+                response = {"status": 1, "error": traceback.format_exc()}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+    async def start(self):
+        """
+        Start listening on :attr:`socket_path`, replacing a stale socket left
+        behind by a server that is no longer running.
+
+        Raises:
+            RuntimeError:  If another server is already listening, or the
+                socket's directory is not private to the current user.
+        """
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        directory = os.lstat(self.socket_path.parent)
+        if (
+            not stat.S_ISDIR(directory.st_mode)
+            or directory.st_uid != os.getuid()
+            or stat.S_IMODE(directory.st_mode) != 0o700
+            ):
+            raise RuntimeError(
+                f"'{self.socket_path.parent}' must be a directory owned by the current user "
+                "with mode 0700."
+                )
+        if self.socket_path.exists():
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as S:
+                if S.connect_ex(str(self.socket_path)) == 0:
+                    raise RuntimeError(
+                        f"A LoadEnv server is already listening on '{self.socket_path}'."
+                        )
+            self.socket_path.unlink()
+
+        old_umask = os.umask(0o077)
+        try:
+            self.server = await asyncio.start_unix_server(
+                self.handle_client, path=str(self.socket_path)
+                )
+        finally:
+            os.umask(old_umask)
+
+
+    async def serve(self):
+        """
+        Start the server and handle requests until it is shut down.
+        """
+        await self.start()
+        try:
+            await self.server.wait_closed()
+        finally:
+            with contextlib.suppress(OSError):
+                self.socket_path.unlink()
+
+
+    def stop(self):
+        """
+        Stop accepting connections, which ends :func:`serve`.
+        """
+        if self.server is not None:
+            self.server.close()
+
+
+    def run(self):
+        """
+        Run the server in a new event loop until it is shut down or receives
+        ``SIGTERM`` or ``SIGINT``.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            serve = loop.create_task(self.serve())
+            for sig in [signal.SIGTERM, signal.SIGINT]:
+                loop.add_signal_handler(sig, self.stop)
+            loop.run_until_complete(serve)
+        finally:
+            loop.close()
+
+
+
+def main(argv):
+    """
+    Entry point for ``python3 -m loadenv serve``.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python3 -m loadenv serve",
+        description="Run a resident LoadEnv server for load-env.sh to use.",
+        )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="The Unix socket to listen on.  Defaults to $LOADENV_SOCKET, or "
+        "loadenv.sock in $XDG_RUNTIME_DIR or /tmp/$USER.",
+        )
+    parser.add_argument(
+        "--render-timeout",
+        type=float,
+        default=600,
+        help="Seconds a single environment may take to load.",
+        )
+    args = parser.parse_args(argv)
+
+    server = LoadEnvServer(socket_path=args.socket, render_timeout=args.render_timeout)
+    print(f"LoadEnv server listening on '{server.socket_path}'.")
+    server.run()
+    return 0
@@ -0,0 +1,268 @@
+import threading
+
+try:                                                                                # pragma: no cover
+    from .EnvKeywordParser import DuplicateAliasError, UnknownEnvironmentError
+    from .LoadEnvModule import import_load_env, stat_files
+except ImportError:                                                                 # pragma: no cover
+    from EnvKeywordParser import DuplicateAliasError, UnknownEnvironmentError
+    from LoadEnvModule import import_load_env, stat_files
+
+
+
+class LoadEnvSessionError(Exception):
+    """
+    Base class for the errors raised by :class:`LoadEnvSession`.  Unlike the
+    errors raised by :class:`LoadEnv`, these are not ``SystemExit``
+    subclasses, so ``except Exception`` catches them.
+
+    Parameters:
+        message (str):  The formatted message.
+        build_name (str):  The build name that could not be resolved.
+    """
+
+    def __init__(self, message, build_name=None):
+        super().__init__(message)
+        self.message = message
+        self.build_name = build_name
+
+
+
+class SystemNotFoundError(LoadEnvSessionError):
+    """
+    Raised when the system cannot be determined, e.g., the hostname matches
+    no system in ``supported-systems.ini``, or the build name names a
+    different system than the hostname.
+    """
+
+
+
+class EnvironmentNotFoundError(LoadEnvSessionError):
+    """
+    Raised when no environment name or alias for the system appears in the
+    build name.
+    """
+
+
+
+class ConfigurationError(LoadEnvSessionError):
+    """
+    Raised when the configuration files are invalid for the build name, e.g.,
+    a system has duplicate aliases, or is missing from
+    ``supported-envs.ini``.
+    """
+
+
+
+class Resolution(object):
+    """
+    The result of resolving a build name with :func:`LoadEnvSession.resolve`.
+
+    Parameters:
+        build_name (str):  The build name.
+        system_name (str):  The system the environment was selected for.
+        env_name (str):  The fully qualified environment name, e.g.,
+            ``ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp``.
+        env_stripped_build_name (str):  The build name without the system
+            name, environment name, and aliases in it.
+    """
+
+    def __init__(self, build_name, system_name, env_name, env_stripped_build_name):
+        self.build_name = build_name
+        self.system_name = system_name
+        self.env_name = env_name
+        self.env_stripped_build_name = env_stripped_build_name
+
+
+    def __eq__(self, other):
+        return isinstance(other, Resolution) and self.to_dict() == other.to_dict()
+
+
+    def __repr__(self):
+        return f"Resolution({self.build_name!r} -> {self.env_name!r})"
+
+
+    def to_dict(self):
+        """
+        Returns:
+            dict:  The fields, keyed as in :func:`LoadEnv.resolve`.
+        """
+        return {
+            "build_name": self.build_name,
+            "system_name": self.system_name,
+            "parsed_env_name": self.env_name,
+            "env_stripped_build_name": self.env_stripped_build_name,
+            }
+
+
+
+class LoadEnvSession(object):
+    """
+    A library API for resolving many build names against one set of
+    configuration files, e.g., for GenConfig.  The parsed configuration
+    files, the :class:`EnvKeywordParser` of each system, and the system
+    determined from the hostname are kept for the life of the session, and
+    refreshed when any of the configuration files change.
+
+    Unlike :class:`LoadEnv`, nothing calls ``sys.exit()``:  failures raise a
+    :class:`LoadEnvSessionError`.  A session may be shared between threads;
+    resolutions are serialized, since they are CPU-bound and share state.
+
+    Usage::
+
+        session = LoadEnvSession()
+        resolution = session.resolve("Trilinos_rhel7_clang-openmp_opt")
+        print(resolution.env_name, session.actions(resolution))
+
+    Parameters:
+        supported_systems_file (str, Path):  Defaults to the one in
+            ``load-env.ini``.
+        supported_envs_file (str, Path):  Defaults to the one in
+            ``load-env.ini``.
+        environment_specs_file (str, Path):  Defaults to the one in
+            ``load-env.ini``.
+        force (bool):  Use the system named in each build name rather than
+            the one matched via the hostname, as with ``--force``.
+        load_env_ini_file (str, Path):  The ``load-env.ini`` to use, for
+            testing purposes.
+    """
+
+    def __init__(
+        self,
+        supported_systems_file=None,
+        supported_envs_file=None,
+        environment_specs_file=None,
+        force=False,
+        load_env_ini_file=None,
+        ):
+        self.argv = []
+        for option, filename in [
+            ("--supported-systems", supported_systems_file),
+            ("--supported-envs", supported_envs_file),
+            ("--environment-specs", environment_specs_file),
+            ]:
+            if filename is not None:
+                self.argv += [option, str(filename)]
+        if force:
+            self.argv += ["--force"]
+        self.load_env_ini_file = load_env_ini_file
+        self.lock = threading.RLock()
+        self._load_env = None
+        self._stats = None
+
+
+    @property
+    def load_env(self):
+        """
+        The :class:`LoadEnv` object holding the session's state, re-created
+        if any of its configuration files changed since it was created.
+        Only use it while holding :attr:`lock`.
+        """
+        if self._load_env is not None and stat_files(self._load_env) != self._stats:
+            self._load_env = None
+
+        if self._load_env is None:
+            load_env = import_load_env()
+            if self.load_env_ini_file is None:
+                le = load_env.LoadEnv(self.argv + [""])
+            else:
+                le = load_env.LoadEnv(self.argv + [""], load_env_ini_file=self.load_env_ini_file)
+            le.silent = True
+            self._stats = stat_files(le)
+            self._load_env = le
+        return self._load_env
+
+
+    def resolve(self, build_name):
+        """
+        Resolve a build name to an environment.  Nothing is printed, since
+        the session's :class:`LoadEnv` is :attr:`LoadEnv.silent`.
+
+        Parameters:
+            build_name (str):  The build name.
+
+        Returns:
+            Resolution:  The environment selected by ``build_name``.
+
+        Raises:
+            SystemNotFoundError:  If the system cannot be determined.
+            EnvironmentNotFoundError:  If ``build_name`` selects no
+                environment.
+            ConfigurationError:  If the configuration files are invalid.
+        """
+        with self.lock:
+            le = self.load_env
+            le.build_name = build_name
+            try:
+                system_name = le.system_name
+            except SystemExit as e:
+                raise SystemNotFoundError(str(e.code), build_name) from e
+
+            if le.supported_envs_data is None:
+                le.parse_supported_envs_file()
+            if not le.supported_envs_data.has_section(system_name):
+                raise ConfigurationError(
+                    f"System '{system_name}' is not listed in '{le.args.supported_envs_file}'.",
+                    build_name
+                    )
+
+            try:
+                env_name = le.parsed_env_name
+            except UnknownEnvironmentError as e:
+                raise EnvironmentNotFoundError(str(e.code), build_name) from e
+            except DuplicateAliasError as e:
+                raise ConfigurationError(str(e.code), build_name) from e
+
+            return Resolution(build_name, system_name, env_name, le.env_stripped_build_name)
+
+
+    def resolve_many(self, build_names):
+        """
+        Resolve several build names, without raising.
+
+        Parameters:
+            build_names (iterable):  The build names.
+
+        Returns:
+            list:  For each build name, in order, its :class:`Resolution`, or
+            the :class:`LoadEnvSessionError` raised while resolving it.
+        """
+        results = []
+        for build_name in build_names:
+            try:
+                results.append(self.resolve(build_name))
+            except LoadEnvSessionError as e:
+                results.append(e)
+        return results
+
+
+    def actions(self, resolution):
+        """
+        Parameters:
+            resolution (Resolution):  A resolved environment.
+
+        Returns:
+            list:  The ``(operation, parameter, value)`` actions of the
+            environment after ``use`` expansion.  See
+            :func:`EnvSpecGraph.expanded_actions`.
+        """
+        with self.lock:
+            return self.load_env.env_spec_graph.expanded_actions(resolution.env_name)
+
+
+    def render(self, resolution):
+        """
+        Write the ``load_matching_env`` script of a resolved environment, as
+        ``load_env.py`` does after validating it.
+
+        Parameters:
+            resolution (Resolution):  A resolved environment.
+
+        Returns:
+            Path:  The new script, managed by the :attr:`LoadEnv.artifact_store`.
+        """
+        with self.lock:
+            le = self.load_env
+            le.build_name = resolution.build_name
+            if hasattr(le, "_tmp_load_matching_env_file"):
+                delattr(le, "_tmp_load_matching_env_file")
+            return le.write_load_matching_env()
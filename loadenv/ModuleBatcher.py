@@ -0,0 +1,169 @@
+import os
+
+try:                                                                                # pragma: no cover
+    from .ActionOptimizer import ActionOptimizer
+except ImportError:                                                                 # pragma: no cover
+    from ActionOptimizer import ActionOptimizer
+
+
+
+class ModuleBatcher(object):
+    """
+    Applies an environment's expanded actions, e.g., from
+    :func:`EnvSpecGraph.expanded_actions`, to ``os.environ``, running each
+    run of consecutive ``module-load`` or ``module-unload`` actions as one
+    ``module`` command rather than one command per action.  Each ``module``
+    command is a separate ``modulecmd`` or Lmod evaluation, so this is where
+    most of the time applying an environment goes.
+
+    If a batched command fails, its actions are run again one at a time, so
+    the failure is attributed to the action that caused it; loading or
+    unloading a module twice is harmless.
+
+    ``envvar-*`` actions are applied directly, with ``${NAME}`` references
+    expanded from ``os.environ``, the same way :class:`ActionOptimizer`
+    renders them.  Only the operations in
+    :attr:`ActionOptimizer.SUPPORTED_OPERATIONS` can be applied; see
+    :attr:`supported`.
+
+    Usage::
+
+        batcher = ModuleBatcher(graph.expanded_actions(env_name))
+        if batcher.supported and batcher.apply() != 0:
+            print(batcher.failed_action)
+
+    Parameters:
+        actions (list):  ``(operation, parameter, value)`` action tuples.
+        module (callable):  Runs one ``module`` command, e.g.,
+            ``module("load", "gcc/10.2.0", "cmake")``, updating ``os.environ``
+            and returning ``0`` on success.  Defaults to
+            ``setenvironment.ModuleHelper.module``.
+    """
+
+    # Module commands that accept several modules, and behave as if they were
+    # run once per module, in order.
+    BATCHED_COMMANDS = ["load", "unload"]
+
+    def __init__(self, actions, module=None):
+        self.actions = [(op, param, "" if value is None else value) for op, param, value in actions]
+        if module is None:
+            from setenvironment import ModuleHelper
+            module = ModuleHelper.module
+        self.module = module
+        self.failed_action = None
+
+
+    @property
+    def supported(self):
+        """
+        Whether every action can be applied by this class.
+        """
+        return all(_[0] in ActionOptimizer.SUPPORTED_OPERATIONS for _ in self.actions)
+
+
+    def batches(self):
+        """
+        Group the actions into the commands :func:`apply` runs.
+
+        Returns:
+            list:  ``(command, arguments, actions)`` tuples, where ``command``
+            is a ``module`` command, e.g., ``"load"``, or an ``envvar-*``
+            operation, and ``actions`` are the actions it applies.
+        """
+        batches = []
+        for action in self.actions:
+            op, name, value = action
+            if not op.startswith("module-"):
+                batches.append((op, [name, value], [action]))
+                continue
+
+            command = op[len("module-") :]
+            if command in ["load", "unload"]:
+                arguments = self._arguments(action)
+            elif command == "swap":
+                arguments = [name, value]
+            elif command in ["use", "unuse"]:
+                arguments = [value]
+            else:
+                arguments = []
+
+            if (
+                command in self.BATCHED_COMMANDS
+                and batches != []
+                and batches[-1][0] == command
+                ):
+                batches[-1][1].extend(arguments)
+                batches[-1][2].append(action)
+            else:
+                batches.append((command, arguments, [action]))
+        return batches
+
+
+    def apply(self):
+        """
+        Apply the actions to ``os.environ``, stopping at the first failure.
+
+        Returns:
+            int:  ``0`` on success, or non-zero on failure, in which case
+            :attr:`failed_action` is the action that failed.
+        """
+        self.failed_action = None
+        for command, arguments, actions in self.batches():
+            if command.startswith("envvar-"):
+                status = self._apply_envvar(command, *arguments)
+            else:
+                status = self.module(command, *arguments)
+                if status != 0 and len(actions) > 1:
+                    for action in actions:
+                        status = self.module(command, *self._arguments(action))
+                        if status != 0:
+                            self.failed_action = action
+                            return status
+                    continue
+            if status != 0:
+                self.failed_action = actions[0]
+                return status
+        return 0
+
+
+    @staticmethod
+    def _arguments(action):
+        """
+        Returns:
+            list:  The arguments of the ``module`` command for one batched
+            action.
+        """
+        op, name, value = action
+        if op == "module-load" and value != "":
+            return [f"{name}/{value}"]
+        return [name]
+
+
+    def _apply_envvar(self, op, name, value):
+        """
+        Apply one ``envvar-*`` action to ``os.environ``.
+
+        Returns:
+            int:  ``0`` on success, or ``1`` if ``envvar-find-in-path`` finds
+            nothing.
+        """
+        value = ActionOptimizer.REFERENCE_REGEX.sub(lambda _: os.environ.get(_.group(1), ""), value)
+        current = os.environ.get(name, "")
+        if op == "envvar-set":
+            os.environ[name] = value
+        elif op == "envvar-unset":
+            os.environ.pop(name, None)
+        elif op == "envvar-prepend":
+            os.environ[name] = value + (":" + current if current != "" else "")
+        elif op == "envvar-append":
+            os.environ[name] = (current + ":" if current != "" else "") + value
+        elif op == "envvar-find-in-path":
+            import shutil
+
+            path = shutil.which(value)
+            if path is None:
+                return 1
+            os.environ[name] = path
+        else:
+            raise ValueError(f"Unsupported operation '{op}'.")
+        return 0
@@ -0,0 +1,69 @@
+import os
+import time
+
+
+
+class ModuleStub(object):
+    """
+    A stand-in for the ``module`` command, for testing and benchmarking
+    :class:`ModuleBatcher` without a module system.  Like
+    ``setenvironment.ModuleHelper.module``, it is called as, e.g.,
+    ``module("load", "gcc/10.2.0", "cmake")``, updates ``os.environ``, and
+    returns ``0`` on success.
+
+    Loaded modules are tracked in ``LOADEDMODULES``, and loading ``name/1.0``
+    prepends ``/opt/name/1.0/bin`` to ``PATH``.  ``use`` and ``unuse`` edit
+    ``MODULEPATH``.  A command naming a module that is not :attr:`available`
+    changes nothing and fails, like Lmod does.
+
+    Usage::
+
+        module = ModuleStub(delay=0.01)
+        ModuleBatcher(actions, module=module).apply()
+        print(len(module.calls))
+
+    Parameters:
+        available (list):  The modules that can be loaded, or ``None`` for any.
+        delay (float):  Seconds each call sleeps for, to model the cost of a
+            ``modulecmd`` or Lmod evaluation.
+    """
+
+    def __init__(self, available=None, delay=0.0):
+        self.available = available
+        self.delay = delay
+        self.calls = []
+
+
+    def __call__(self, command, *arguments):
+        self.calls.append((command, *arguments))
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+        if command in ["load", "swap"] and self.available is not None:
+            new = arguments if command == "load" else arguments[1 :]
+            if any(_ not in self.available for _ in new):
+                return 1
+
+        loaded = [_ for _ in os.environ.get("LOADEDMODULES", "").split(":") if _ != ""]
+        if command == "load":
+            for name in arguments:
+                loaded.append(name)
+                os.environ["PATH"] = f"/opt/{name}/bin:" + os.environ.get("PATH", "")
+        elif command == "unload":
+            loaded = [_ for _ in loaded if _ not in arguments and _.split("/")[0] not in arguments]
+        elif command == "swap":
+            old, new = arguments
+            loaded = [new if _ == old or _.split("/")[0] == old else _ for _ in loaded]
+        elif command == "purge":
+            loaded = []
+        elif command in ["use", "unuse"]:
+            paths = [
+                _ for _ in os.environ.get("MODULEPATH", "").split(":") if _ not in ["", *arguments]
+                ]
+            if command == "use":
+                paths = list(arguments) + paths
+            os.environ["MODULEPATH"] = ":".join(paths)
+        else:
+            return 1
+        os.environ["LOADEDMODULES"] = ":".join(loaded)
+        return 0
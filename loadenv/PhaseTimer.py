@@ -0,0 +1,159 @@
+import time
+
+try:                                                                                # pragma: no cover
+    from .version import __version__
+except ImportError:                                                                 # pragma: no cover
+    from version import __version__
+
+
+
+class _NullPhase(object):
+    """
+    The context manager returned by :func:`PhaseTimer.phase` when timing is
+    disabled.  One instance is shared, so a disabled phase costs one method
+    call and nothing else.
+    """
+
+    def __enter__(self):
+        return None
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+
+_NULL_PHASE = _NullPhase()
+
+
+
+class _Phase(object):
+    """
+    The context manager returned by :func:`PhaseTimer.phase` when timing is
+    enabled.  It measures the wall and CPU time of its block and appends a
+    record of it to :attr:`PhaseTimer.phases`.
+    """
+
+    def __init__(self, timer, name, info):
+        self.timer = timer
+        self.name = name
+        self.info = info
+
+
+    def __enter__(self):
+        self.record = {"name": self.name, "depth": len(self.timer._stack)}
+        self.timer.phases.append(self.record)
+        self.timer._stack.append(self.record)
+        cache = self.timer.cache
+        self.cache_counts = None if cache is None else (cache.hits, cache.misses)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self.record
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.record["wall_s"] = round(time.perf_counter() - self.wall, 6)
+        self.record["cpu_s"] = round(time.process_time() - self.cpu, 6)
+        if self.cache_counts is not None:
+            self.record["cache_hits"] = self.timer.cache.hits - self.cache_counts[0]
+            self.record["cache_misses"] = self.timer.cache.misses - self.cache_counts[1]
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        elif self.info is not None:
+            self.record.update(self.info())
+        self.timer._stack.pop()
+        return False
+
+
+
+class PhaseTimer(object):
+    """
+    Records the wall and CPU time spent in each phase of a LoadEnv run, e.g.,
+    parsing ``supported-envs.ini`` or applying the environment, along with the
+    sizes of the data involved and how many :class:`ConfigCache` lookups hit
+    or missed.  Phases may be nested; each record notes its ``depth``.
+
+    When disabled, :func:`phase` returns a shared no-op context manager, so
+    instrumented code paths cost next to nothing.
+
+    Usage::
+
+        timer = PhaseTimer(enabled=True, cache=config_cache)
+        with timer.phase("parse supported-envs.ini", lambda: {"sections": len(data)}):
+            data = parse()
+        timer.write("timings.json")
+
+    Parameters:
+        enabled (bool):  Whether or not to record anything.
+        cache (ConfigCache):  The cache whose ``hits`` and ``misses`` are
+            attributed to each phase.
+        info (dict):  Extra data to include in the output, e.g., the command
+            line arguments.
+    """
+
+    def __init__(self, enabled=False, cache=None, info=None):
+        self.enabled = enabled
+        self.cache = cache
+        self.info = {} if info is None else info
+        self.phases = []
+        self._stack = []
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+
+    def phase(self, name, info=None):
+        """
+        Time a phase.
+
+        Parameters:
+            name (str):  The name of the phase.
+            info (callable):  A function taking no arguments that returns a
+                ``dict`` of extra data to record, e.g., sizes.  It is only
+                called if timing is enabled and the phase succeeds.
+
+        Returns:
+            A context manager yielding the phase's record, or ``None`` if
+            timing is disabled.
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name, info)
+
+
+    def to_dict(self):
+        """
+        Returns:
+            dict:  The :attr:`info`, the total wall and CPU time since the timer
+            was created, the cache totals, and the record of each phase in the
+            order the phases started.
+        """
+        record = {
+            "loadenv_version": __version__,
+            **self.info,
+            "wall_s": round(time.perf_counter() - self.wall, 6),
+            "cpu_s": round(time.process_time() - self.cpu, 6),
+            }
+        if self.cache is not None:
+            record["cache_enabled"] = self.cache.enabled
+            record["cache_hits"] = self.cache.hits
+            record["cache_misses"] = self.cache.misses
+        record["phases"] = self.phases
+        return record
+
+
+    def write(self, output):
+        """
+        Write :func:`to_dict` as JSON.
+
+        Parameters:
+            output (str, Path, file):  The file to write to, or an open file
+                object, e.g., ``sys.stderr``.
+        """
+        import json
+
+        if hasattr(output, "write"):
+            output.write(json.dumps(self.to_dict(), indent=2) + "\n")
+            return
+        with open(output, "w") as F:
+            json.dump(self.to_dict(), F, indent=2)
+            F.write("\n")
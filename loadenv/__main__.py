@@ -1,5 +1,24 @@
 import sys
 
+
+
+def main(argv):
+    """
+    Entry point for ``python3 -m loadenv``.  ``python3 -m loadenv serve`` runs
+    a :class:`LoadEnvServer`, and ``python3 -m loadenv compile [FILE]``
+    compiles a :class:`Catalog`; anything else is passed on to
+    ``load_env.py``.
+    """
+    if argv[: 1] == ["serve"]:
+        from .LoadEnvServer import main as serve_main
+        return serve_main(argv[1 :])
+
+    from .LoadEnvModule import import_load_env
+    if argv[: 1] == ["compile"]:
+        return import_load_env().main(["--compile-catalog", *argv[1 :]])
+    return import_load_env().main(argv)
+
+
+
 if __name__ == "__main__":
-    from .LoadEnv import main as _main
-    _main(sys.argv[1 :])
+    sys.exit(main(sys.argv[1 :]))
@@ -0,0 +1,3 @@
+"""
+Benchmarks for LoadEnv; see the individual ``bench_*.py`` scripts.
+"""
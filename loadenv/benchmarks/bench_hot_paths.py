@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for LoadEnv's hot paths, each timed in isolation with
+``timeit``:
+
+    * ``ConfigParserEnhanced`` parsing of each configuration file.
+    * ``DetermineSystem`` resolution of a system name.
+    * ``EnvKeywordParser.qualified_env_name`` for a build name containing an
+      environment name, and for one containing only an alias.
+    * ``EnvKeywordParser.get_msg_showing_supported_environments``.
+    * ``SetEnvironment.assert_file_all_sections_handled``.
+    * ``EnvSpecGraph.actions_fingerprint`` of every section, from scratch.
+    * ``ModuleBatcher.apply`` of the environment's module actions, batched and
+      one action at a time, against a ``ModuleStub`` taking ``--module-delay``
+      seconds per ``module`` command.
+    * ``LoadEnv.write_load_matching_env``, with and without the render cache.
+
+By default the configuration files in ``loadenv/unittests/supporting_files``
+are used; pass others, e.g., generated ones, to measure how these paths scale.
+The system, environment name, and alias are picked from
+``supported-envs.ini`` unless given.
+
+Usage::
+
+    python3 loadenv/benchmarks/bench_hot_paths.py --output hot_paths.json
+    python3 loadenv/benchmarks/bench_hot_paths.py --baseline hot_paths.json
+
+The exit status is non-zero if any benchmark is more than ``--tolerance``
+slower than the baseline.
+"""
+import argparse
+import contextlib
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+SUPPORTING_FILES = ROOT_DIR / "loadenv" / "unittests" / "supporting_files"
+FILE_KINDS = ["supported-systems", "supported-envs", "environment-specs"]
+
+sys.path.insert(0, str(ROOT_DIR))
+import load_env
+from loadenv.ConfigCache import ConfigCache, ConfigData
+from loadenv.EnvKeywordParser import EnvKeywordParser
+from loadenv.EnvSpecGraph import EnvSpecGraph
+from loadenv.ModuleBatcher import ModuleBatcher
+from loadenv.ModuleStub import ModuleStub
+from loadenv.version import __version__
+
+
+
+def time_function(function, repeat=5, min_time=0.2):
+    """
+    Time ``function`` the way ``python3 -m timeit`` does: call it enough times
+    for one measurement to take at least ``min_time`` seconds, and repeat that
+    measurement ``repeat`` times.
+
+    Parameters:
+        function (callable):  The function to time, taking no arguments.
+        repeat (int):  The number of measurements.
+        min_time (float):  The minimum duration of one measurement.
+
+    Returns:
+        dict:  The number of calls per measurement, and the minimum and median
+        time per call in microseconds.
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = [_ / number * 1e6 for _ in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_us": round(min(times), 3),
+        "median_us": round(statistics.median(times), 3),
+        }
+
+
+
+def pick_environment(supported_envs_file, system_name=None):
+    """
+    Pick a system, an environment name, and an alias to benchmark with.
+
+    Parameters:
+        supported_envs_file (Path):  The ``supported-envs.ini`` file.
+        system_name (str):  The system to use.  Defaults to the first system
+            with an aliased environment.
+
+    Returns:
+        tuple:  The system name, environment name, and alias.
+    """
+    data = load_env.ConfigParserEnhanced(supported_envs_file).configparserenhanceddata
+    system_names = [system_name] if system_name is not None else data.sections()
+    for system_name in system_names:
+        ekp = EnvKeywordParser("", system_name, supported_envs_file)
+        for env_name, aliases in ekp.env_aliases.items():
+            if aliases != []:
+                return system_name, env_name, aliases[0]
+    raise ValueError(f"No aliased environments found in '{supported_envs_file}'.")
+
+
+
+def make_benchmarks(files, system_name, env_name, alias, scratch_dir, module_delay=0.001):
+    """
+    Set up each benchmark.
+
+    Parameters:
+        files (dict):  The ``supported-systems``, ``supported-envs``, and
+            ``environment-specs`` files.
+        system_name (str):  The system to use.
+        env_name (str):  An environment name on ``system_name``.
+        alias (str):  An alias on ``system_name``.
+        scratch_dir (Path):  Where to write output.
+        module_delay (float):  The seconds each stubbed ``module`` command
+            takes.
+
+    Returns:
+        dict:  A mapping of benchmark names to functions taking no arguments.
+    """
+    benchmarks = {}
+
+    def parse(filename):
+        data = load_env.ConfigParserEnhanced(filename).configparserenhanceddata
+        for section in data.sections():
+            data[section]
+
+    for kind, filename in files.items():
+        benchmarks[f"ConfigParserEnhanced[{kind}]"] = lambda filename=filename: parse(filename)
+
+    benchmarks["DetermineSystem"] = lambda: load_env.DetermineSystem(
+        f"{system_name}_{alias}", files["supported-systems"], force_build_name=True, silent=True
+        ).system_name
+
+    ekp = EnvKeywordParser(env_name, system_name, files["supported-envs"])
+
+    def qualified_env_name(build_name):
+        ekp.build_name = build_name
+        return ekp.qualified_env_name
+
+    benchmarks["EnvKeywordParser.qualified_env_name[env_name]"] = lambda: qualified_env_name(
+        f"{env_name}_opt"
+        )
+    benchmarks["EnvKeywordParser.qualified_env_name[alias]"] = lambda: qualified_env_name(
+        f"{alias}_opt"
+        )
+    benchmarks["EnvKeywordParser.get_msg_showing_supported_environments"] = lambda: (
+        ekp.get_msg_showing_supported_environments("Benchmark.", kind="INFO")
+        )
+
+    benchmarks["SetEnvironment.assert_file_all_sections_handled"] = lambda: load_env.SetEnvironment(
+        filename=files["environment-specs"]
+        ).assert_file_all_sections_handled()
+
+    raw_specs = ConfigData.from_configparser(
+        load_env.ConfigParserEnhanced(files["environment-specs"]).configparser_object
+        )
+
+    def fingerprint_all():
+        graph = EnvSpecGraph(raw_specs)
+        for section in raw_specs.sections():
+            graph.actions_fingerprint(section)
+
+    benchmarks["EnvSpecGraph.actions_fingerprint[all sections]"] = fingerprint_all
+
+    module_actions = [
+        _
+        for _ in EnvSpecGraph(raw_specs).expanded_actions(f"{system_name}_{env_name}")
+        if _[0].startswith("module-")
+        ]
+
+    def apply_modules(batched):
+        environ = dict(os.environ)
+        batcher = ModuleBatcher(module_actions, module=ModuleStub(delay=module_delay))
+        if not batched:
+            batcher.BATCHED_COMMANDS = []
+        batcher.apply()
+        os.environ.clear()
+        os.environ.update(environ)
+
+    for batched in [False, True]:
+        label = "batched" if batched else "per-action"
+        benchmarks[f"ModuleBatcher.apply[{label}]"] = lambda batched=batched: apply_modules(batched)
+
+    for cached in [False, True]:
+        le = load_env.LoadEnv(
+            [
+                "--supported-systems", str(files["supported-systems"]),
+                "--supported-envs", str(files["supported-envs"]),
+                "--environment-specs", str(files["environment-specs"]),
+                "--output", str(scratch_dir / "load_matching_env.sh"),
+                "--force",
+                f"{system_name}_{alias}",
+                ]
+            )
+        le.config_cache = ConfigCache(cache_dir=scratch_dir / "cache", enabled=cached)
+        le.write_load_matching_env()
+        label = "cached" if cached else "uncached"
+        benchmarks[f"LoadEnv.write_load_matching_env[{label}]"] = le.write_load_matching_env
+
+    return benchmarks
+
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results against a baseline.
+
+    Parameters:
+        results (dict):  The current results.
+        baseline (dict):  The baseline results.
+        tolerance (float):  The allowed slow-down, e.g., ``0.2`` for 20%.
+
+    Returns:
+        list:  Lines of a table comparing each benchmark, and a list of the
+        names of the benchmarks that regressed.
+    """
+    lines = [f"{'benchmark':<60} {'baseline':>12} {'current':>12} {'change':>8}"]
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            lines.append(f"{name:<60} {'-':>12} {result['min_us']:>10.1f}us {'new':>8}")
+            continue
+        before = baseline["benchmarks"][name]["min_us"]
+        change = result["min_us"] / before - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        lines.append(
+            f"{name:<60} {before:>10.1f}us {result['min_us']:>10.1f}us {change:>+8.0%}{flag}"
+            )
+    return lines, regressions
+
+
+
+def main(argv):
+    """
+    Run the benchmarks, print a summary, and return the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--supported-systems", type=Path, default=SUPPORTING_FILES / "test_supported_systems.ini"
+        )
+    parser.add_argument(
+        "--supported-envs", type=Path, default=SUPPORTING_FILES / "test_supported_envs.ini"
+        )
+    parser.add_argument(
+        "--environment-specs", type=Path, default=SUPPORTING_FILES / "test_environment_specs.ini"
+        )
+    parser.add_argument("--system", default=None, help="The system to benchmark with.")
+    parser.add_argument(
+        "--filter", default="", help="Only run benchmarks whose names contain this."
+        )
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per benchmark.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per measurement.")
+    parser.add_argument(
+        "--module-delay", type=float, default=0.001, help="Seconds per stubbed module command."
+        )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against this JSON file from --output.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed slow-down vs. the baseline."
+        )
+    args = parser.parse_args(argv)
+
+    files = {
+        "supported-systems": args.supported_systems.resolve(),
+        "supported-envs": args.supported_envs.resolve(),
+        "environment-specs": args.environment_specs.resolve(),
+        }
+    results = {
+        "loadenv_version": __version__,
+        "python": platform.python_version(),
+        "files": {kind: str(filename) for kind, filename in files.items()},
+        "benchmarks": {},
+        }
+
+    with tempfile.TemporaryDirectory() as scratch_dir, open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            system_name, env_name, alias = pick_environment(files["supported-envs"], args.system)
+            benchmarks = make_benchmarks(
+                files, system_name, env_name, alias, Path(scratch_dir), args.module_delay
+                )
+
+        for name, function in benchmarks.items():
+            if args.filter not in name:
+                continue
+            with contextlib.redirect_stdout(devnull):
+                result = time_function(function, args.repeat, args.min_time)
+            results["benchmarks"][name] = result
+            print(f"{name:<60} {result['min_us']:>12.1f} us  (x{result['number']})")
+
+    results.update({"system_name": system_name, "env_name": env_name, "alias": alias})
+    if args.output is not None:
+        with open(args.output, "w") as F:
+            json.dump(results, F, indent=2)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, "r") as F:
+        lines, regressions = compare(results, json.load(F), args.tolerance)
+    print("\n" + "\n".join(lines))
+    return 1 if regressions else 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1 :]))
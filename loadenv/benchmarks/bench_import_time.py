@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Measure the cost of ``import load_env`` in a cold interpreter using
+``python3 -X importtime``, and optionally compare it against a stored
+baseline so that start-up regressions are caught.
+
+Each run starts a fresh interpreter, so nothing is shared between runs other
+than the operating system's file cache.  The minimum over all runs is used as
+the result, since it is the least affected by other activity on the machine.
+
+Usage::
+
+    python3 loadenv/benchmarks/bench_import_time.py --output import_time.json
+    python3 loadenv/benchmarks/bench_import_time.py --baseline import_time.json
+
+To measure the baseline from another revision, check it out with, e.g.,
+``git worktree add /tmp/baseline <revision>`` and pass ``--root /tmp/baseline``.
+
+The exit status is non-zero if the import takes longer than ``--budget-ms``,
+imports more than ``--max-modules`` modules, or is more than ``--tolerance``
+slower than the baseline.  The module count is deterministic, unlike the
+time, so its budget, :data:`MAX_MODULES`, is also checked by the unit tests.
+"""
+import argparse
+import json
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+# The most modules ``import load_env`` may import, as reported by
+# ``-X importtime``; 81 with Python 3.11.  Anything not needed on every run,
+# e.g., argparse or SetEnvironment, must be imported where it is used.
+MAX_MODULES = 90
+
+
+
+def parse_importtime(stderr):
+    """
+    Parse the output of ``python3 -X importtime``.
+
+    Parameters:
+        stderr (str):  The interpreter's standard error.
+
+    Returns:
+        dict:  A mapping of module names to their cumulative import time in
+        microseconds.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+
+def measure(module="load_env", runs=10, python=sys.executable, root_dir=ROOT_DIR):
+    """
+    Import ``module`` in ``runs`` fresh interpreters.
+
+    Parameters:
+        module (str):  The module to import.
+        runs (int):  The number of interpreters to start.
+        python (str):  The interpreter to use.
+        root_dir (str, Path):  The LoadEnv checkout to import from, e.g., a
+            ``git worktree`` of the baseline.
+
+    Returns:
+        dict:  The minimum and median cumulative import time of ``module`` in
+        microseconds, and the sorted names of all the modules it imported.
+    """
+    samples = []
+    modules = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [python, "-E", "-s", "-X", "importtime", "-c", f"import {module}"],
+            cwd=str(root_dir),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+            )
+        times = parse_importtime(result.stderr)
+        samples.append(times[module])
+        modules |= set(times.keys())
+
+    return {
+        "module": module,
+        "runs": runs,
+        "min_us": min(samples),
+        "median_us": int(statistics.median(samples)),
+        "modules": sorted(modules),
+        }
+
+
+
+def compare(result, baseline, tolerance):
+    """
+    Compare a :func:`measure` result against a baseline.
+
+    Parameters:
+        result (dict):  The current result.
+        baseline (dict):  The baseline result.
+        tolerance (float):  The allowed slow-down, e.g., ``0.1`` for 10%.
+
+    Returns:
+        list:  Messages describing each regression.  Modules that are now
+        imported but were not in the baseline are reported too, since they
+        usually explain a regression.
+    """
+    regressions = []
+    if result["min_us"] > baseline["min_us"] * (1 + tolerance):
+        regressions.append(
+            f"import {result['module']} took {result['min_us'] / 1000:.1f} ms, "
+            f"{result['min_us'] / baseline['min_us'] - 1:+.0%} relative to the baseline "
+            f"of {baseline['min_us'] / 1000:.1f} ms."
+            )
+    new_modules = sorted(set(result["modules"]) - set(baseline["modules"]))
+    if regressions and new_modules:
+        regressions.append("Newly imported modules:  " + ", ".join(new_modules))
+    return regressions
+
+
+
+def main(argv):
+    """
+    Run the benchmark, print a summary, and return the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="load_env", help="The module to import.")
+    parser.add_argument("--runs", type=int, default=10, help="The number of interpreters to start.")
+    parser.add_argument("--python", default=sys.executable, help="The interpreter to measure.")
+    parser.add_argument("--root", default=ROOT_DIR, help="The LoadEnv checkout to measure.")
+    parser.add_argument("--output", help="Write the result to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against this JSON file from --output.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="Allowed slow-down vs. the baseline."
+        )
+    parser.add_argument(
+        "--budget-ms", type=float, help="Fail if the import takes longer than this."
+        )
+    parser.add_argument(
+        "--max-modules", type=int, default=MAX_MODULES, help="Fail if more modules are imported."
+        )
+    args = parser.parse_args(argv)
+
+    result = measure(args.module, args.runs, args.python, args.root)
+    print(
+        f"import {result['module']}:  min {result['min_us'] / 1000:.1f} ms, "
+        f"median {result['median_us'] / 1000:.1f} ms over {result['runs']} cold interpreters, "
+        f"{len(result['modules'])} modules imported."
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as F:
+            json.dump(result, F, indent=2)
+
+    failures = []
+    if args.budget_ms is not None and result["min_us"] > args.budget_ms * 1000:
+        failures.append(f"Over the budget of {args.budget_ms} ms.")
+    if len(result["modules"]) > args.max_modules:
+        failures.append(
+            f"{len(result['modules'])} modules imported, over the budget of {args.max_modules}."
+            )
+    if args.baseline is not None:
+        with open(args.baseline, "r") as F:
+            failures += compare(result, json.load(F), args.tolerance)
+
+    for failure in failures:
+        print(f"REGRESSION:  {failure}")
+    return 1 if failures else 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1 :]))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Report how LoadEnv's hot paths scale with the size of the configuration.
+
+One dimension of a catalog made by :mod:`generate_catalog` is varied, e.g.,
+the number of environments per system, while the others are held fixed.  The
+benchmarks from :mod:`bench_hot_paths`, plus resolving a build name and
+validating its environment from scratch, are timed for each size.  The
+scaling exponent of each benchmark is then estimated as the slope of
+log(time) against log(size): about 0 is constant, about 1 is linear, and
+about 2 is quadratic.  The worst case is measured, i.e., the last
+environment of the last system, with a hostname matching the last system.
+
+Usage::
+
+    python3 loadenv/benchmarks/bench_scaling.py --dimension envs --values 10,20,40,80
+    python3 loadenv/benchmarks/bench_scaling.py --dimension systems --max-exponent 1.2
+
+The exit status is non-zero if any exponent exceeds ``--max-exponent``.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+from pathlib import Path
+import sys
+import tempfile
+from unittest import mock
+
+try:                                                                                # pragma: no cover
+    from . import bench_hot_paths
+    from .generate_catalog import generate_catalog
+except ImportError:                                                                 # pragma: no cover
+    import bench_hot_paths
+    from generate_catalog import generate_catalog
+load_env = bench_hot_paths.load_env
+time_function = bench_hot_paths.time_function
+
+
+DIMENSIONS = ["systems", "envs", "aliases", "use_depth", "use_fanout", "hostnames", "options"]
+
+
+
+def scaling_exponent(sizes, times):
+    """
+    Returns:
+        float:  The least-squares slope of ``log(times)`` against
+        ``log(sizes)``.
+    """
+    xs = [math.log(_) for _ in sizes]
+    ys = [math.log(max(_, 1e-3)) for _ in times]
+    x_mean, y_mean = sum(xs) / len(xs), sum(ys) / len(ys)
+    variance = sum((x - x_mean)**2 for x in xs)
+    if variance == 0:
+        return 0.0
+    return sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / variance
+
+
+
+def measure_catalog(catalog, scratch_dir, repeat, min_time):
+    """
+    Time every benchmark against one generated catalog.
+
+    Returns:
+        dict:  A mapping of benchmark names to minimum times per call in
+        microseconds.
+    """
+    files = {kind: Path(catalog[kind]) for kind in bench_hot_paths.FILE_KINDS}
+    alias_build_name = catalog["alias_build_names"][-1]
+    system_name, alias = alias_build_name.split("_")[: 2]
+    env_name = catalog["env_build_names"][-1].split("_")[1]
+    argv = [
+        "--supported-systems", str(files["supported-systems"]),
+        "--supported-envs", str(files["supported-envs"]),
+        "--environment-specs", str(files["environment-specs"]),
+        alias_build_name,
+        ]
+
+    def resolve():
+        le = load_env.LoadEnv(argv)
+        le.config_cache.enabled = False
+        return le.parsed_env_name
+
+    def validate():
+        le = load_env.LoadEnv(argv)
+        le.config_cache.enabled = False
+        le.load_set_environment()
+
+    benchmarks = bench_hot_paths.make_benchmarks(files, system_name, env_name, alias, scratch_dir)
+    benchmarks["LoadEnv.parsed_env_name[uncached]"] = resolve
+    benchmarks["LoadEnv.load_set_environment[uncached]"] = validate
+
+    results = {}
+    for name, function in benchmarks.items():
+        results[name] = time_function(function, repeat, min_time)["min_us"]
+    return results
+
+
+
+def main(argv):
+    """
+    Run the scaling report, print it, and return the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dimension", choices=DIMENSIONS, default="envs")
+    parser.add_argument("--values", default="8,16,32,64,128", help="Comma-separated sizes.")
+    parser.add_argument("--repeat", type=int, default=3, help="Measurements per benchmark.")
+    parser.add_argument("--min-time", type=float, default=0.1, help="Seconds per measurement.")
+    parser.add_argument("--output", help="Write the report to this JSON file.")
+    parser.add_argument("--max-exponent", type=float, help="Fail if any exponent exceeds this.")
+    args = parser.parse_args(argv)
+    values = [int(_) for _ in args.values.split(",")]
+
+    report = {"dimension": args.dimension, "values": values, "catalog_lines": [], "benchmarks": {}}
+    with tempfile.TemporaryDirectory() as scratch_dir, open(os.devnull, "w") as devnull:
+        for value in values:
+            catalog_dir = Path(scratch_dir) / f"{args.dimension}-{value}"
+            catalog = generate_catalog(catalog_dir, **{args.dimension: value})
+            report["catalog_lines"].append(sum(
+                len(Path(catalog[kind]).read_text().splitlines())
+                for kind in bench_hot_paths.FILE_KINDS
+                ))
+            print(
+                f"Measuring {args.dimension}={value} ({report['catalog_lines'][-1]} lines)...",
+                file=sys.stderr,
+                )
+
+            with contextlib.redirect_stdout(devnull), mock.patch(
+                "socket.gethostname", return_value=catalog["hostnames"][-1]
+                ):
+                results = measure_catalog(catalog, catalog_dir, args.repeat, args.min_time)
+            for name, time_us in results.items():
+                report["benchmarks"].setdefault(name, {"min_us": []})["min_us"].append(time_us)
+
+    failures = []
+    print(f"{'benchmark':<60}" + "".join(f"{v:>12}" for v in values) + f"{'exponent':>10}")
+    for name, result in report["benchmarks"].items():
+        result["exponent"] = round(scaling_exponent(values, result["min_us"]), 2)
+        print(
+            f"{name:<60}" + "".join(f"{t:>10.0f}us" for t in result["min_us"])
+            + f"{result['exponent']:>10.2f}"
+            )
+        if args.max_exponent is not None and result["exponent"] > args.max_exponent:
+            failures.append(name)
+
+    if args.output is not None:
+        with open(args.output, "w") as F:
+            json.dump(report, F, indent=2)
+
+    for name in failures:
+        exponent = report["benchmarks"][name]["exponent"]
+        print(f"SUPER-LINEAR:  {name} scales as {args.dimension}^{exponent}")
+    return 1 if failures else 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1 :]))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Generate a consistent, synthetic set of ``supported-systems.ini``,
+``supported-envs.ini``, and ``environment-specs.ini`` files (plus a
+``load-env.ini`` pointing to them) of arbitrary size, for scale testing.
+
+For each system the catalog contains:
+
+    * ``hostnames`` hostname regexes in ``supported-systems.ini``.
+    * ``envs`` environments, each with ``aliases`` aliases, in
+      ``supported-envs.ini``.
+    * In ``environment-specs.ini``, one section per environment, plus
+      ``use_depth`` levels of shared sections.  Each environment section
+      ``use``\\ s ``use_fanout`` sections of the first level, each of which
+      ``use``\\ s ``use_fanout`` sections of the next level, and so on, so
+      closures overlap the way they do in real catalogs.
+
+Everything is derived from ``seed``, so the same parameters always produce
+the same files.
+
+Usage::
+
+    python3 loadenv/benchmarks/generate_catalog.py OUTPUT_DIR --systems 20 --envs 50
+"""
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+
+
+
+def generate_catalog(
+        output_dir, systems=4, envs=8, aliases=3, use_depth=3, use_fanout=2, hostnames=4,
+        options=4, seed=0
+    ):
+    """
+    Write a synthetic catalog to ``output_dir``.
+
+    Parameters:
+        output_dir (str, Path):  The directory to write the files to.
+        systems (int):  The number of systems.
+        envs (int):  The number of environments per system.
+        aliases (int):  The number of aliases per environment.
+        use_depth (int):  The number of levels of shared sections.
+        use_fanout (int):  The number of sections each section ``use``\\ s
+            from the next level.
+        hostnames (int):  The number of hostname regexes per system.
+        options (int):  The number of options in each section.
+        seed (int):  The seed for the random choices.
+
+    Returns:
+        dict:  The paths of the files written, and sample build names:
+        ``env_build_names`` use environment names, ``alias_build_names`` use
+        only aliases, and ``hostnames`` match each system.
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    sys_lines, envs_lines, specs_lines = [], [], []
+    catalog = {"env_build_names": [], "alias_build_names": [], "hostnames": []}
+    level_width = max(use_fanout * 2, 1)
+
+    for s in range(systems):
+        system_name = f"sys{s}"
+
+        sys_lines.append(f"[{system_name}]")
+        for h in range(hostnames):
+            sys_lines.append(f"{system_name}-node{h}[0-9]*")
+        sys_lines.append("")
+        catalog["hostnames"].append(f"{system_name}-node{hostnames - 1}42")
+
+        for level in range(use_depth, 0, -1):
+            for w in range(level_width):
+                specs_lines.append(f"[{system_name.upper()}_L{level}_{w}]")
+                specs_lines += section_options(rng, f"L{level}_{w}", options)
+                if level < use_depth:
+                    for used in rng.sample(range(level_width), min(use_fanout, level_width)):
+                        specs_lines.append(f"use {system_name.upper()}_L{level + 1}_{used}")
+                specs_lines.append("")
+
+        envs_lines.append(f"[{system_name}]")
+        for e in range(envs):
+            env_name = f"gnu-{e}.{s}.0-openmpi-{e % 7}.{s}.1-openmp"
+            envs_lines.append(f"{env_name}:")
+            for a in range(aliases):
+                envs_lines.append(f"    gnu-{e}-{a}")
+            catalog["env_build_names"].append(f"{system_name}_{env_name}_opt")
+            if aliases > 0:
+                catalog["alias_build_names"].append(f"{system_name}_gnu-{e}-{aliases - 1}_opt")
+
+            specs_lines.append(f"[{system_name}_{env_name}]")
+            specs_lines += section_options(rng, f"E{e}", options)
+            if use_depth > 0:
+                for used in rng.sample(range(level_width), min(use_fanout, level_width)):
+                    specs_lines.append(f"use {system_name.upper()}_L1_{used}")
+            specs_lines.append("")
+        envs_lines.append("")
+
+    files = {
+        "supported-systems": output_dir / "supported-systems.ini",
+        "supported-envs": output_dir / "supported-envs.ini",
+        "environment-specs": output_dir / "environment-specs.ini",
+        "load-env": output_dir / "load-env.ini",
+        }
+    files["supported-systems"].write_text("\n".join(sys_lines))
+    files["supported-envs"].write_text("\n".join(envs_lines))
+    files["environment-specs"].write_text("\n".join(specs_lines))
+    files["load-env"].write_text(
+        "[load-env]\n"
+        "supported-systems : supported-systems.ini\n"
+        "supported-envs    : supported-envs.ini\n"
+        "environment-specs : environment-specs.ini\n"
+        )
+
+    catalog.update({kind: str(filename) for kind, filename in files.items()})
+    return catalog
+
+
+
+def section_options(rng, tag, options):
+    """
+    Returns:
+        list:  ``options`` option lines for a section, mixing the operations
+        found in real catalogs.
+    """
+    lines = []
+    for o in range(options):
+        kind = rng.choice(["envvar-set", "envvar-prepend", "module-load"])
+        if kind == "envvar-set":
+            lines.append(f"envvar-set VAR_{tag}_{o} : value-{rng.randrange(1000)}")
+        elif kind == "envvar-prepend":
+            lines.append(f"envvar-prepend PATH {tag}_{o} : /opt/{tag}/{o}/bin")
+        else:
+            lines.append(f"module-load pkg-{tag}-{o} : {rng.randrange(10)}.{rng.randrange(10)}")
+    return lines
+
+
+
+def main(argv):
+    """
+    Generate a catalog from the command line, and print its description as
+    JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--systems", type=int, default=4)
+    parser.add_argument("--envs", type=int, default=8, help="Environments per system.")
+    parser.add_argument("--aliases", type=int, default=3, help="Aliases per environment.")
+    parser.add_argument("--use-depth", type=int, default=3)
+    parser.add_argument("--use-fanout", type=int, default=2)
+    parser.add_argument("--hostnames", type=int, default=4, help="Hostname regexes per system.")
+    parser.add_argument("--options", type=int, default=4, help="Options per section.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    catalog = generate_catalog(
+        args.output_dir,
+        systems=args.systems,
+        envs=args.envs,
+        aliases=args.aliases,
+        use_depth=args.use_depth,
+        use_fanout=args.use_fanout,
+        hostnames=args.hostnames,
+        options=args.options,
+        seed=args.seed,
+        )
+    print(json.dumps(catalog, indent=2))
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1 :]))
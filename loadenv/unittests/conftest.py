@@ -40,4 +40,7 @@ def use_tmpdir(monkeypatch, request, tmpdir):
         tmpdir.join("test_load_env.ini")
     )
 
+    # Keep the persistent LoadEnv caches out of the user's home directory.
+    monkeypatch.setenv("LOADENV_CACHE_DIR", str(tmpdir.join(".loadenv_cache")))
+
     monkeypatch.chdir(tmpdir)
@@ -1,5 +1,10 @@
+import io
+import json
+import os
 from pathlib import Path
 import pytest
+import re
+import shutil
 import sys
 from unittest.mock import patch, Mock
 
@@ -14,6 +19,9 @@ else:
 sys.path.append(str(root_dir))
 from load_env import LoadEnv
 import load_env
+from loadenv.__main__ import main as loadenv_main
+from loadenv.Catalog import CatalogSpecGraph
+from loadenv.ModuleStub import ModuleStub
 
 
 
@@ -261,6 +269,210 @@ def test_existing_load_matching_env_file_overwritten(mock_gethostname):
     assert initial_contents != load_matching_env_contents
 
 
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_load_matching_env_renders_are_cached(mock_set_environment, mock_gethostname):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.write_actions_to_file.side_effect = lambda f, *args, **kwargs: Path(f).write_text(
+        "module purge\n"
+        )
+    mock_set_environment.return_value = mock_se
+
+    def write():
+        le = LoadEnv(argv=["arm", "--output", "out.sh"], load_env_ini_file="test_load_env.ini")
+        le.write_load_matching_env()
+        return le
+
+    le = write()
+    assert mock_se.write_actions_to_file.call_count == 1
+    expected = "module purge\nexport LOADED_ENV_NAME=van1-tx2_arm-20.0-openmpi-4.0.2-openmp"
+    assert le.tmp_load_matching_env_file.read_text() == expected
+    assert Path("out.sh").read_text() == expected
+    assert os.stat("out.sh").st_nlink == 1
+
+    le = write()
+    assert mock_se.write_actions_to_file.call_count == 1
+    assert le.tmp_load_matching_env_file.read_text() == expected
+
+    # Sections outside the environment's use closure do not invalidate the render.
+    with open("test_environment_specs.ini", "a") as F:
+        F.write("\n[UNRELATED]\nenvvar-set FOO : bar\n")
+    write()
+    assert mock_se.write_actions_to_file.call_count == 1
+
+    contents = Path("test_environment_specs.ini").read_text().replace(
+        "[VAN1-TX2_OPENMP]\n", "[VAN1-TX2_OPENMP]\nenvvar-set FOO : bar\n"
+        )
+    Path("test_environment_specs.ini").write_text(contents)
+    write()
+    assert mock_se.write_actions_to_file.call_count == 2
+
+
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_load_matching_env_renders_are_not_trusted_blindly(mock_set_environment, mock_gethostname):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.write_actions_to_file.side_effect = lambda f, *args, **kwargs: Path(f).write_text(
+        "module purge\n"
+        )
+    mock_set_environment.return_value = mock_se
+
+    def write():
+        le = LoadEnv(argv=["arm", "--output", "out.sh"], load_env_ini_file="test_load_env.ini")
+        le.write_load_matching_env()
+        return le
+
+    le = write()
+    cached = next((le.config_cache.cache_dir / "renders").glob(f"*/{le.load_matching_env_key}"))
+    assert mock_se.write_actions_to_file.call_count == 1
+
+    # Entries others could have written are re-rendered.
+    cached.write_text("echo injected\n")
+    cached.chmod(0o666)
+    le = write()
+    assert mock_se.write_actions_to_file.call_count == 2
+    assert Path("out.sh").read_text().startswith("module purge\n")
+    assert not cached.stat().st_mode & 0o022
+
+    # So are scripts rendered by other versions of the dependencies.
+    with patch.object(LoadEnv, "renderer_fingerprint", [["setenvironment", "0.0.0", 0]]):
+        write()
+    assert mock_se.write_actions_to_file.call_count == 3
+
+    # If the cached script cannot be copied, it is rendered instead.
+    copyfile = shutil.copyfile
+
+    def copyfile_from_cache_fails(src, dst):
+        if Path(src) == cached:
+            raise PermissionError(src)
+        return copyfile(src, dst)
+
+    with patch("os.link", side_effect=OSError), \
+            patch("shutil.copyfile", side_effect=copyfile_from_cache_fails):
+        le = write()
+    assert mock_se.write_actions_to_file.call_count == 4
+    assert le.tmp_load_matching_env_file.read_text().startswith("module purge\n")
+    assert Path("out.sh").read_text().startswith("module purge\n")
+
+
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_optimize_renders_without_set_environment(mock_set_environment, mock_gethostname):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.write_actions_to_file.side_effect = lambda f, *args, **kwargs: Path(f).write_text(
+        "module purge\n"
+        )
+    mock_set_environment.return_value = mock_se
+
+    le = LoadEnv(
+        argv=["arm", "--optimize", "--output", "out.sh"], load_env_ini_file="test_load_env.ini"
+        )
+    le.write_load_matching_env()
+    assert mock_se.write_actions_to_file.call_count == 0
+    contents = Path("out.sh").read_text()
+    assert "module load python/3.6.8-arm arm/20.0 " in contents
+    assert contents.endswith("export LOADED_ENV_NAME=van1-tx2_arm-20.0-openmpi-4.0.2-openmp")
+
+    # Optimized and verbatim renders are cached separately.
+    le = LoadEnv(argv=["arm", "--output", "out.sh"], load_env_ini_file="test_load_env.ini")
+    le.write_load_matching_env()
+    assert mock_se.write_actions_to_file.call_count == 1
+    assert Path("out.sh").read_text().startswith("module purge\n")
+
+
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_snapshot_is_replayed_until_module_files_change(
+    mock_set_environment, mock_gethostname, monkeypatch
+    ):
+    mock_gethostname.return_value = "van1-tx2_host"
+    Path("modules/mpi").mkdir(parents=True)
+    Path("modules/mpi/1.0").write_text("#%Module")
+    monkeypatch.setenv("MODULEPATH", str(Path("modules").resolve()))
+    monkeypatch.setenv("PATH", "/usr/bin")
+    monkeypatch.delenv("LOADEDMODULES", raising=False)
+    monkeypatch.delenv("_LMFILES_", raising=False)
+
+    def apply(env_name):
+        os.environ["PATH"] = "/opt/mpi/bin:" + os.environ["PATH"]
+        os.environ["LOADEDMODULES"] = "mpi/1.0"
+        os.environ["_LMFILES_"] = str(Path("modules/mpi/1.0").resolve())
+        return 0
+
+    mock_se = Mock(unsafe=True)
+    mock_se.apply.side_effect = apply
+    mock_set_environment.return_value = mock_se
+
+    def load():
+        le = LoadEnv(argv=["arm", "--snapshot"], load_env_ini_file="test_load_env.ini")
+        load_env.validate_and_write(le)
+        os.environ["PATH"] = "/usr/bin"
+        os.environ.pop("LOADEDMODULES", None)
+        os.environ.pop("_LMFILES_", None)
+        return le.tmp_load_matching_env_file.read_text()
+
+    load()
+    assert mock_se.apply.call_count == 1
+
+    script = load()
+    assert mock_se.apply.call_count == 1
+    assert mock_se.write_actions_to_file.call_count == 1
+    assert 'export PATH=/opt/mpi/bin"${PATH:+:${PATH}}"' in script
+    assert "export LOADEDMODULES=mpi/1.0" in script
+    assert script.endswith("export LOADED_ENV_NAME=van1-tx2_arm-20.0-openmpi-4.0.2-openmp")
+
+    Path("modules/mpi/2.0").write_text("#%Module")
+    load()
+    assert mock_se.apply.call_count == 2
+
+
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_validation_is_cached_until_revalidate_or_changes(
+    mock_set_environment, mock_gethostname, capsys
+    ):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.apply.return_value = 0
+    mock_set_environment.return_value = mock_se
+
+    def load(*extra_args):
+        le = LoadEnv(argv=["arm"] + list(extra_args), load_env_ini_file="test_load_env.ini")
+        load_env.validate_and_write(le)
+        return capsys.readouterr().out
+
+    assert "validated.\n" in load()
+    assert "validated (cached).\n" in load()
+    assert mock_se.apply.call_count == 1
+
+    assert "validated.\n" in load("--revalidate")
+    assert mock_se.apply.call_count == 2
+
+    # Edits that do not change the expanded actions keep the validation.
+    original = Path("test_environment_specs.ini").read_text()
+    contents = original.replace(
+        "[VAN1-TX2_OPENMP]\n", "[VAN1-TX2_OPENMP]\nenvvar-set FOO : bar\nenvvar-remove FOO\n"
+        )
+    Path("test_environment_specs.ini").write_text(contents)
+    assert "validated (cached).\n" in load()
+    assert mock_se.apply.call_count == 2
+
+    contents = original.replace(
+        "[VAN1-TX2_OPENMP]\n", "[VAN1-TX2_OPENMP]\nenvvar-set FOO : bar\n"
+        )
+    Path("test_environment_specs.ini").write_text(contents)
+    load()
+    assert mock_se.apply.call_count == 3
+
+
 #  main()  #
 ############
 @patch("socket.gethostname")
@@ -302,6 +514,71 @@ def test_main_with_unsuccessful_apply(mock_set_environment, mock_gethostname):
         ])
 
 
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_batch_modules_applies_without_set_environment(
+    mock_set_environment, mock_gethostname, tmp_path
+    ):
+    mock_gethostname.return_value = "van1-tx2_host"
+    for name in ["mpicc", "mpicxx", "mpif90"]:
+        (tmp_path / name).write_text("#!/bin/sh\n")
+        (tmp_path / name).chmod(0o755)
+
+    le = LoadEnv(argv=["arm", "--batch-modules"], load_env_ini_file="test_load_env.ini")
+    le.module_command = ModuleStub()
+    with patch.dict(os.environ, {"PATH": str(tmp_path)}):
+        le.apply_env()
+        assert os.environ["MPICC"] == str(tmp_path / "mpicc")
+        assert os.environ["LOADEDMODULES"].endswith(":cmake/3.17.1")
+    assert mock_set_environment.call_count == 0
+    assert (
+        "load", "python/3.6.8-arm", "arm/20.0", "openmpi4/4.0.2", "armpl/20.0.0", "git/2.19.2"
+        ) in le.module_command.calls
+
+    le.module_command = ModuleStub(available=[])
+    with patch.dict(os.environ, {"PATH": str(tmp_path)}):
+        with pytest.raises(RuntimeError, match="Failed action:  module-load devpack-arm : "):
+            le.apply_env()
+
+
+
+@patch("socket.gethostname")
+def test_catalog_is_used_until_sources_change(mock_gethostname, capsys, monkeypatch):
+    mock_gethostname.return_value = "van1-tx2_host"
+    monkeypatch.setenv("LOADENV_CATALOG", "test.catalog")
+    assert loadenv_main([
+        "compile",
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", "test_environment_specs.ini",
+        ]) == 0
+    assert "test.catalog" in capsys.readouterr().out
+
+    le = LoadEnv(argv=["arm"], load_env_ini_file="test_load_env.ini")
+    assert le.catalog is not None
+    with patch("load_env.DetermineSystem") as mock_determine_system:
+        assert le.system_name == "van1-tx2"
+        assert mock_determine_system.call_count == 0
+    assert le.parsed_env_name == "van1-tx2_arm-20.0-openmpi-4.0.2-openmp"
+    assert isinstance(le.env_spec_graph, CatalogSpecGraph)
+    assert len(le.catalog._records) < sum(len(_) for _ in le.catalog.index.values())
+
+    # Inline comments are not part of the hostname regexes.
+    mock_gethostname.return_value = "ats1_host"
+    le = LoadEnv(argv=["intel-hsw"], load_env_ini_file="test_load_env.ini")
+    with patch("load_env.DetermineSystem") as mock_determine_system:
+        assert le.system_name == "ats1"
+        assert mock_determine_system.call_count == 0
+
+    mock_gethostname.return_value = "van1-tx2_host"
+    with open("test_supported_envs.ini", "a") as F:
+        F.write("\n# Edited.\n")
+    le = LoadEnv(argv=["arm"], load_env_ini_file="test_load_env.ini")
+    assert le.catalog is None
+    assert le.parsed_env_name == "van1-tx2_arm-20.0-openmpi-4.0.2-openmp"
+
+
+
 # Operation Validation
 # ====================
 @pytest.mark.parametrize("data", [
@@ -341,6 +618,7 @@ def test_invalid_operations_raises(data):
         F.write(bad_environment_specs)
 
     le = LoadEnv([
+        "--supported-systems", "test_supported_systems.ini",
         "--supported-envs", "test_supported_envs.ini",
         "--environment-specs", test_ini_filename,
         "--force",
@@ -351,5 +629,312 @@ def test_invalid_operations_raises(data):
     if data["should_raise"]:
         with pytest.raises(ValueError):
             le.load_set_environment()
+        with pytest.raises(ValueError):
+            le.lint_environment_specs()
     else:
         le.load_set_environment()
+        le.lint_environment_specs()
+
+
+def test_invalid_operations_in_unreachable_sections_only_fail_lint(capsys):
+    valid_section_name = "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    environment_specs = ("[ATS1]\n"
+                         "module-load cmake: 3.18.0\n\n"
+                         "[UNUSED]\n"
+                         "invalid-operation params for op: here\n\n"
+                         f"[{valid_section_name}]\n"
+                         "use ATS1\n")
+    test_ini_filename = "test_generated_environment_specs_unreachable.ini"
+    with open(test_ini_filename, "w") as F:
+        F.write(environment_specs)
+
+    argv = [
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", test_ini_filename,
+        "--force",
+        "ats1_intel"
+    ]
+    le = LoadEnv(argv)
+    assert le.env_spec_graph.use_closure(le.parsed_env_name) == [valid_section_name, "ATS1"]
+    le.load_set_environment()
+
+    with pytest.raises(ValueError):
+        load_env.main(argv + ["--lint"])
+
+
+#######################
+#  System Resolution  #
+#######################
+@patch("socket.gethostname")
+def test_system_is_determined_once_per_build_name(mock_gethostname):
+    mock_gethostname.return_value = "ats1_host"
+    le = LoadEnv(argv=["intel-hsw_opt"], load_env_ini_file="test_load_env.ini")
+    with patch("load_env.DetermineSystem", wraps=load_env.DetermineSystem) as mock_ds:
+        assert le.parsed_env_name == "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+        assert le.env_stripped_build_name == "opt"
+        assert le.system_name == "ats1"
+        assert mock_ds.call_count == 1
+
+
+@patch("socket.gethostname")
+def test_system_memo_skips_system_detection(mock_gethostname, monkeypatch):
+    monkeypatch.setenv("LOADENV_SYSTEM_MEMO", "1")
+    mock_gethostname.return_value = "ats1_host"
+    le = LoadEnv(argv=["intel-hsw"], load_env_ini_file="test_load_env.ini")
+    assert le.system_name == "ats1"
+
+    with patch("load_env.DetermineSystem") as mock_ds:
+        le = LoadEnv(argv=["intel-knl"], load_env_ini_file="test_load_env.ini")
+        assert le.system_name == "ats1"
+        assert mock_ds.call_count == 0
+
+        # A different host does not use the memo.
+        mock_gethostname.return_value = "van1-tx2_host"
+        mock_ds.return_value.system_name = "van1-tx2"
+        le = LoadEnv(argv=["arm"], load_env_ini_file="test_load_env.ini")
+        assert le.system_name == "van1-tx2"
+        assert mock_ds.call_count == 1
+
+
+@patch("socket.gethostname")
+def test_system_memo_not_used_when_build_name_names_another_system(mock_gethostname, monkeypatch):
+    monkeypatch.setenv("LOADENV_SYSTEM_MEMO", "1")
+    mock_gethostname.return_value = "ats1_host"
+    le = LoadEnv(argv=["intel-hsw"], load_env_ini_file="test_load_env.ini")
+    assert le.system_name == "ats1"
+
+    with patch("load_env.DetermineSystem") as mock_ds:
+        mock_ds.return_value.system_name = "van1-tx2"
+        le = LoadEnv(argv=["--force", "van1-tx2_arm"], load_env_ini_file="test_load_env.ini")
+        assert le.system_name == "van1-tx2"
+        le = LoadEnv(argv=["van1-tx2_arm"], load_env_ini_file="test_load_env.ini")
+        assert le.system_name == "van1-tx2"
+        assert mock_ds.call_count == 2
+
+
+######################
+#  Batch Resolution  #
+######################
+@pytest.mark.parametrize("from_stdin", [False, True])
+@patch("socket.gethostname")
+def test_batch_resolves_many_build_names(mock_gethostname, from_stdin, capsys, monkeypatch):
+    mock_gethostname.return_value = "ats1_host"
+    build_names = "intel-hsw_opt\n\n# comment\nbad-kw-str\nintel-knl_dbg\nvan1-tx2_arm\n"
+    if from_stdin:
+        monkeypatch.setattr("sys.stdin", io.StringIO(build_names))
+        batch = "-"
+    else:
+        batch = "build_names.txt"
+        with open(batch, "w") as F:
+            F.write(build_names)
+
+    with patch("load_env.EnvKeywordParser", wraps=load_env.EnvKeywordParser) as mock_ekp:
+        rval = load_env.main([
+            "--supported-systems", "test_supported_systems.ini",
+            "--supported-envs", "test_supported_envs.ini",
+            "--environment-specs", "test_environment_specs.ini",
+            "--batch", batch
+            ])
+        assert mock_ekp.call_count == 1
+    assert rval == 1
+
+    stdout, stderr = capsys.readouterr()
+    records = [json.loads(_) for _ in stdout.splitlines()]
+    assert [_["build_name"] for _ in records] == [
+        "intel-hsw_opt", "bad-kw-str", "intel-knl_dbg", "van1-tx2_arm"
+        ]
+
+    assert records[0]["system_name"] == "ats1"
+    assert records[0]["parsed_env_name"] == "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    assert records[0]["env_stripped_build_name"] == "opt"
+    assert records[0]["error"] is None
+
+    assert records[1]["system_name"] == "ats1"
+    assert records[1]["parsed_env_name"] is None
+    assert "Unable to find alias or environment name" in records[1]["error"]
+
+    assert records[2]["parsed_env_name"] == "ats1_intel-19.0.4-mpich-7.7.15-knl-openmp"
+    assert records[2]["env_stripped_build_name"] == "dbg"
+
+    # Without --force, naming another system is an error from DetermineSystem.
+    assert records[3]["error"] is not None
+    # Batches are silent, so the matches are not reported.
+    assert "Matched" not in stdout + stderr
+
+
+
+@pytest.mark.parametrize("use_env_var", [False, True])
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_timings_record_each_phase(
+    mock_set_environment, mock_gethostname, use_env_var, monkeypatch
+    ):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.apply.return_value = 0
+    mock_set_environment.return_value = mock_se
+
+    argv = [
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", "test_environment_specs.ini",
+        "arm",
+        ]
+    if use_env_var:
+        monkeypatch.setenv("LOADENV_TIMINGS", "timings.json")
+    else:
+        argv += ["--timings", "timings.json"]
+
+    records = []
+    for _ in range(2):
+        load_env.main(argv)
+        with open("timings.json", "r") as F:
+            records.append(json.load(F))
+
+    phases = {_["name"]: _ for _ in records[0]["phases"]}
+    for name in [
+        "parse test_supported_systems.ini", "parse test_supported_envs.ini", "determine system",
+        "match keywords", "validate sections", "apply environment", "write script"
+        ]:
+        assert phases[name]["wall_s"] >= 0
+        assert phases[name]["cpu_s"] >= 0
+    assert phases["parse test_supported_envs.ini"]["sections"] > 0
+    assert phases["parse test_supported_envs.ini"]["cache_misses"] == 1
+    assert phases["match keywords"]["env_name"] == "van1-tx2_arm-20.0-openmpi-4.0.2-openmp"
+    assert phases["validate"]["result"] == "applied"
+    assert records[0]["argv"] == argv
+
+    # The second run is served from the caches.
+    phases = {_["name"]: _ for _ in records[1]["phases"]}
+    assert phases["parse test_supported_envs.ini"]["cache_hits"] == 1
+    assert phases["validate"]["result"] == "cached"
+    assert "apply environment" not in phases
+
+
+
+def test_timings_disabled_by_default():
+    le = LoadEnv(["arm"], load_env_ini_file="test_load_env.ini")
+    assert not le.timer.enabled
+    assert le.timer.phases == []
+
+
+
+@pytest.mark.parametrize("system", ["test-sys-1", ""])
+@patch("socket.gethostname")
+def test_validate_all_reports_each_environment(mock_gethostname, system, capsys, monkeypatch):
+    mock_gethostname.return_value = "test-sys-1_host"
+    # Stand in for applying each environment:  serial environments fail, and
+    # cuda-10 hangs until it is killed.
+    script = (
+        "import sys, time\n"
+        "if 'serial' in sys.argv[1]: sys.exit('Unable to load gnu-serial')\n"
+        "if 'cuda-10' in sys.argv[1]: time.sleep(60)\n"
+        )
+    monkeypatch.setattr(
+        LoadEnv,
+        "validate_all_command",
+        lambda self, system_name, env_name: [
+            sys.executable, "-c", script, f"{system_name}_{env_name}"
+            ],
+        )
+
+    argv = [
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", "test_environment_specs.ini",
+        "--jobs", "4",
+        "--timeout", "2",
+        "--validate-all",
+        ]
+    if system != "":
+        argv.append(system)
+    assert load_env.main(argv) == 1
+
+    stdout = capsys.readouterr()[0]
+    statuses = dict(
+        (env_name, status)
+        for status, env_name in re.findall(r"^(PASS|FAIL|TIMEOUT) +[0-9.]+s  (\S+)$", stdout, re.M)
+        )
+    assert statuses == {
+        "test-sys-1_cuda-9.2-gnu-7.2.0-openmpi-2.1.2": "PASS",
+        "test-sys-1_cuda-10.1-gnu-7.2.0-openmpi-4.0.1": "TIMEOUT",
+        "test-sys-1_gnu-7.2.0-openmpi-2.1.2-openmp": "PASS",
+        "test-sys-1_gnu-7.2.0-openmpi-2.1.2-serial": "FAIL",
+        }
+    assert "    Unable to load gnu-serial" in stdout
+    assert "2 passed, 1 failed, 1 timed out of 4 environments." in stdout
+
+
+
+@patch("socket.gethostname")
+def test_validate_all_only_reruns_changed_environments(mock_gethostname, capsys, monkeypatch):
+    mock_gethostname.return_value = "test-sys-1_host"
+    commands = []
+
+    def validate_all_command(self, system_name, env_name):
+        commands.append(env_name)
+        return [sys.executable, "-c", "import sys; sys.exit('serial' in sys.argv[1])", env_name]
+
+    monkeypatch.setattr(LoadEnv, "validate_all_command", validate_all_command)
+    argv = [
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", "test_environment_specs.ini",
+        "--validate-all", "test-sys-1",
+        ]
+
+    # Passes are recorded by the child process applying the environment.
+    le = LoadEnv(argv)
+    le.save_validation(os.environ, os.environ, "test-sys-1_cuda-9.2-gnu-7.2.0-openmpi-2.1.2")
+    assert load_env.main(argv) == 1
+    assert "cuda-9.2-gnu-7.2.0-openmpi-2.1.2" not in commands
+    assert len(commands) == 3
+
+    # Failures are not recorded, as they may be transient, so they are applied
+    # again.
+    commands.clear()
+    capsys.readouterr()
+    assert load_env.main(argv) == 1
+    assert commands == [
+        "cuda-10.1-gnu-7.2.0-openmpi-4.0.1",
+        "gnu-7.2.0-openmpi-2.1.2-openmp",
+        "gnu-7.2.0-openmpi-2.1.2-serial",
+        ]
+    assert re.search(r"^FAIL .*-serial$", capsys.readouterr().out, re.M)
+
+    assert load_env.main(argv + ["--revalidate"]) == 1
+    assert len(commands) == 7
+
+
+
+def test_validate_all_rejects_unknown_systems():
+    le = LoadEnv([
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", "test_environment_specs.ini",
+        ])
+    with pytest.raises(ValueError, match="Unknown system 'not-a-system'"):
+        le.validate_all("not-a-system")
+
+
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_apply_only_does_not_write_a_script(mock_set_environment, mock_gethostname):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.apply.return_value = 0
+    mock_set_environment.return_value = mock_se
+
+    with patch("load_env.LoadEnv.write_load_matching_env") as mock_write:
+        load_env.main([
+            "--supported-systems", "test_supported_systems.ini",
+            "--supported-envs", "test_supported_envs.ini",
+            "--environment-specs", "test_environment_specs.ini",
+            "--apply-only",
+            "--force",
+            "van1-tx2_arm-20.0-openmpi-4.0.2-serial",
+            ])
+    mock_se.apply.assert_called_once_with("van1-tx2_arm-20.0-openmpi-4.0.2-serial")
+    mock_write.assert_not_called()
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+import pytest
+import socket
+import sys
+from unittest.mock import patch, Mock
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv import LoadEnvClient
+from loadenv.LoadEnvServer import LoadEnvServer
+import load_env
+
+
+
+ARGV = [
+    "--supported-systems", "test_supported_systems.ini",
+    "--supported-envs", "test_supported_envs.ini",
+    "--environment-specs", "test_environment_specs.ini",
+    ]
+
+
+
+async def send(socket_path, message):
+    reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    response = json.loads((await reader.readline()).decode())
+    writer.close()
+    return response
+
+
+
+def run_with_server(scenario):
+    """
+    Start a :class:`LoadEnvServer` on a socket in the current directory, run
+    ``scenario(server)``, and shut the server down.
+    """
+    server = LoadEnvServer(socket_path=Path("loadenv.sock").resolve())
+
+    async def main():
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            server.stop()
+            await server.server.wait_closed()
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+
+############
+#  Server  #
+############
+@patch("socket.gethostname")
+def test_server_resolves_build_names_with_warm_state(mock_gethostname):
+    mock_gethostname.return_value = "ats1_host"
+
+    async def scenario(server):
+        first = await send(server.socket_path, {"op": "resolve", "argv": ARGV + ["intel-hsw_opt"]})
+        with patch("load_env.EnvKeywordParser") as mock_ekp:
+            second = await send(server.socket_path, {"op": "resolve", "argv": ARGV + ["intel_dbg"]})
+            assert mock_ekp.call_count == 0
+        bad = await send(server.socket_path, {"op": "resolve", "argv": ARGV + ["bad-kw-str"]})
+        return first, second, bad, len(server.loadenvs)
+
+    first, second, bad, num_loadenvs = run_with_server(scenario)
+    assert first["status"] == 0
+    assert first["parsed_env_name"] == "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    assert first["env_stripped_build_name"] == "opt"
+    assert "Matched alias 'intel-hsw'" in first["output"]
+    assert second["parsed_env_name"] == "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    assert bad["status"] == 1
+    assert "Unable to find alias or environment name" in bad["error"]
+    assert num_loadenvs == 1
+
+
+
+@patch("socket.gethostname")
+def test_server_reloads_changed_config_files(mock_gethostname):
+    mock_gethostname.return_value = "ats1_host"
+
+    async def scenario(server):
+        argv = ARGV + ["new-alias"]
+        before = await send(server.socket_path, {"op": "resolve", "argv": argv})
+        le_before = server.template
+
+        contents = Path("test_supported_envs.ini").read_text().replace(
+            "    default-env-knl\n", "    default-env-knl\n    new-alias\n"
+            )
+        Path("test_supported_envs.ini").write_text(contents)
+        stat = os.stat("test_supported_envs.ini")
+        os.utime("test_supported_envs.ini", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        after = await send(server.socket_path, {"op": "resolve", "argv": argv})
+        return before, after, le_before is server.template
+
+    before, after, same_loadenv = run_with_server(scenario)
+    assert before["status"] == 1
+    assert after["parsed_env_name"] == "ats1_intel-19.0.4-mpich-7.7.15-knl-openmp"
+    assert not same_loadenv
+
+
+
+@patch("socket.gethostname")
+def test_server_resolves_with_the_client_environment(mock_gethostname):
+    mock_gethostname.return_value = "ats1_host"
+
+    async def scenario(server):
+        message = {"op": "resolve", "argv": ARGV + ["intel-hsw"]}
+        default = await send(server.socket_path, message)
+        no_cache = await send(
+            server.socket_path, dict(message, env=dict(os.environ, LOADENV_NO_CACHE="1"))
+            )
+        return default, no_cache, [le.config_cache.enabled for le, _ in server.loadenvs.values()]
+
+    default, no_cache, cache_enabled = run_with_server(scenario)
+    assert default["status"] == no_cache["status"] == 0
+    assert sorted(cache_enabled) == [False, True]
+    assert "LOADENV_NO_CACHE" not in os.environ
+
+
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_server_renders_in_forked_child(mock_set_environment, mock_gethostname):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.apply.return_value = 0
+    mock_set_environment.return_value = mock_se
+
+    async def scenario(server):
+        message = {
+            "op": "render",
+            "argv": LoadEnvClient.absolutize_paths(
+                ARGV + ["arm", "--load-matching-env-location", "loc.txt"], os.getcwd()
+                ),
+            "cwd": os.getcwd(),
+            "env": dict(os.environ, LOADENV_TEST_VAR="1"),
+            }
+        return await send(server.socket_path, message)
+
+    response = run_with_server(scenario)
+    assert response["status"] == 0, response
+    assert "Environment 'van1-tx2_arm-20.0-openmpi-4.0.2-openmp' validated." in response["output"]
+    assert Path("loc.txt").read_text() == response["load_matching_env"]
+    assert Path(response["load_matching_env"]).exists()
+    assert "LOADENV_TEST_VAR" not in os.environ
+
+
+
+def test_ping_and_unknown_operations():
+    async def scenario(server):
+        return (
+            await send(server.socket_path, {"op": "ping"}),
+            await send(server.socket_path, {"op": "bogus"}),
+            )
+
+    ping, bogus = run_with_server(scenario)
+    assert ping["pid"] == os.getpid()
+    assert bogus["status"] == 1 and "Unknown operation 'bogus'" in bogus["error"]
+
+
+
+def test_second_server_refuses_to_start():
+    async def scenario(server):
+        with pytest.raises(RuntimeError, match="already listening"):
+            await LoadEnvServer(socket_path=server.socket_path).start()
+
+    run_with_server(scenario)
+
+
+
+@pytest.mark.parametrize("mode", [0o755, 0o770])
+def test_server_refuses_directories_others_can_use(mode):
+    Path("shared").mkdir(mode=mode)
+    os.chmod("shared", mode)
+    server = LoadEnvServer(socket_path=Path("shared/loadenv.sock").resolve())
+    loop = asyncio.new_event_loop()
+    try:
+        with pytest.raises(RuntimeError, match="mode 0700"):
+            loop.run_until_complete(server.start())
+    finally:
+        loop.close()
+    assert not Path("shared/loadenv.sock").exists()
+
+
+
+############
+#  Client  #
+############
+def test_client_talks_to_a_server_it_trusts():
+    async def scenario(server):
+        return await asyncio.get_event_loop().run_in_executor(
+            None, LoadEnvClient.request, {"op": "ping"}, server.socket_path
+            )
+
+    assert run_with_server(scenario)["pid"] == os.getpid()
+
+
+
+@pytest.mark.parametrize("mode", [0o720, 0o702])
+def test_client_falls_back_on_sockets_others_can_plant(mode, monkeypatch):
+    async def scenario(server):
+        os.chmod(server.socket_path.parent, mode)
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                None, LoadEnvClient.main, ["arm"]
+                )
+        finally:
+            os.chmod(server.socket_path.parent, 0o700)
+
+    monkeypatch.setenv("LOADENV_SOCKET", str(Path("loadenv.sock").resolve()))
+    monkeypatch.setattr(LoadEnvClient, "check_peer", Mock(side_effect=AssertionError))
+    assert run_with_server(scenario) == LoadEnvClient.EXIT_FALLBACK
+
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_PEERCRED"), reason="SO_PEERCRED is Linux-only.")
+def test_client_checks_the_owner_of_the_socket_and_server(monkeypatch):
+    Path("plain_file").touch()
+    with pytest.raises(PermissionError, match="not a socket"):
+        LoadEnvClient.check_socket(Path("plain_file").resolve())
+
+    left, right = socket.socketpair(socket.AF_UNIX)
+    with left, right:
+        LoadEnvClient.check_peer(left)
+        monkeypatch.setattr(os, "getuid", lambda: os.geteuid() + 1)
+        with pytest.raises(PermissionError, match="another user"):
+            LoadEnvClient.check_peer(left)
+        with pytest.raises(PermissionError, match="not private"):
+            LoadEnvClient.check_socket(Path("plain_file").resolve())
+
+
+
+def test_client_falls_back_without_server(monkeypatch):
+    monkeypatch.setenv("LOADENV_SOCKET", str(Path("no_server.sock").resolve()))
+    assert LoadEnvClient.main(["arm"]) == LoadEnvClient.EXIT_FALLBACK
+    assert LoadEnvClient.main(["--list-envs"]) == LoadEnvClient.EXIT_FALLBACK
+    assert LoadEnvClient.main([]) == LoadEnvClient.EXIT_FALLBACK
+
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--validate-all"],
+        ["--validate-all", "ats1", "-j", "4"],
+        ["--apply-only", "arm"],
+        ["--compile-catalog", "load-env.catalog"],
+        ["--list-envs", "--format", "json"],
+        ["--help"],
+        ["--lint", "arm"],
+        ["--batch=builds.txt"],
+        ["--list", "arm"],
+        ["--", "arm"],
+        ],
+    )
+def test_client_only_sends_plain_loads_to_the_server(argv, monkeypatch):
+    monkeypatch.setattr(LoadEnvClient, "request", Mock(side_effect=AssertionError))
+    assert not LoadEnvClient.is_plain_load(argv)
+    assert LoadEnvClient.main(argv) == LoadEnvClient.EXIT_FALLBACK
+
+    for argv in [
+        ["arm"],
+        ARGV + ["-f", "--optimize", "--timings", "-o", "--weird.sh", "van1-tx2_arm"],
+        ["--load-matching-env-fd=3", "--output=out.sh", "--snapshot", "arm"],
+        ]:
+        assert LoadEnvClient.is_plain_load(argv)
+
+
+
+def test_client_makes_path_options_absolute():
+    argv = ["-o", "out.sh", "--supported-envs=envs.ini", "build_name_out.sh"]
+    assert LoadEnvClient.absolutize_paths(argv, "/work") == [
+        "-o", "/work/out.sh", "--supported-envs=/work/envs.ini", "build_name_out.sh"
+        ]
+
+
+
+def test_client_default_socket_path(monkeypatch):
+    monkeypatch.delenv("LOADENV_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1234")
+    assert LoadEnvClient.default_socket_path() == Path("/run/user/1234/loadenv.sock")
+
+
+
+def test_client_pops_the_load_matching_env_fd():
+    argv = ["--load-matching-env-fd", "3", "arm", "--load-matching-env-fd=4", "-o", "out.sh"]
+    assert LoadEnvClient.pop_option(argv, "--load-matching-env-fd") == (
+        "4", ["arm", "-o", "out.sh"]
+        )
+    assert LoadEnvClient.pop_option(["arm"], "--load-matching-env-fd") == (None, ["arm"])
@@ -0,0 +1,190 @@
+from pathlib import Path
+import pytest
+import shutil
+import subprocess
+import sys
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+import load_env
+from loadenv.ActionOptimizer import ActionOptimizer
+from loadenv.ConfigCache import ConfigData
+from loadenv.EnvSpecGraph import EnvSpecGraph
+
+
+
+# A stand-in for ``module`` that logs each module it is given separately, so
+# ``module load a b`` and ``module load a; module load b`` are equivalent, and
+# that has side effects on the environment like real modules do.  Like a real
+# purge, a purge forgets what was done before it.
+MODULE_STUB = """
+module() {
+    local command=$1
+    shift
+    if [ "${command}" == "purge" ]; then
+        export MODULE_LOG="purge"
+        return
+    fi
+    local name
+    for name in "$@"; do
+        export MODULE_LOG="${MODULE_LOG:+${MODULE_LOG};}${command} ${name}"
+        if [ "${command}" == "load" ]; then
+            export PATH="/opt/${name}/bin:${PATH}"
+            export LOADED_MODULE="${name}"
+        fi
+    done
+}
+"""
+
+ACTIONS = [
+    ("envvar-set", "CC", "gcc"),
+    ("envvar-set", "CC", "mpicc"),
+    ("envvar-set", "DEAD", "1"),
+    ("envvar-unset", "DEAD", None),
+    ("envvar-set", "READ", "a"),
+    ("envvar-set", "READER", "${READ}/b"),
+    ("envvar-set", "READ", "c"),
+    ("envvar-set", "FLAGS", "-O2"),
+    ("envvar-set", "FLAGS", "-g ${FLAGS|ENV}"),
+    ("envvar-prepend", "PATH", "/first"),
+    ("envvar-prepend", "PATH", "/second"),
+    ("envvar-append", "LIST", "x y"),
+    ("envvar-append", "LIST", "'z'"),
+    ("envvar-append", "LIST", "${LIST}"),
+    ("envvar-prepend", "EMPTY", ""),
+    ("envvar-prepend", "EMPTY", "e"),
+    ("envvar-set", "BEFORE_MODULE", "kept"),
+    ("module-purge", None, None),
+    ("module-purge", None, None),
+    ("module-load", "gcc", "10.2.0"),
+    ("module-load", "openmpi", "4.0.5"),
+    ("module-load", "cmake", None),
+    ("envvar-set", "BEFORE_MODULE", "${LOADED_MODULE}"),
+    ("envvar-set", "BEFORE_MODULE", "overwritten"),
+    ("envvar-find-in-path", "BASH", "bash"),
+    ("module-unload", "cmake", None),
+    ("module-swap", "gcc", "clang"),
+    ("module-use", None, "/opt/modulefiles"),
+    ("module-unuse", None, "/opt/modulefiles"),
+    ("module-load", "ninja", "1.10"),
+    ]
+
+
+
+def final_environment(script, tmp_path):
+    """
+    Source ``script`` in a clean bash shell with the ``module`` stub, and
+    return the resulting environment.
+    """
+    path = tmp_path / "script.sh"
+    path.write_text(MODULE_STUB + script)
+    output = subprocess.run(
+        ["bash", "--norc", "--noprofile", "-c", f"source {path} && env -0"],
+        env={"PATH": "/usr/bin:/bin", "LIST": "w"},
+        stdout=subprocess.PIPE,
+        check=True,
+        ).stdout.decode()
+    return dict(_.split("=", 1) for _ in output.split("\0") if "=" in _ and not _.startswith("_="))
+
+
+
+def set_environment(actions, tmp_path):
+    """
+    Write ``actions`` to an ``environment-specs.ini`` as the ``ENV`` section.
+    Each run of actions with distinct option names goes in a section of its
+    own, ``use``\\ d in order, so no option name needs a unique suffix.
+
+    Returns:
+        tuple:  The ``SetEnvironment`` for the file, and the expanded actions
+        of ``ENV``, parsed from the file as ``load_env.py`` does.
+    """
+    parts = [[]]
+    for op, param, value in actions:
+        option = op if param is None else f"{op} {param}"
+        if any(_[0] == option for _ in parts[-1]):
+            parts.append([])
+        parts[-1].append((option, value))
+
+    lines = []
+    for i, part in enumerate(parts):
+        lines.append(f"[PART_{i}]")
+        lines += [option if value is None else f"{option} : {value}" for option, value in part]
+    lines.append("[ENV]")
+    lines += [f"use PART_{i}" for i in range(len(parts))]
+    filename = tmp_path / "environment-specs.ini"
+    filename.write_text("\n".join(lines) + "\n")
+
+    se = load_env.SetEnvironment(filename=filename)
+    raw = ConfigData.from_configparser(se.configparser_object)
+    return se, EnvSpecGraph(raw).expanded_actions("ENV")
+
+
+
+##################
+#  Optimization  #
+##################
+def test_optimize_drops_dead_actions_and_merges_runs():
+    optimized = ActionOptimizer(ACTIONS).optimize()
+    assert ("envvar-set", "CC", "gcc") not in optimized
+    assert ("envvar-set", "DEAD", "1") not in optimized
+    assert ("envvar-unset", "DEAD", "") in optimized
+    assert ("envvar-set", "READ", "a") in optimized
+    assert ("envvar-set", "FLAGS", "-O2") in optimized
+    assert ("envvar-prepend", "PATH", "/second:/first") in optimized
+    assert ("envvar-append", "LIST", "x y:'z'") in optimized
+    assert ("envvar-append", "LIST", "${LIST}") in optimized
+    assert ("envvar-set", "BEFORE_MODULE", "kept") in optimized
+    assert ("envvar-set", "BEFORE_MODULE", "${LOADED_MODULE}") not in optimized
+    assert [_[0] for _ in optimized].count("module-purge") == 1
+    assert len(optimized) < len(ACTIONS)
+
+
+def test_unsupported_operations_are_reported():
+    assert ActionOptimizer(ACTIONS).supported
+    assert not ActionOptimizer(ACTIONS + [("envvar-remove", "CC", None)]).supported
+
+
+
+###############
+#  Rendering  #
+###############
+def test_module_loads_are_coalesced():
+    script = ActionOptimizer(ACTIONS).to_bash(optimize=True)
+    assert "module load gcc/10.2.0 openmpi/4.0.5 cmake\n" in script
+    assert script.count("module purge") == 1
+    assert "module load gcc/10.2.0\n" in ActionOptimizer(ACTIONS).to_bash()
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="bash is required")
+@pytest.mark.parametrize(
+    "actions",
+    [ACTIONS, ACTIONS[: 16], ACTIONS[16 :], list(reversed(ACTIONS))],
+    ids=["all", "envvars", "modules", "reversed"],
+    )
+def test_optimized_script_gives_identical_environment(actions, tmp_path):
+    se, actions = set_environment(actions, tmp_path)
+    rendered = tmp_path / "set_environment.sh"
+    se.write_actions_to_file(rendered, "ENV", include_header=True, interpreter="bash")
+    expected = final_environment(rendered.read_text(), tmp_path)
+
+    optimizer = ActionOptimizer(actions)
+    assert final_environment(optimizer.to_bash(), tmp_path) == expected
+    assert final_environment(optimizer.to_bash(optimize=True), tmp_path) == expected
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="bash is required")
+@pytest.mark.parametrize("op", ["envvar-prepend", "envvar-append"])
+def test_references_that_may_be_empty_are_not_merged(op, tmp_path):
+    actions = [(op, "LIBS", "${UNSET_VAR}"), (op, "LIBS", "/lib")]
+    optimizer = ActionOptimizer(actions)
+    assert optimizer.optimize() == actions
+    environment = final_environment(optimizer.to_bash(optimize=True), tmp_path)
+    assert environment == final_environment(optimizer.to_bash(), tmp_path)
+    assert environment["LIBS"] == "/lib"
@@ -0,0 +1,132 @@
+import fcntl
+import os
+from pathlib import Path
+import pytest
+import sys
+import time
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.ArtifactStore import ArtifactStore
+
+
+
+def make_file(store, name, age, size=10):
+    path = store.directory / name
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+
+#################
+#  Publication  #
+#################
+def test_files_are_published_atomically(tmp_path):
+    store = ArtifactStore(tmp_path / "runtime")
+    path = store.new_path()
+    assert path.parent == (tmp_path / "runtime").resolve()
+    assert path.name.startswith("load_matching_env_") and path.name.endswith(".sh")
+    assert path != store.new_path()
+
+    def write(tmp_name):
+        assert tmp_name.parent == path.parent and tmp_name != path
+        assert not path.exists()
+        tmp_name.write_text("export FOO=bar\n")
+
+    store.publish(path, write)
+    assert path.read_text() == "export FOO=bar\n"
+    assert os.listdir(path.parent) == [path.name]
+    assert (path.parent.stat().st_mode & 0o777) == 0o700
+
+
+def test_failed_publication_leaves_nothing_behind(tmp_path):
+    store = ArtifactStore(tmp_path / "runtime")
+    store.directory.mkdir()
+    path = make_file(store, "load_matching_env_0.sh", age=0)
+
+    def write(tmp_name):
+        tmp_name.write_text("partial")
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        store.publish(path, write)
+    assert path.read_bytes() == b"x" * 10
+    assert os.listdir(store.directory) == [path.name]
+
+
+def test_publication_marks_files_as_used(tmp_path):
+    store = ArtifactStore(tmp_path)
+    source = make_file(store, "cached.sh", age=3600)
+    path = store.new_path()
+    store.publish(path, lambda tmp_name: os.link(source, tmp_name))
+    assert time.time() - path.stat().st_mtime < 60
+
+
+
+##############
+#  Eviction  #
+##############
+def test_files_past_the_max_age_are_evicted(tmp_path):
+    store = ArtifactStore(tmp_path, max_age=3600, max_bytes=2**20, min_age=60)
+    old = make_file(store, "load_matching_env_old.sh", age=7200)
+    new = make_file(store, "load_matching_env_new.sh", age=1800)
+    other = make_file(store, "loadenv.sock.log", age=7200)
+    tmp = make_file(store, ".load_matching_env_new.sh.1234abcd.tmp", age=120)
+
+    assert sorted(store.evict()) == sorted([str(old), str(tmp)])
+    assert new.exists() and other.exists()
+
+
+def test_least_recently_used_files_are_evicted_past_the_max_bytes(tmp_path):
+    store = ArtifactStore(tmp_path, max_age=3600, max_bytes=25, min_age=60)
+    files = [
+        make_file(store, f"load_matching_env_{age}.sh", age=age) for age in [300, 200, 100, 10]
+        ]
+    assert store.evict() == [str(files[0]), str(files[1])]
+    assert [_.exists() for _ in files] == [False, False, True, True]
+
+
+def test_recently_used_files_are_never_evicted(tmp_path):
+    store = ArtifactStore(tmp_path, max_age=0, max_bytes=0, min_age=60)
+    files = [make_file(store, f"load_matching_env_{age}.sh", age=age) for age in [120, 30, 0]]
+    assert store.evict() == [str(files[0])]
+    assert files[1].exists() and files[2].exists()
+
+
+def test_eviction_is_throttled(tmp_path):
+    store = ArtifactStore(tmp_path, max_age=3600, min_age=0, evict_interval=60)
+    assert store.evict() == []
+    old = make_file(store, "load_matching_env_old.sh", age=7200)
+    assert store.evict() == []
+    assert store.evict(force=True) == [str(old)]
+
+
+def test_eviction_is_skipped_while_another_process_evicts(tmp_path):
+    store = ArtifactStore(tmp_path, max_age=3600, min_age=0)
+    old = make_file(store, "load_matching_env_old.sh", age=7200)
+    with open(tmp_path / ArtifactStore.LOCK_FILE, "w") as F:
+        fcntl.flock(F, fcntl.LOCK_EX)
+        assert store.evict(force=True) == []
+    assert old.exists()
+    assert store.evict(force=True) == [str(old)]
+
+
+def test_limits_default_to_the_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOADENV_ARTIFACT_MAX_AGE", "120")
+    monkeypatch.setenv("LOADENV_ARTIFACT_MAX_BYTES", "4096")
+    store = ArtifactStore(tmp_path)
+    assert (store.max_age, store.max_bytes) == (120, 4096)
+
+    monkeypatch.delenv("LOADENV_ARTIFACT_MAX_AGE")
+    monkeypatch.setenv("LOADENV_ARTIFACT_MAX_BYTES", "")
+    store = ArtifactStore(tmp_path)
+    assert (store.max_age, store.max_bytes) == (7 * 24 * 3600, 16 * 2**20)
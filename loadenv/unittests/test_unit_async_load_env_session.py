@@ -0,0 +1,141 @@
+import asyncio
+import os
+from pathlib import Path
+import pytest
+import sys
+import time
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.AsyncLoadEnvSession import AsyncLoadEnvSession
+from loadenv.LoadEnvSession import EnvironmentNotFoundError
+from load_env import LoadEnv
+
+
+
+# Stand in for applying each environment:  serial environments fail, cuda-10
+# hangs until it is killed, and everything else takes a moment.
+SCRIPT = (
+    "import sys, time\n"
+    "if 'serial' in sys.argv[1]: sys.exit('Unable to load gnu-serial')\n"
+    "if 'cuda-10' in sys.argv[1]: time.sleep(60)\n"
+    "time.sleep(0.2)\n"
+    )
+
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(
+        LoadEnv,
+        "validate_all_command",
+        lambda self, system_name, env_name: [
+            sys.executable, "-c", SCRIPT, f"{system_name}_{env_name}"
+            ],
+        )
+    return AsyncLoadEnvSession(
+        max_concurrency=4,
+        timeout=5,
+        supported_systems_file="test_supported_systems.ini",
+        supported_envs_file="test_supported_envs.ini",
+        environment_specs_file="test_environment_specs.ini",
+        force=True,
+        load_env_ini_file="test_load_env.ini",
+        )
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+
+################
+#  Validation  #
+################
+def test_validations_overlap_and_report_each_outcome(session):
+    build_names = [
+        "test-sys-1_cuda-9", "test-sys-1_gnu-openmp", "test-sys-1_gnu-serial", "test-sys-1_nothing"
+        ]
+    build_names += [f"test-sys-1_cuda-9_{_}" for _ in range(5)]
+    start = time.perf_counter()
+    results = run(session.validate_many(build_names, timeout=2))
+    assert time.perf_counter() - start < 2
+
+    assert [_["status"] for _ in results[: 3]] == ["pass", "pass", "fail"]
+    assert "Unable to load gnu-serial" in results[2]["output"]
+    assert isinstance(results[3], EnvironmentNotFoundError)
+    assert all(_["env_name"] == "test-sys-1_cuda-9.2-gnu-7.2.0-openmpi-2.1.2" for _ in results[4 :])
+
+
+def test_validations_time_out(session):
+    result = run(session.validate("test-sys-1_cuda-10", timeout=0.5))
+    assert result["status"] == "timeout"
+    assert result["wall_s"] < 5
+
+
+def test_concurrency_is_bounded(session):
+    session.max_concurrency = 1
+    start = time.perf_counter()
+    run(session.validate_many(["test-sys-1_cuda-9", "test-sys-1_gnu-openmp"], revalidate=True))
+    assert time.perf_counter() - start >= 0.4
+
+
+def test_cancelled_validations_kill_the_child(session, tmp_path):
+    pid_file = tmp_path / "child.pid"
+    command = [
+        sys.executable, "-c",
+        f"import os, time; open({str(pid_file)!r}, 'w').write(str(os.getpid())); time.sleep(60)",
+        ]
+
+    async def cancel():
+        task = asyncio.ensure_future(session.run_command(command))
+        while not pid_file.exists() or pid_file.read_text() == "":
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return int(pid_file.read_text())
+
+    pid = run(cancel())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_failures_are_not_stored(session):
+    for _ in range(2):
+        result = run(session.validate("test-sys-1_gnu-serial"))
+        assert (result["status"], result["cached"]) == ("fail", False)
+        assert "Unable to load gnu-serial" in result["output"]
+
+
+
+##########################
+#  Resolving, Rendering  #
+##########################
+def test_resolve_and_render(session, monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    resolution = run(session.resolve("van1-tx2_arm-serial"))
+    assert resolution.env_name == "van1-tx2_arm-20.0-openmpi-4.0.2-serial"
+
+    async def render_twice():
+        return await asyncio.gather(session.render(resolution), session.render("van1-tx2_arm-20.1"))
+
+    first, second = run(render_twice())
+    assert first != second and first.parent == second.parent == tmp_path
+    assert first.read_text().endswith(
+        "export LOADED_ENV_NAME=van1-tx2_arm-20.0-openmpi-4.0.2-serial"
+        )
+    assert second.read_text().endswith(
+        "export LOADED_ENV_NAME=van1-tx2_arm-20.1-openmpi-4.0.3-openmp"
+        )
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+import pytest
+import sys
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.benchmarks import bench_hot_paths, bench_import_time, bench_scaling
+from loadenv.benchmarks.generate_catalog import generate_catalog
+from loadenv.EnvKeywordParser import EnvKeywordParser
+
+
+
+def test_hot_path_benchmarks_run_and_compare(capsys):
+    argv = ["--repeat", "1", "--min-time", "0", "--output", "results.json"]
+    assert bench_hot_paths.main(argv) == 0
+
+    with open("results.json", "r") as F:
+        results = json.load(F)
+    assert "EnvKeywordParser.qualified_env_name[alias]" in results["benchmarks"]
+    assert "LoadEnv.write_load_matching_env[cached]" in results["benchmarks"]
+
+    for result in results["benchmarks"].values():
+        result["min_us"] /= 10
+    lines, regressions = bench_hot_paths.compare(
+        json.loads(Path("results.json").read_text()), results, tolerance=0.2
+        )
+    assert sorted(regressions) == sorted(results["benchmarks"].keys())
+
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |   json.decoder\n"
+        "import time:        50 |        150 | json\n"
+        )
+    assert bench_import_time.parse_importtime(stderr) == {"json.decoder": 100, "json": 150}
+
+
+
+def test_generated_catalog_is_consistent(tmp_path):
+    catalog = generate_catalog(tmp_path / "catalog", systems=2, envs=3, aliases=2, use_depth=2)
+    assert len(catalog["env_build_names"]) == 6
+    assert len(catalog["alias_build_names"]) == 6
+
+    for build_name in [catalog["env_build_names"][-1], catalog["alias_build_names"][-1]]:
+        system_name = build_name.split("_")[0]
+        ekp = EnvKeywordParser(build_name, system_name, catalog["supported-envs"])
+        assert ekp.qualified_env_name == f"{system_name}_gnu-2.1.0-openmpi-2.1.1-openmp"
+
+    assert generate_catalog(
+        tmp_path / "catalog-again", systems=2, envs=3, aliases=2, use_depth=2, seed=0
+        )
+    assert (
+        (tmp_path / "catalog" / "environment-specs.ini").read_text()
+        == (tmp_path / "catalog-again" / "environment-specs.ini").read_text()
+        )
+
+
+
+@pytest.mark.parametrize("power", [0, 1, 2])
+def test_scaling_exponent(power):
+    sizes = [8, 16, 32, 64]
+    times = [3.0 * size**power for size in sizes]
+    assert bench_scaling.scaling_exponent(sizes, times) == pytest.approx(power)
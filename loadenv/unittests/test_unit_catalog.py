@@ -0,0 +1,107 @@
+import os
+from pathlib import Path
+import pytest
+import sys
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.Catalog import Catalog, CatalogSpecGraph
+from loadenv.ConfigCache import ConfigData
+from loadenv.EnvSpecGraph import EnvSpecGraph
+
+
+
+DATA = {
+    "supported-systems": ConfigData({
+        "rhel7": {},
+        "ats1": {"ats1-login.*": None, "ats1-compute.*": None, "ats1_host  # Comments here": None},
+        "van1-tx2": {"van1-tx2_host": None},
+        }),
+    "supported-envs": ConfigData({
+        "rhel7": {"gcc-10": "gcc\ndefault"},
+        "ats1": {"intel-19": "intel", "intel-20": None},
+        "van1-tx2": {"arm-20": "arm"},
+        }),
+    "environment-specs": ConfigData({
+        "COMMON": {"envvar-set CC": "mpicc", "envvar-remove CXX": None},
+        "ATS1": {"module-purge": None, "envvar-set CXX": "mpicxx", "use COMMON": None},
+        "ats1_intel-19": {"use ATS1": None, "module-load intel": "19"},
+        "ats1_intel-20": {"use ATS1": None, "module-load intel": "20"},
+        }),
+    }
+
+
+
+@pytest.fixture
+def catalog_file():
+    files = {}
+    for kind in Catalog.KINDS:
+        files[kind] = Path(f"{kind}.ini").resolve()
+        files[kind].write_text(f"# {kind}\n")
+    filename = Path("load-env.catalog")
+    Catalog.compile(filename, files, DATA, EnvSpecGraph(DATA["environment-specs"]))
+    return filename, files
+
+
+
+#############
+#  Records  #
+#############
+def test_records_are_decoded_on_demand(catalog_file):
+    filename, files = catalog_file
+    catalog = Catalog(filename)
+    envs = catalog.data("supported-envs")
+    assert envs.sections() == ["rhel7", "ats1", "van1-tx2"]
+    assert catalog._records == {}
+
+    assert envs["ats1"] == {"intel-19": "intel", "intel-20": None}
+    assert list(catalog._records) == [("supported-envs", "ats1")]
+    assert catalog.data("environment-specs")["COMMON"] == DATA["environment-specs"]["COMMON"]
+
+
+def test_spec_graph_matches_expanded_sections(catalog_file):
+    filename, files = catalog_file
+    graph = CatalogSpecGraph(Catalog(filename))
+    expected = EnvSpecGraph(DATA["environment-specs"])
+    for section in DATA["environment-specs"].sections() + ["DOES-NOT-EXIST"]:
+        assert graph.expanded_actions(section) == expected.expanded_actions(section)
+        assert graph.fingerprint(section) == expected.fingerprint(section)
+        assert graph.actions_fingerprint(section) == expected.actions_fingerprint(section)
+        assert graph.use_closure(section) == expected.use_closure(section)
+
+
+def test_hostnames_are_matched(catalog_file):
+    catalog = Catalog(catalog_file[0])
+    assert catalog.match_hostname("ats1-login2") == ["ats1"]
+    assert catalog.match_hostname("ats1_host") == ["ats1"]
+    assert catalog.match_hostname("van1-tx2_host") == ["van1-tx2"]
+    assert catalog.match_hostname("unknown") == []
+
+
+
+###############
+#  Staleness  #
+###############
+def test_catalog_is_stale_once_sources_change(catalog_file):
+    filename, files = catalog_file
+    catalog = Catalog(filename)
+    assert not catalog.stale(files)
+    assert catalog.stale({**files, "supported-envs": Path("other.ini").resolve()})
+
+    with open(files["environment-specs"], "a") as F:
+        F.write("[NEW]\n")
+    assert catalog.stale(files)
+
+
+@pytest.mark.parametrize("contents", [b"", b"[load-env]\n", Catalog.MAGIC + b"\x02\x00\x00\x00"])
+def test_invalid_catalogs_raise(contents):
+    Path("load-env.catalog").write_bytes(contents)
+    with pytest.raises(ValueError):
+        Catalog("load-env.catalog")
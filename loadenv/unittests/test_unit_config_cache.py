@@ -0,0 +1,170 @@
+import json
+import os
+from pathlib import Path
+import pytest
+import sys
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.ConfigCache import ConfigCache, ConfigData
+
+
+
+def write_ini(filename, contents):
+    with open(filename, "w") as F:
+        F.write(contents)
+
+
+
+def make_parse(calls, sections):
+    def parse():
+        calls.append(1)
+        return ConfigData(sections)
+
+    return parse
+
+
+
+#################
+#  ConfigCache  #
+#################
+def test_config_cache_skips_parsing_on_warm_run():
+    write_ini("test.ini", "[sec]\nkey : value\n")
+    calls = []
+    parse = make_parse(calls, {"sec": {"key": "value"}})
+
+    data = ConfigCache().load("test.ini", parse)
+    assert data["sec"]["key"] == "value"
+    assert len(calls) == 1
+
+    cache = ConfigCache()
+    data = cache.load("test.ini", parse)
+    assert data.has_option("sec", "key")
+    assert data.sections() == ["sec"]
+    assert len(calls) == 1
+    assert cache.hits == 1 and cache.misses == 0
+
+
+
+@pytest.mark.parametrize("change", ["contents", "mtime"])
+def test_config_cache_detects_stale_entries(change):
+    write_ini("test.ini", "[sec]\nkey : value\n")
+    calls = []
+    ConfigCache().load("test.ini", make_parse(calls, {"sec": {"key": "value"}}))
+
+    if change == "contents":
+        write_ini("test.ini", "[sec]\nkey : other\n")
+    else:
+        stat = os.stat("test.ini")
+        os.utime("test.ini", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    data = ConfigCache().load("test.ini", make_parse(calls, {"sec": {"key": "other"}}))
+    assert data["sec"]["key"] == "other"
+    assert len(calls) == 2
+
+
+
+def test_config_cache_detects_version_change():
+    write_ini("test.ini", "[sec]\n")
+    calls = []
+    cache = ConfigCache()
+    cache.load("test.ini", make_parse(calls, {"sec": {}}))
+
+    for record_file in (cache.cache_dir / "configs").glob("*.json"):
+        with open(record_file, "r") as F:
+            record = json.load(F)
+        record["loadenv_version"] = "0.0.0-old"
+        with open(record_file, "w") as F:
+            json.dump(record, F)
+
+    ConfigCache().load("test.ini", make_parse(calls, {"sec": {}}))
+    assert len(calls) == 2
+
+
+
+@pytest.mark.parametrize("how", ["env", "argument"])
+def test_config_cache_can_be_disabled(how, monkeypatch):
+    write_ini("test.ini", "[sec]\n")
+    calls = []
+    if how == "env":
+        monkeypatch.setenv("LOADENV_NO_CACHE", "1")
+        cache = ConfigCache()
+    else:
+        cache = ConfigCache(enabled=False)
+
+    cache.load("test.ini", make_parse(calls, {"sec": {}}))
+    cache.load("test.ini", make_parse(calls, {"sec": {}}))
+    assert len(calls) == 2
+    assert not cache.cache_dir.exists()
+
+
+
+def test_config_cache_ignores_corrupt_records():
+    write_ini("test.ini", "[sec]\n")
+    calls = []
+    cache = ConfigCache()
+    cache.load("test.ini", make_parse(calls, {"sec": {}}))
+    for record_file in (cache.cache_dir / "configs").glob("*.json"):
+        with open(record_file, "w") as F:
+            F.write("{ not json")
+
+    data = ConfigCache().load("test.ini", make_parse(calls, {"sec": {"a": None}}))
+    assert data["sec"] == {"a": None}
+    assert len(calls) == 2
+
+
+
+def test_config_cache_location_defaults_to_xdg_cache_home(monkeypatch):
+    monkeypatch.delenv("LOADENV_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", "xdg_cache")
+    assert ConfigCache().cache_dir == Path("xdg_cache") / "loadenv"
+    assert ConfigCache(cache_dir="explicit").cache_dir == Path("explicit")
+
+
+
+def test_config_cache_load_file_writes_once():
+    calls = []
+
+    def write(path):
+        calls.append(path)
+        path.write_text("contents")
+
+    cache = ConfigCache()
+    path = cache.load_file("renders", "key.sh", write)
+    assert path.read_text() == "contents"
+    assert cache.load_file("renders", "key.sh", write) == path
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert list(path.parent.iterdir()) == [path]
+
+    assert ConfigCache(enabled=False).load_file("renders", "key.sh", write) is None
+    assert len(calls) == 1
+
+
+
+@pytest.mark.parametrize("mode", [0o620, 0o602])
+def test_config_cache_ignores_entries_others_can_write(mode):
+    calls = []
+
+    def write(path):
+        calls.append(path)
+        path.write_text("contents")
+
+    cache = ConfigCache()
+    path = cache.load_file("renders", "key.sh", write)
+    path.chmod(mode)
+    assert cache.load_file("renders", "key.sh", write) == path
+    assert len(calls) == 2
+    assert not path.stat().st_mode & 0o022
+
+    cache.write_record("records", "key", {"a": 1})
+    assert cache.read_record("records", "key") == {"a": 1}
+    (cache.cache_dir / "records" / "key.json").chmod(mode)
+    assert cache.read_record("records", "key") is None
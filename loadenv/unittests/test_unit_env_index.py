@@ -0,0 +1,87 @@
+from pathlib import Path
+import pytest
+import sys
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.ConfigCache import ConfigData
+from loadenv.EnvIndex import EnvIndex
+from loadenv.EnvKeywordParser import EnvKeywordParser
+
+
+
+DATA = ConfigData({
+    "rhel7": {"gcc-10.2.0": "\ngcc-10\ngcc", "clang-12.0.0": "\nclang", "intel-19": None},
+    "ats1": {"intel-19.0.4": "\nintel-19\nintel", "intel-20.0.1": "\nintel"},
+    })
+
+
+
+@pytest.fixture
+def index():
+    return EnvIndex.build(DATA, "supported-envs.ini")
+
+
+
+##############
+#  Building  #
+##############
+def test_index_matches_env_keyword_parser(index):
+    ekp = EnvKeywordParser("", "rhel7", "supported-envs.ini", config_data=DATA)
+    assert index.systems["rhel7"]["error"] is None
+    assert index.systems["rhel7"]["envs"] == {
+        _: sorted(ekp.env_aliases[_]) for _ in ekp.env_aliases
+        }
+    assert list(index.systems["rhel7"]["envs"]) == sorted(ekp.env_names)
+    assert EnvIndex(index.to_dict()).systems == index.systems
+
+
+def test_systems_with_duplicate_aliases_are_recorded(index):
+    assert index.systems["ats1"]["envs"] == {}
+    assert "contains duplicates" in index.systems["ats1"]["error"]
+
+
+
+#############
+#  Entries  #
+#############
+def test_entries_are_sorted(index):
+    assert list(index.entries(["rhel7"])) == [
+        {
+            "system": "rhel7",
+            "name": "clang-12.0.0",
+            "qualified_name": "rhel7_clang-12.0.0",
+            "aliases": ["clang"],
+            },
+        {
+            "system": "rhel7",
+            "name": "gcc-10.2.0",
+            "qualified_name": "rhel7_gcc-10.2.0",
+            "aliases": ["gcc", "gcc-10"],
+            },
+        {"system": "rhel7", "name": "intel-19", "qualified_name": "rhel7_intel-19", "aliases": []},
+        ]
+    assert [_["system"] for _ in index.entries()] == ["rhel7"] * 3
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("gcc", ["gcc-10.2.0"]),
+        ("12", ["clang-12.0.0"]),
+        ("*-1?.*", ["clang-12.0.0", "gcc-10.2.0"]),
+        ("rhel7_i*", ["intel-19"]),
+        ("intel", ["intel-19"]),
+        ("i*", ["intel-19"]),
+        ("pgi", []),
+        ],
+    )
+def test_entries_are_filtered(index, pattern, expected):
+    assert [_["name"] for _ in index.entries(["rhel7"], pattern)] == expected
@@ -1,5 +1,7 @@
 from pathlib import Path
 import pytest
+import random
+import re
 import sys
 import textwrap
 
@@ -249,3 +251,164 @@ def test_env_name_without_alias_okay():
     assert msg_expected in msg
     assert "|   See `test_supported_envs.ini` for details" in msg
     return
+
+
+
+####################
+#  Matcher Engine  #
+####################
+
+
+
+def legacy_qualified_env_name(build_name, system_name, env_names, alias_map):
+    """
+    The original regular-expression based matching, with names escaped, used
+    as the reference for the differential tests below.
+    """
+    delim = "_"
+    for name in sorted(env_names, key=len, reverse=True):
+        if re.search(f"(?:^|{delim}){re.escape(name)}(?:$|{delim})", build_name) is not None:
+            return f"{system_name}{delim}{name}"
+
+    for alias in sorted(alias_map.keys(), key=len, reverse=True):
+        if re.search(f"(?:^|{delim}){re.escape(alias)}(?:$|{delim})", build_name) is not None:
+            return f"{system_name}{delim}{alias_map[alias]}"
+
+    return None
+
+
+
+def generate_catalog(rng):
+    """
+    Generate a random ``supported-envs.ini`` section with unique environment
+    names and aliases built from a small pool of components, so names
+    frequently overlap or contain one another.
+    """
+    pool = ["intel", "gnu", "cuda", "arm", "mpich", "openmpi", "7.2.0", "19.0.4", "10.1",
+            "serial", "openmp", "hsw", "knl"]
+
+    def random_name():
+        name = "-".join(rng.choice(pool) for _ in range(rng.randint(1, 4)))
+        return name if rng.random() > 0.1 else name + "_" + rng.choice(pool)
+
+    env_names = []
+    alias_map = {}
+    while len(env_names) < rng.randint(1, 8):
+        name = random_name()
+        if name not in env_names and name not in alias_map:
+            env_names.append(name)
+    for name in env_names:
+        for _ in range(rng.randint(0, 4)):
+            alias = random_name()
+            if alias not in env_names and alias not in alias_map:
+                alias_map[alias] = name
+
+    ini = "[test-sys]\n"
+    for name in env_names:
+        ini += f"{name}:\n"
+        for alias, env_name in alias_map.items():
+            if env_name == name:
+                ini += f"    {alias}\n"
+
+    return ini, env_names, alias_map
+
+
+
+def generate_build_name(rng, env_names, alias_map):
+    keywords = env_names + list(alias_map.keys()) + ["opt", "dbg", "static", "x.y", "intel-19x0x4"]
+    components = [rng.choice(keywords) for _ in range(rng.randint(1, 4))]
+    if rng.random() < 0.3:
+        components.insert(0, "test-sys")
+    return "_".join(components)
+
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matcher_agrees_with_regex_matching_on_random_catalogs(seed, capsys):
+    rng = random.Random(seed)
+    ini, env_names, alias_map = generate_catalog(rng)
+    with open("random_supported_envs.ini", "w") as F:
+        F.write(ini)
+
+    ekp = EnvKeywordParser("", "test-sys", "random_supported_envs.ini")
+    for _ in range(50):
+        build_name = generate_build_name(rng, env_names, alias_map)
+        expected = legacy_qualified_env_name(build_name, "test-sys", env_names, alias_map)
+
+        ekp.build_name = build_name
+        if expected is None:
+            with pytest.raises(SystemExit):
+                ekp.qualified_env_name
+        else:
+            assert ekp.qualified_env_name == expected
+
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"build_name": "intel-19.0.4-mpich-7.7.15-hsw-openmp_opt", "matches": True},
+        {"build_name": "intel-19x0x4-mpich-7x7x15-hsw-openmp_opt", "matches": False},
+        ],
+    )
+def test_matcher_treats_names_literally(data):
+    ekp = EnvKeywordParser(data["build_name"], "ats1", "test_supported_envs.ini")
+    if data["matches"]:
+        assert ekp.qualified_env_name == "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    else:
+        with pytest.raises(SystemExit):
+            ekp.qualified_env_name
+
+
+
+def test_parser_can_be_reused_for_multiple_build_names():
+    ekp = EnvKeywordParser("intel-hsw", "ats1", "test_supported_envs.ini")
+    assert ekp.qualified_env_name == "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    ekp.build_name = "intel-knl_opt"
+    assert ekp.qualified_env_name == "ats1_intel-19.0.4-mpich-7.7.15-knl-openmp"
+
+
+
+def test_silent_parser_prints_nothing(capsys):
+    ekp = EnvKeywordParser("intel-hsw", "ats1", "test_supported_envs.ini")
+    ekp.qualified_env_name
+    assert "NOTICE:  Matched alias 'intel-hsw'" in capsys.readouterr().out
+
+    ekp = EnvKeywordParser("intel-hsw", "ats1", "test_supported_envs.ini", silent=True)
+    assert ekp.qualified_env_name == "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    ekp.build_name = "ats1_intel-19.0.4-mpich-7.7.15-knl-openmp"
+    assert ekp.qualified_env_name == "ats1_intel-19.0.4-mpich-7.7.15-knl-openmp"
+    assert capsys.readouterr().out == ""
+
+
+
+#################
+#  Alias Index  #
+#################
+
+
+
+def test_alias_index_maps_aliases_to_env_names():
+    ekp = EnvKeywordParser("intel-hsw", "ats1", "test_supported_envs.ini")
+    assert ekp.alias_index["intel-hsw"] == "intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    assert ekp.alias_index["default-env-knl"] == "intel-19.0.4-mpich-7.7.15-knl-openmp"
+    assert set(ekp.alias_index.keys()) == set(ekp.aliases)
+    assert ekp.env_aliases["intel-19.0.4-mpich-7.7.15-knl-openmp"] == [
+        "intel-knl-openmp", "intel-knl", "default-env-knl"
+        ]
+    assert ekp.get_key_for_section_value("ats1", "intel") == "intel-19.0.4-mpich-7.7.15-hsw-openmp"
+    assert ekp.get_key_for_section_value("test-sys-1", "cuda-10") == (
+        "cuda-10.1-gnu-7.2.0-openmpi-4.0.1"
+        )
+
+
+
+def test_alias_uniqueness_check_reports_each_duplicate_once():
+    ekp = EnvKeywordParser("intel-hsw", "ats1", "test_supported_envs.ini")
+    with pytest.raises(SystemExit) as excinfo:
+        ekp.assert_alias_list_values_are_unique(["a", "b", "a", "c", "b", "a"])
+    exc_msg = excinfo.value.args[0]
+
+    assert exc_msg.count("- a\n") == 1
+    assert exc_msg.count("- b\n") == 1
+    assert "- c\n" not in exc_msg
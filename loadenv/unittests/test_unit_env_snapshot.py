@@ -0,0 +1,127 @@
+import os
+from pathlib import Path
+import pytest
+import subprocess
+import sys
+from unittest.mock import Mock
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.EnvSnapshot import EnvSnapshot
+
+
+
+BEFORE = {
+    "PATH": "/usr/bin:/bin",
+    "MANPATH": "/usr/share/man",
+    "CC": "gcc",
+    "REMOVED": "1",
+    "UNCHANGED": "1",
+    "PWD": "/home/user",
+    }
+
+AFTER = {
+    "PATH": "/opt/mpi/bin:/usr/bin:/bin:/opt/tools/bin",
+    "MANPATH": "/opt/man",
+    "CC": "mpicc",
+    "UNCHANGED": "1",
+    "LOADEDMODULES": "mpi/1.0",
+    "_ModuleTable001_": "X2 = {} $HOME 'quoted'",
+    "PWD": "/somewhere/else",
+    }
+
+
+
+#############
+#  Capture  #
+#############
+def test_capture_records_relative_and_absolute_changes():
+    assert EnvSnapshot.capture(BEFORE, AFTER).actions == [
+        ["set", "CC", "mpicc"],
+        ["set", "LOADEDMODULES", "mpi/1.0"],
+        ["set", "MANPATH", "/opt/man"],
+        ["prepend", "PATH", "/opt/mpi/bin"],
+        ["append", "PATH", "/opt/tools/bin"],
+        ["unset", "REMOVED", None],
+        ["set", "_ModuleTable001_", "X2 = {} $HOME 'quoted'"],
+        ]
+
+
+
+@pytest.mark.parametrize("path", ["/usr/bin:/bin", "/other/bin", ""])
+def test_replay_in_bash_matches_captured_environment(path):
+    script = EnvSnapshot.capture(BEFORE, AFTER).to_bash()
+    script += 'for v in PATH CC REMOVED _ModuleTable001_; do echo "$v=${!v-<unset>}"; done\n'
+
+    env = dict(BEFORE, PATH=path)
+    result = subprocess.run(
+        ["/bin/bash", "-c", script], env=env, stdout=subprocess.PIPE, check=True
+        )
+
+    expected_path = {
+        "/usr/bin:/bin": AFTER["PATH"],
+        "/other/bin": "/opt/mpi/bin:/other/bin:/opt/tools/bin",
+        "": "/opt/mpi/bin:/opt/tools/bin",
+        }[path]
+    assert result.stdout.decode().splitlines() == [
+        f"PATH={expected_path}",
+        "CC=mpicc",
+        "REMOVED=<unset>",
+        "_ModuleTable001_=X2 = {} $HOME 'quoted'",
+        ]
+
+
+
+#################
+#  Module Tree  #
+#################
+def test_module_tree_fingerprint_detects_changes():
+    Path("modules/mpi").mkdir(parents=True)
+    Path("modules/mpi/1.0").write_text("#%Module")
+    modulefiles = [str(Path("modules/mpi/1.0").resolve())]
+    fingerprint = EnvSnapshot.module_tree_fingerprint(["modules", "missing"], modulefiles)
+    assert EnvSnapshot.module_tree_fingerprint(["modules", "missing"], modulefiles) == fingerprint
+
+    Path("modules/mpi/2.0").write_text("#%Module")
+    assert EnvSnapshot.module_tree_fingerprint(["modules", "missing"], modulefiles) != fingerprint
+    assert EnvSnapshot.module_tree_fingerprint(["missing"], modulefiles) != fingerprint
+
+    fingerprint = EnvSnapshot.module_tree_fingerprint(["modules"])
+    Path("modules/gcc").mkdir()
+    assert EnvSnapshot.module_tree_fingerprint(["modules"]) != fingerprint
+
+
+
+def test_module_tree_fingerprint_does_not_list_directories(monkeypatch):
+    Path("modules/mpi").mkdir(parents=True)
+    Path("modules/mpi/1.0").write_text("#%Module")
+    monkeypatch.setattr(os, "walk", Mock(side_effect=AssertionError))
+    monkeypatch.setattr(os, "listdir", Mock(side_effect=AssertionError))
+    monkeypatch.setattr(os, "scandir", Mock(side_effect=AssertionError))
+    EnvSnapshot.module_tree_fingerprint(["modules"], [str(Path("modules/mpi/1.0").resolve())])
+
+
+
+def test_module_tree_fingerprint_only_stats_loaded_and_default_files():
+    Path("modules/mpi").mkdir(parents=True)
+    Path("modules/mpi/1.0").write_text("#%Module")
+    Path("modules/mpi/2.0").write_text("#%Module")
+    modulefiles = [str(Path("modules/mpi/1.0").resolve())]
+    fingerprint = EnvSnapshot.module_tree_fingerprint(["modules"], modulefiles)
+
+    Path("modules/mpi/2.0").write_text("#%Module\nsetenv FOO bar")
+    assert EnvSnapshot.module_tree_fingerprint(["modules"], modulefiles) == fingerprint
+
+    Path("modules/mpi/1.0").write_text("#%Module\nsetenv FOO bar")
+    assert EnvSnapshot.module_tree_fingerprint(["modules"], modulefiles) != fingerprint
+
+    fingerprint = EnvSnapshot.module_tree_fingerprint(["modules"], modulefiles)
+    Path("modules/mpi/.version").write_text("#%Module\nset ModulesVersion 2.0")
+    assert EnvSnapshot.module_tree_fingerprint(["modules"], modulefiles) != fingerprint
@@ -0,0 +1,207 @@
+import itertools
+from pathlib import Path
+import pytest
+import sys
+from unittest.mock import patch
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.EnvSpecGraph import EnvSpecGraph
+
+
+
+SECTIONS = {
+    "COMMON": {"envvar-set CC": "mpicc"},
+    "SYS": {"module-purge": None, "use COMMON": None},
+    "SYS_OPENMP": {"envvar-set OMP_NUM_THREADS": "2", "use COMMON": None},
+    "UNUSED": {"invalid-operation foo": "bar"},
+    "sys_env-openmp": {"use SYS": None, "use SYS_OPENMP": None, "module-load gcc": "10"},
+    "sys_env-missing": {"use DOES-NOT-EXIST": None},
+    "cycle_a": {"use cycle_b": None},
+    "cycle_b": {"use cycle_a": None},
+    }
+
+
+
+###################
+#  Use Traversal  #
+###################
+def test_uses_lists_direct_dependencies_in_order():
+    graph = EnvSpecGraph(SECTIONS)
+    assert graph.uses("sys_env-openmp") == ["SYS", "SYS_OPENMP"]
+    assert graph.uses("COMMON") == []
+
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"section": "sys_env-openmp", "closure": ["sys_env-openmp", "SYS", "COMMON", "SYS_OPENMP"]},
+        {"section": "COMMON", "closure": ["COMMON"]},
+        {"section": "sys_env-missing", "closure": ["sys_env-missing"]},
+        {"section": "cycle_a", "closure": ["cycle_a", "cycle_b"]},
+        ],
+    )
+def test_use_closure_visits_each_reachable_section_once(data):
+    graph = EnvSpecGraph(SECTIONS)
+    closure = graph.use_closure(data["section"])
+    assert closure == data["closure"]
+    assert "UNUSED" not in closure
+
+
+
+#################
+#  Fingerprint  #
+#################
+def test_fingerprint_only_depends_on_use_closure():
+    fingerprint = EnvSpecGraph(SECTIONS).fingerprint("sys_env-openmp")
+
+    sections = dict(SECTIONS, UNUSED={"envvar-set FOO": "bar"})
+    assert EnvSpecGraph(sections).fingerprint("sys_env-openmp") == fingerprint
+
+    sections = dict(SECTIONS, COMMON={"envvar-set CC": "gcc"})
+    assert EnvSpecGraph(sections).fingerprint("sys_env-openmp") != fingerprint
+    assert EnvSpecGraph(SECTIONS).fingerprint("SYS") != fingerprint
+
+
+
+######################
+#  Expanded Actions  #
+######################
+def test_expanded_actions_inline_uses_and_apply_removes():
+    sections = {
+        "COMMON": {
+            "envvar-set CC": "mpicc",
+            "module-load gcc": "9",
+            "envvar-prepend PATH tag": "/a",
+            },
+        "sys_env": {
+            "module-purge": None,
+            "use COMMON": None,
+            "envvar-remove CC": None,
+            "module-remove gcc": None,
+            "module-load gcc extra": "10",
+            },
+        }
+    assert EnvSpecGraph(sections).expanded_actions("sys_env") == [
+        ("module-purge", None, None),
+        ("envvar-prepend", "PATH", "/a"),
+        ("module-load", "gcc", "10"),
+        ]
+    assert EnvSpecGraph(SECTIONS).expanded_actions("cycle_a") == []
+
+
+
+def test_actions_fingerprint_only_changes_with_expanded_actions():
+    fingerprint = EnvSpecGraph(SECTIONS).actions_fingerprint("sys_env-openmp")
+
+    # Moving an option into a section that is used at the same point, or
+    # setting a variable that is later removed, does not change what the
+    # environment does.
+    sections = dict(
+        SECTIONS,
+        SYS={"module-purge": None, "use COMMON": None, "envvar-set OMP_NUM_THREADS": "2"},
+        SYS_OPENMP={"use COMMON": None},
+        )
+    assert EnvSpecGraph(sections).actions_fingerprint("sys_env-openmp") == fingerprint
+    assert (
+        EnvSpecGraph(sections).fingerprint("sys_env-openmp")
+        != EnvSpecGraph(SECTIONS).fingerprint("sys_env-openmp")
+        )
+
+    sections = dict(
+        SECTIONS,
+        COMMON={"envvar-set CC": "mpicc", "envvar-set FOO": "bar", "envvar-remove FOO": None},
+        )
+    assert EnvSpecGraph(sections).actions_fingerprint("sys_env-openmp") == fingerprint
+
+    sections = dict(SECTIONS, COMMON={"envvar-set CC": "gcc"})
+    assert EnvSpecGraph(sections).actions_fingerprint("sys_env-openmp") != fingerprint
+
+
+
+
+def test_expansion_memoizes_each_section_once():
+    # A chain of diamonds:  each level uses both sections of the next.
+    depth = 12
+    sections = {}
+    for level in range(depth):
+        for side in "ab":
+            sections[f"L{level}{side}"] = {f"envvar-set V{level}{side}": "1"}
+            if level + 1 < depth:
+                sections[f"L{level}{side}"].update(
+                    {f"use L{level + 1}a": None, f"use L{level + 1}b": None}
+                    )
+
+    graph = EnvSpecGraph(sections)
+    calls = []
+    options = graph.options
+    graph.options = lambda section: calls.append(section) or options(section)
+
+    assert len(graph.expansion("L0a")) == 2**depth - 1
+    assert set(calls) == set(sections) - {"L0b"}
+    assert len(calls) <= 2 * len(sections)
+
+    # Shared sections share their action tuples.
+    assert graph.expansion("L0a")[-1] is graph.expansion("L0b")[-1]
+    assert graph.actions_fingerprint("L0a") == graph.actions_fingerprint("L0a")
+
+
+
+def test_expansion_ignores_and_records_cycles():
+    sections = {
+        "cycle_a": {"envvar-set A": "1", "use cycle_b": None},
+        "cycle_b": {"use cycle_a": None, "envvar-set B": "2"},
+        }
+    graph = EnvSpecGraph(sections)
+    assert graph.expanded_actions("cycle_a") == [("envvar-set", "A", "1"), ("envvar-set", "B", "2")]
+    assert graph.cycles == {frozenset(["cycle_a", "cycle_b"])}
+
+
+
+@pytest.mark.parametrize("order", list(itertools.permutations(["cycle_a", "cycle_b", "cycle_c"])))
+def test_expansion_of_cycles_does_not_depend_on_order(order):
+    sections = {
+        "BASE": {"module-purge": None},
+        "sys_env": {"use cycle_b": None},
+        "cycle_a": {"envvar-set A": "1", "use cycle_b": None, "use BASE": None},
+        "cycle_b": {"use cycle_c": None, "envvar-set B": "2", "use cycle_b": None},
+        "cycle_c": {"use cycle_a": None, "envvar-set C": "3"},
+        }
+    a, b, c = [("envvar-set", _, str(i + 1)) for i, _ in enumerate("ABC")]
+    purge = ("module-purge", None, None)
+    expected = {
+        "cycle_a": (a, c, b, purge),
+        "cycle_b": (a, purge, c, b),
+        "cycle_c": (a, b, purge, c),
+        "sys_env": (a, purge, c, b),
+        }
+
+    graph = EnvSpecGraph(sections)
+    for section in order + ("sys_env",):
+        assert graph.expansion(section) == expected[section]
+    assert graph.cycles == {frozenset(["cycle_a", "cycle_b", "cycle_c"])}
+
+
+
+def test_expansion_of_dense_cycles_is_bounded():
+    names = [f"section_{i}" for i in range(8)]
+    sections = {
+        name: dict([(f"envvar-set {name}", "1")] + [(f"use {_}", None) for _ in names])
+        for name in names
+        }
+    graph = EnvSpecGraph(sections)
+    with patch.object(graph, "_expand", wraps=graph._expand) as mock_expand:
+        expansions = [graph.expansion(_) for _ in names]
+    assert mock_expand.call_count == len(names) ** 2
+    for name, expansion in zip(names, expansions):
+        assert sorted(_[1] for _ in expansion) == names
+        assert expansion[0] == ("envvar-set", name, "1")
+    assert graph.cycles == {frozenset(names)}
@@ -1,7 +1,10 @@
 import getpass
 from importlib import import_module
+import json
+import os
 from pathlib import Path
 import pytest
+import subprocess
 import sys
 from unittest import mock
 from unittest.mock import patch, Mock
@@ -19,6 +22,8 @@ sys.path.append(str(root_dir))
 from configparserenhanced import ConfigParserEnhanced
 from load_env import LoadEnv
 import load_env
+from loadenv.benchmarks import bench_import_time
+from loadenv.version import __version__ as load_env_version
 
 
 @pytest.mark.parametrize("system_name", ["ats1", "test-system"])
@@ -54,6 +59,63 @@ def test_list_envs(system_name, capsys):
             assert line in exc_msg
 
 
+def test_list_envs_json_is_filtered(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        load_env.main([
+            "--supported-systems", "test_supported_systems.ini",
+            "--supported-envs", "test_supported_envs.ini",
+            "--force",
+            "--list-envs",
+            "--format", "json",
+            "--filter", "arm-20.1*",
+            "van1-tx2",
+        ])
+    assert excinfo.value.code == 0
+    stdout, stderr = capsys.readouterr()
+    records = [json.loads(_) for _ in stdout.splitlines()]
+    assert [_["qualified_name"] for _ in records] == [
+        "van1-tx2_arm-20.1-openmpi-4.0.3-openmp",
+        "van1-tx2_arm-20.1-openmpi-4.0.3-serial",
+        ]
+    assert records[0]["aliases"] == ["arm-20.1", "arm-20.1-openmp"]
+
+
+def test_list_envs_all_systems_uses_the_cached_index(capsys):
+    argv = [
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--list-envs",
+        "--all-systems",
+        "--format", "json",
+    ]
+    le = LoadEnv(argv, load_env_ini_file="test_load_env.ini")
+    assert le.list_envs(le.args.format, le.args.filter, le.args.all_systems) > 0
+    stdout, stderr = capsys.readouterr()
+    systems = {json.loads(_)["system"] for _ in stdout.splitlines()}
+    assert systems == {"rhel7", "ats1", "test-sys-1", "van1-tx2", "test-system"}
+
+    le = LoadEnv(argv, load_env_ini_file="test_load_env.ini")
+    with patch("load_env.EnvKeywordParser") as mock_ekp:
+        le.list_envs(le.args.format, le.args.filter, le.args.all_systems)
+    mock_ekp.assert_not_called()
+    assert le.supported_envs_data is None
+    assert capsys.readouterr()[0] == stdout
+
+
+def test_list_envs_without_matches_fails(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        load_env.main([
+            "--supported-systems", "test_supported_systems.ini",
+            "--supported-envs", "test_supported_envs.ini",
+            "--force",
+            "--list-envs",
+            "--filter", "does-not-exist",
+            "ats1",
+        ])
+    assert excinfo.value.code == 1
+    assert capsys.readouterr()[0] == ""
+
+
 @patch("socket.gethostname")
 @patch("load_env.SetEnvironment")
 def test_load_matching_env_location_flag_creates_load_matching_env_location_file(mock_set_environment, mock_gethostname):
@@ -82,6 +144,70 @@ def test_load_matching_env_location_flag_creates_load_matching_env_location_file
     assert not file.exists()
 
 
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_load_matching_env_fd_receives_the_script_path(
+    mock_set_environment, mock_gethostname, monkeypatch, tmp_path
+    ):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.apply.return_value = 0
+    mock_set_environment.return_value = mock_se
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+
+    read_fd, write_fd = os.pipe()
+    load_env.main([
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", "test_environment_specs.ini",
+        "arm",
+        "--load-matching-env-fd", str(write_fd),
+    ])
+    os.close(write_fd)
+    with os.fdopen(read_fd) as F:
+        env_file = Path(F.read().strip())
+
+    assert env_file.parent == tmp_path
+    assert env_file.read_text().endswith(
+        "export LOADED_ENV_NAME=van1-tx2_arm-20.0-openmpi-4.0.2-openmp"
+        )
+    assert list(Path.cwd().glob(".load_matching_env*")) == []
+
+
+@patch("socket.gethostname")
+@patch("load_env.SetEnvironment")
+def test_old_load_matching_env_files_are_evicted(
+    mock_set_environment, mock_gethostname, monkeypatch, tmp_path
+    ):
+    mock_gethostname.return_value = "van1-tx2_host"
+    mock_se = Mock(unsafe=True)
+    mock_se.apply.return_value = 0
+    mock_set_environment.return_value = mock_se
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    monkeypatch.setenv("LOADENV_ARTIFACT_MAX_AGE", "86400")
+
+    old_file = tmp_path / "load_matching_env_00000000.sh"
+    old_file.write_text("export OLD=1\n")
+    os.utime(old_file, (0, 0))
+    unmanaged_file = tmp_path / "loadenv.sock.log"
+    unmanaged_file.write_text("")
+    os.utime(unmanaged_file, (0, 0))
+
+    le = LoadEnv([
+        "--supported-systems", "test_supported_systems.ini",
+        "--supported-envs", "test_supported_envs.ini",
+        "--environment-specs", "test_environment_specs.ini",
+        "arm",
+    ], load_env_ini_file="test_load_env.ini")
+    env_file = le.write_load_matching_env()
+
+    assert env_file.parent == tmp_path
+    assert not old_file.exists()
+    assert unmanaged_file.exists()
+    assert sorted(_.name for _ in tmp_path.glob("*load_matching_env_*")) == [env_file.name]
+
+
+
 @pytest.mark.parametrize("data", ["string", ("tu", "ple"), None])
 def test_argv_non_list_raises(data):
     with pytest.raises(TypeError) as excinfo:
@@ -270,3 +396,80 @@ def test_relative_path_resolves_to_absolute_path(already_resolved):
     assert "/" in str(le.args.supported_systems_file)
     assert "/" in str(le.args.supported_envs_file)
     assert "/" in str(le.args.environment_specs_file)
+
+
+##################
+#  Config Cache  #
+##################
+def test_warm_run_skips_parsing_config_files():
+    argv = ["--supported-envs", "test_supported_envs.ini", "--force", "ats1_intel-hsw"]
+    le = LoadEnv(argv, load_env_ini_file="test_load_env.ini")
+    le.load_env_keyword_parser()
+    assert le.config_cache.misses == 3
+
+    with patch("load_env.ConfigParserEnhanced") as mock_cpe:
+        le = LoadEnv(argv, load_env_ini_file="test_load_env.ini")
+        le.load_env_keyword_parser()
+        assert mock_cpe.call_count == 0
+    assert le.config_cache.hits == 3
+    assert le.env_keyword_parser.config["ats1"].keys() == le.supported_envs_data["ats1"].keys()
+
+
+
+def test_renderer_fingerprint_uses_versions(monkeypatch):
+    Path("deps/setenvironment").mkdir(parents=True)
+    Path("deps/setenvironment/__init__.py").write_text("")
+    Path("deps/setenvironment/version.py").write_text('__version__ = "1.2.3"\n')
+    monkeypatch.setattr(sys, "path", [str(Path("deps").resolve())] + sys.path)
+    monkeypatch.setattr(Path, "glob", Mock(side_effect=AssertionError))
+
+    def fingerprint():
+        return LoadEnv(["build_name"], load_env_ini_file="test_load_env.ini").renderer_fingerprint
+
+    before = fingerprint()
+    assert [str(root_dir / "load_env.py"), load_env_version, mock.ANY] in before
+    assert [str(Path("deps/setenvironment").resolve()), "1.2.3", mock.ANY] in before
+    assert fingerprint() == before
+
+    Path("deps/setenvironment/version.py").write_text('__version__ = "1.2.4"\n')
+    assert fingerprint() != before
+
+
+
+#################
+#  Import Time  #
+#################
+def test_import_does_not_load_unneeded_modules():
+    code = "; ".join([
+        "import sys",
+        "import load_env",
+        "print(' '.join(sorted(set(sys.modules) & set(sys.argv[1 :]))))",
+        ])
+    lazy_modules = [
+        "argparse",
+        "determinesystem",
+        "loadenv.ActionOptimizer",
+        "loadenv.ArtifactStore",
+        "loadenv.Catalog",
+        "loadenv.EnvIndex",
+        "loadenv.EnvSnapshot",
+        "loadenv.ModuleBatcher",
+        "mmap",
+        "setenvironment",
+        "shutil",
+        "struct",
+        "tempfile",
+        "uuid",
+        ]
+    result = subprocess.run(
+        [sys.executable, "-c", code] + lazy_modules,
+        cwd=str(root_dir),
+        stdout=subprocess.PIPE,
+        check=True,
+        )
+    assert result.stdout.decode().split() == []
+
+    modules = bench_import_time.measure(runs=1, root_dir=root_dir)["modules"]
+    assert len(modules) <= bench_import_time.MAX_MODULES, modules
+
+    assert load_env.SetEnvironment is load_env._import_dependency("SetEnvironment")
@@ -0,0 +1,169 @@
+import concurrent.futures
+from pathlib import Path
+import pytest
+import sys
+from unittest.mock import patch
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.LoadEnvSession import (
+    ConfigurationError,
+    EnvironmentNotFoundError,
+    LoadEnvSession,
+    LoadEnvSessionError,
+    Resolution,
+    SystemNotFoundError,
+    )
+import load_env
+
+
+
+BUILD_NAMES = {
+    "Trilinos_ats1_intel-hsw_opt": "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp",
+    "ats1_default-env-knl_dbg": "ats1_intel-19.0.4-mpich-7.7.15-knl-openmp",
+    "van1-tx2_arm-serial": "van1-tx2_arm-20.0-openmpi-4.0.2-serial",
+    "van1-tx2_arm-20.1_static": "van1-tx2_arm-20.1-openmpi-4.0.3-openmp",
+    "test-system_env-name": "test-system_env-name-serial",
+    }
+
+
+
+@pytest.fixture
+def session():
+    return LoadEnvSession(
+        supported_systems_file="test_supported_systems.ini",
+        supported_envs_file="test_supported_envs.ini",
+        environment_specs_file="test_environment_specs.ini",
+        force=True,
+        load_env_ini_file="test_load_env.ini",
+        )
+
+
+
+#################
+#  Resolutions  #
+#################
+def test_build_names_are_resolved(session):
+    resolution = session.resolve("Trilinos_ats1_intel-hsw_opt")
+    assert resolution == Resolution(
+        "Trilinos_ats1_intel-hsw_opt",
+        "ats1",
+        "ats1_intel-19.0.4-mpich-7.7.15-hsw-openmp",
+        "Trilinos_opt",
+        )
+    assert resolution.to_dict()["parsed_env_name"] == resolution.env_name
+    for build_name, env_name in BUILD_NAMES.items():
+        assert session.resolve(build_name).env_name == env_name
+
+
+def test_parsers_are_kept_across_resolutions(session):
+    session.resolve("Trilinos_ats1_intel-hsw_opt")
+    with patch("load_env.EnvKeywordParser", wraps=load_env.EnvKeywordParser) as mock_ekp, \
+            patch("load_env.ConfigParserEnhanced", create=True) as mock_cpe:
+        for _ in range(3):
+            for build_name in BUILD_NAMES:
+                session.resolve(build_name)
+    assert mock_ekp.call_count == 2
+    mock_cpe.assert_not_called()
+
+
+@patch("socket.gethostname")
+def test_system_is_determined_once(mock_gethostname):
+    mock_gethostname.return_value = "van1-tx2_host"
+    session = LoadEnvSession(
+        supported_systems_file="test_supported_systems.ini",
+        supported_envs_file="test_supported_envs.ini",
+        load_env_ini_file="test_load_env.ini",
+        )
+    DetermineSystem = load_env._import_dependency("DetermineSystem")
+    with patch("load_env.DetermineSystem", wraps=DetermineSystem) as mock_ds:
+        resolutions = session.resolve_many(["arm", "arm-serial", "arm-20.1"])
+    assert [_.system_name for _ in resolutions] == ["van1-tx2"] * 3
+    assert mock_ds.call_count == 1
+
+
+@patch("socket.gethostname")
+def test_nothing_is_printed(mock_gethostname, capsys, monkeypatch, tmp_path):
+    mock_gethostname.return_value = "van1-tx2_host"
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    session = LoadEnvSession(
+        supported_systems_file="test_supported_systems.ini",
+        supported_envs_file="test_supported_envs.ini",
+        environment_specs_file="test_environment_specs.ini",
+        load_env_ini_file="test_load_env.ini",
+        )
+    resolutions = session.resolve_many(
+        ["arm", "van1-tx2_arm-20.1", "ats1_intel-hsw", "unknown-env"]
+        )
+    assert [_.system_name for _ in resolutions[:2]] == ["van1-tx2"] * 2
+    assert all(isinstance(_, LoadEnvSessionError) for _ in resolutions[2:])
+    assert session.render(resolutions[0]).exists()
+    assert capsys.readouterr() == ("", "")
+
+
+def test_changed_configuration_files_are_reloaded(session):
+    assert session.resolve("test-system_another-env").env_name == "test-system_another-env"
+    le = session.load_env
+    with open("test_supported_envs.ini", "a") as F:
+        F.write("new-env:\n    newest\n")
+    assert session.resolve("test-system_newest").env_name == "test-system_new-env"
+    assert session.load_env is not le
+
+
+
+############
+#  Errors  #
+############
+def test_errors_are_typed_exceptions(session):
+    with pytest.raises(EnvironmentNotFoundError) as excinfo:
+        session.resolve("ats1_does-not-exist")
+    assert excinfo.value.build_name == "ats1_does-not-exist"
+    assert "Unable to find alias or environment name" in excinfo.value.message
+
+    with pytest.raises(SystemNotFoundError):
+        session.resolve("unknown-system_intel")
+
+    results = session.resolve_many(["ats1_intel-hsw", "ats1_does-not-exist"])
+    assert isinstance(results[0], Resolution)
+    assert isinstance(results[1], LoadEnvSessionError)
+    assert not isinstance(results[1], SystemExit)
+
+
+def test_systems_missing_from_supported_envs_raise(session):
+    with open("test_supported_systems.ini", "a") as F:
+        F.write("\n[new-system]\nnew-system-host\n")
+    with pytest.raises(ConfigurationError) as excinfo:
+        session.resolve("new-system_intel")
+    assert "'new-system' is not listed" in excinfo.value.message
+
+
+
+#############
+#  Threads  #
+#############
+def test_sessions_can_be_shared_between_threads(session):
+    build_names = list(BUILD_NAMES) * 20 + ["ats1_does-not-exist"] * 5
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: session.resolve_many([_])[0], build_names))
+
+    for build_name, result in zip(build_names, results):
+        if build_name in BUILD_NAMES:
+            assert result.build_name == build_name
+            assert result.env_name == BUILD_NAMES[build_name]
+        else:
+            assert isinstance(result, EnvironmentNotFoundError)
+
+
+def test_actions_are_expanded(session):
+    resolution = session.resolve("van1-tx2_arm-serial")
+    actions = session.actions(resolution)
+    assert actions == load_env.EnvSpecGraph(
+        session.load_env.environment_specs_data
+        ).expanded_actions(resolution.env_name)
@@ -0,0 +1,120 @@
+import os
+from pathlib import Path
+import pytest
+import sys
+from unittest.mock import patch
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.ModuleBatcher import ModuleBatcher
+from loadenv.ModuleStub import ModuleStub
+
+
+
+ACTIONS = [
+    ("module-purge", None, None),
+    ("module-use", None, "/opt/modulefiles"),
+    ("module-load", "gcc", "10.2.0"),
+    ("module-load", "openmpi", "4.0.5"),
+    ("module-load", "cmake", None),
+    ("envvar-set", "MPI_ROOT", "${OPENMPI_ROOT}"),
+    ("module-unload", "cmake", None),
+    ("module-unload", "openmpi", None),
+    ("module-swap", "gcc", "clang/12.0.0"),
+    ("module-load", "ninja", "1.10"),
+    ("envvar-prepend", "PATH", "/first"),
+    ("envvar-append", "PATH", "/last"),
+    ]
+
+
+
+@pytest.fixture(autouse=True)
+def environ():
+    environ = {"PATH": "/usr/bin:/bin", "OPENMPI_ROOT": "/opt/openmpi"}
+    with patch.dict(os.environ, environ, clear=True):
+        yield os.environ
+
+
+
+#############
+#  Batches  #
+#############
+def test_consecutive_loads_and_unloads_are_batched():
+    batches = ModuleBatcher(ACTIONS, module=ModuleStub()).batches()
+    assert [(command, arguments) for command, arguments, _ in batches] == [
+        ("purge", []),
+        ("use", ["/opt/modulefiles"]),
+        ("load", ["gcc/10.2.0", "openmpi/4.0.5", "cmake"]),
+        ("envvar-set", ["MPI_ROOT", "${OPENMPI_ROOT}"]),
+        ("unload", ["cmake", "openmpi"]),
+        ("swap", ["gcc", "clang/12.0.0"]),
+        ("load", ["ninja/1.10"]),
+        ("envvar-prepend", ["PATH", "/first"]),
+        ("envvar-append", ["PATH", "/last"]),
+        ]
+    assert sum(len(_[2]) for _ in batches) == len(ACTIONS)
+
+
+
+##############
+#  Applying  #
+##############
+def test_batching_reduces_calls_without_changing_the_result(environ):
+    initial = dict(environ)
+    module = ModuleStub()
+    assert ModuleBatcher(ACTIONS, module=module).apply() == 0
+    batched = dict(environ)
+
+    environ.clear()
+    environ.update(initial)
+    unbatched_module = ModuleStub()
+    unbatched = ModuleBatcher(ACTIONS, module=unbatched_module)
+    unbatched.BATCHED_COMMANDS = []
+    assert unbatched.apply() == 0
+
+    assert dict(environ) == batched
+    assert batched["LOADEDMODULES"] == "clang/12.0.0:ninja/1.10"
+    assert batched["MPI_ROOT"] == "/opt/openmpi"
+    assert batched["PATH"].startswith("/first:/opt/ninja/1.10/bin:")
+    assert batched["PATH"].endswith(":/usr/bin:/bin:/last")
+    assert (len(module.calls), len(unbatched_module.calls)) == (6, 9)
+
+
+def test_failed_batches_are_retried_one_action_at_a_time():
+    module = ModuleStub(available=["gcc/10.2.0", "cmake"])
+    batcher = ModuleBatcher(ACTIONS, module=module)
+    assert batcher.apply() != 0
+    assert batcher.failed_action == ("module-load", "openmpi", "4.0.5")
+    assert module.calls[2 :] == [
+        ("load", "gcc/10.2.0", "openmpi/4.0.5", "cmake"),
+        ("load", "gcc/10.2.0"),
+        ("load", "openmpi/4.0.5"),
+        ]
+
+
+def test_find_in_path_failures_are_attributed(environ, tmp_path):
+    executable = tmp_path / "mpicc"
+    executable.write_text("#!/bin/sh\n")
+    executable.chmod(0o755)
+    environ["PATH"] = str(tmp_path)
+
+    actions = [
+        ("envvar-find-in-path", "MPICC", "mpicc"),
+        ("envvar-find-in-path", "MPIF90", "mpif90"),
+        ]
+    batcher = ModuleBatcher(actions, module=ModuleStub())
+    assert batcher.apply() == 1
+    assert environ["MPICC"] == str(executable)
+    assert batcher.failed_action == actions[1]
+
+
+def test_unsupported_operations_are_reported():
+    assert ModuleBatcher(ACTIONS, module=ModuleStub()).supported
+    assert not ModuleBatcher([("envvar-remove", "CC", None)], module=ModuleStub()).supported
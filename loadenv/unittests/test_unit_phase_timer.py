@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+import pytest
+import sys
+
+
+if (Path.cwd() / "conftest.py").exists():
+    root_dir = (Path.cwd()/"../..").resolve()
+elif (Path.cwd() / "unittests/conftest.py").exists():
+    root_dir = (Path.cwd()/"..").resolve()
+else:
+    root_dir = Path.cwd()
+
+sys.path.append(str(root_dir))
+from loadenv.ConfigCache import ConfigCache
+from loadenv.PhaseTimer import PhaseTimer
+
+
+
+def test_disabled_timer_records_nothing():
+    timer = PhaseTimer()
+    with timer.phase("outer", lambda: pytest.fail("info should not be called")) as record:
+        assert record is None
+    assert timer.phases == []
+
+
+
+def test_phases_are_nested_and_attribute_cache_lookups():
+    cache = ConfigCache(cache_dir="cache")
+    timer = PhaseTimer(enabled=True, cache=cache, info={"argv": ["arm"]})
+    with timer.phase("outer"):
+        with timer.phase("inner", lambda: {"sections": 3}):
+            cache.hits += 2
+        cache.misses += 1
+
+    assert [(_["name"], _["depth"]) for _ in timer.phases] == [("outer", 0), ("inner", 1)]
+    outer, inner = timer.phases
+    assert (inner["cache_hits"], inner["cache_misses"], inner["sections"]) == (2, 0, 3)
+    assert (outer["cache_hits"], outer["cache_misses"]) == (2, 1)
+    assert outer["wall_s"] >= inner["wall_s"]
+
+    timer.write("timings.json")
+    with open("timings.json", "r") as F:
+        record = json.load(F)
+    assert record["argv"] == ["arm"]
+    assert record["cache_hits"] == 2
+    assert [_["name"] for _ in record["phases"]] == ["outer", "inner"]
+
+
+
+def test_failed_phase_records_the_error():
+    timer = PhaseTimer(enabled=True)
+    with pytest.raises(SystemExit):
+        with timer.phase("match keywords", lambda: pytest.fail("info should not be called")):
+            raise SystemExit("no match")
+    assert timer.phases[0]["error"] == "SystemExit"
+    assert "wall_s" in timer.phases[0]